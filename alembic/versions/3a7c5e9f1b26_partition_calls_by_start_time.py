@@ -0,0 +1,242 @@
+"""partition calls by start time
+
+Revision ID: 3a7c5e9f1b26
+Revises: 9e2f6b1d0c47
+Create Date: 2026-10-19 12:20:13.771402
+
+Converts `calls` into a table range-partitioned by month on start_time.
+
+Postgres requires every unique constraint of a partitioned table to include
+the partition key, so uniqueness of call_id (which
+CallRepository.create_or_update relies on) is enforced through the `call_ids`
+registry table, kept in sync by a row trigger on `calls`. call_id becomes
+immutable; start_time may change (rows then move between partitions).
+
+Monthly partitions are created by ensure_calls_partitions(from, to); rows
+outside every monthly partition land in calls_default.
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3a7c5e9f1b26"
+down_revision: Union[str, Sequence[str], None] = "9e2f6b1d0c47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+COLUMNS = (
+    "id, call_id, agent_id, customer_id, language, start_time, duration_seconds, "
+    "transcript, transcript_zstd, transcript_dict_id, turns, agent_talk_ratio, "
+    "sentiment_score, sentiment_scores, embedding, processed_at, processing_status"
+)
+
+
+def calls_columns(start_time_nullable: bool):
+    return [
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('calls_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column("call_id", sa.Integer(), nullable=False),
+        sa.Column("agent_id", sa.Integer(), nullable=True),
+        sa.Column("customer_id", sa.Integer(), nullable=True),
+        sa.Column("language", sa.String(), nullable=True),
+        sa.Column("start_time", sa.DateTime(), nullable=start_time_nullable),
+        sa.Column("duration_seconds", sa.Integer(), nullable=True),
+        sa.Column("transcript", sa.Text(), nullable=True),
+        sa.Column(
+            "transcript_zstd",
+            sa.LargeBinary(),
+            nullable=True,
+            comment="Transcript compressed with zstd using transcript_dict_id",
+        ),
+        sa.Column(
+            "transcript_dict_id",
+            sa.Integer(),
+            nullable=True,
+            comment="transcript_dictionaries.id used to compress transcript_zstd",
+        ),
+        sa.Column(
+            "turns",
+            sa.JSON(),
+            nullable=True,
+            comment="Transcript turns: speaker codes, content offsets and word counts",
+        ),
+        sa.Column(
+            "agent_talk_ratio",
+            sa.Float(),
+            nullable=True,
+            comment="Ratio of agent words to total words in the call",
+        ),
+        sa.Column(
+            "sentiment_score",
+            sa.Float(),
+            nullable=True,
+            comment="Overall sentiment score from -1 (negative) to 1 (positive)",
+        ),
+        sa.Column(
+            "sentiment_scores",
+            sa.JSON(),
+            nullable=True,
+            comment="Detailed sentiment scores for different segments",
+        ),
+        sa.Column(
+            "embedding",
+            sa.Text(),
+            nullable=True,
+            comment="Sentence embeddings for the call transcript",
+        ),
+        sa.Column(
+            "processed_at",
+            sa.DateTime(),
+            nullable=True,
+            comment="When the call was processed for insights",
+        ),
+        sa.Column(
+            "processing_status",
+            sa.String(length=20),
+            nullable=True,
+            comment="Status of insight processing: pending, processing, completed, failed",
+        ),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE calls RENAME TO calls_legacy")
+    op.execute("ALTER TABLE calls_legacy RENAME CONSTRAINT calls_pkey TO calls_legacy_pkey")
+    op.execute("ALTER SEQUENCE calls_id_seq OWNED BY NONE")
+
+    op.create_table(
+        "calls",
+        *calls_columns(start_time_nullable=False),
+        sa.PrimaryKeyConstraint("id", "start_time", name="calls_pkey"),
+        postgresql_partition_by="RANGE (start_time)",
+    )
+
+    # call_id uniqueness across partitions
+    op.create_table(
+        "call_ids",
+        sa.Column("call_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("call_id", name="call_ids_pkey"),
+    )
+    op.create_index("ix_call_ids_start_time", "call_ids", ["start_time"])
+    op.execute(
+        """
+        CREATE FUNCTION calls_register_call_id() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO call_ids (call_id, start_time)
+                VALUES (NEW.call_id, NEW.start_time);
+            ELSIF TG_OP = 'UPDATE' THEN
+                IF NEW.call_id <> OLD.call_id THEN
+                    RAISE EXCEPTION 'calls.call_id is immutable';
+                END IF;
+                UPDATE call_ids SET start_time = NEW.start_time
+                WHERE call_id = NEW.call_id;
+            ELSE
+                DELETE FROM call_ids WHERE call_id = OLD.call_id;
+                RETURN OLD;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    # A start_time change that moves a row to another partition runs as
+    # UPDATE + DELETE (source) + INSERT (destination), which keeps call_ids right
+    op.execute(
+        """
+        CREATE TRIGGER calls_call_id_unique
+        BEFORE INSERT OR DELETE OR UPDATE OF call_id, start_time ON calls
+        FOR EACH ROW EXECUTE FUNCTION calls_register_call_id()
+        """
+    )
+
+    op.execute(
+        """
+        CREATE FUNCTION ensure_calls_partitions(from_ts timestamp, to_ts timestamp)
+        RETURNS integer AS $$
+        DECLARE
+            month_start timestamp := date_trunc('month', from_ts);
+            partition_name text;
+            created integer := 0;
+        BEGIN
+            WHILE month_start <= to_ts LOOP
+                partition_name := 'calls_' || to_char(month_start, 'YYYY_MM');
+                IF to_regclass(partition_name) IS NULL THEN
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF calls FOR VALUES FROM (%L) TO (%L)',
+                        partition_name, month_start, month_start + interval '1 month'
+                    );
+                    created := created + 1;
+                END IF;
+                month_start := month_start + interval '1 month';
+            END LOOP;
+            RETURN created;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        f"""
+        SELECT ensure_calls_partitions(
+            COALESCE((SELECT min(start_time) FROM calls_legacy), now()::timestamp),
+            (now() + interval '{MONTHS_AHEAD} months')::timestamp
+        )
+        """
+    )
+    op.execute("CREATE TABLE calls_default PARTITION OF calls DEFAULT")
+
+    # start_time is part of the key now; calls that never had one are filed
+    # under when they were processed (or migrated)
+    op.execute(
+        f"""
+        INSERT INTO calls ({COLUMNS})
+        SELECT {COLUMNS.replace("start_time,", "COALESCE(start_time, processed_at, now()::timestamp),")}
+        FROM calls_legacy
+        """
+    )
+    op.drop_table("calls_legacy")
+    op.execute("ALTER SEQUENCE calls_id_seq OWNED BY calls.id")
+
+    op.create_index(op.f("ix_calls_id"), "calls", ["id"], unique=False)
+    op.create_index(op.f("ix_calls_call_id"), "calls", ["call_id"], unique=False)
+    op.create_index(op.f("ix_calls_customer_id"), "calls", ["customer_id"], unique=False)
+    op.create_index(op.f("ix_calls_start_time"), "calls", ["start_time"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table(
+        "calls_plain",
+        *calls_columns(start_time_nullable=True),
+        sa.PrimaryKeyConstraint("id", name="calls_plain_pkey"),
+    )
+    op.execute(f"INSERT INTO calls_plain ({COLUMNS}) SELECT {COLUMNS} FROM calls")
+    op.execute("ALTER SEQUENCE calls_id_seq OWNED BY NONE")
+
+    # Dropping the partitioned table drops every partition and the trigger
+    op.drop_table("calls")
+    op.execute("DROP FUNCTION ensure_calls_partitions(timestamp, timestamp)")
+    op.execute("DROP FUNCTION calls_register_call_id()")
+    op.drop_index("ix_call_ids_start_time", table_name="call_ids")
+    op.drop_table("call_ids")
+
+    op.execute("ALTER TABLE calls_plain RENAME TO calls")
+    op.execute("ALTER TABLE calls RENAME CONSTRAINT calls_plain_pkey TO calls_pkey")
+    op.execute("ALTER SEQUENCE calls_id_seq OWNED BY calls.id")
+    op.create_index(op.f("ix_calls_id"), "calls", ["id"], unique=False)
+    op.create_index(op.f("ix_calls_call_id"), "calls", ["call_id"], unique=True)
+    op.create_index(op.f("ix_calls_customer_id"), "calls", ["customer_id"], unique=False)
+    op.create_index(op.f("ix_calls_start_time"), "calls", ["start_time"], unique=False)
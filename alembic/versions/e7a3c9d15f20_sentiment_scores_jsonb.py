@@ -0,0 +1,124 @@
+"""sentiment scores jsonb
+
+Revision ID: e7a3c9d15f20
+Revises: b5d1e8a2c9f3
+Create Date: 2026-10-19 15:42:08.316204
+
+Converts calls.sentiment_scores to JSONB and indexes it:
+
+- ix_calls_sentiment_scores: GIN (jsonb_path_ops) for containment queries,
+  e.g. calls with any negative customer segment
+- sentiment_label / sentiment_confidence: stored generated columns for the
+  overall label and confidence, with (label, confidence) and
+  (label, start_time) indexes
+- ix_calls_final_customer_label_start_time: expression index on the label of
+  the last customer segment
+
+Both the type change and the stored columns rewrite every partition of
+`calls` under an exclusive lock, and indexes on a partitioned table can't
+be built CONCURRENTLY: run this in a maintenance window.
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e7a3c9d15f20"
+down_revision: Union[str, Sequence[str], None] = "b5d1e8a2c9f3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SENTIMENT_SCORES_COMMENT = "Detailed sentiment scores for different segments"
+
+# Same expression as app.models.calls.FINAL_CUSTOMER_LABEL_SQL
+FINAL_CUSTOMER_LABEL_SQL = (
+    "((jsonb_path_query_array(sentiment_scores, "
+    "'$.segments[*] ? (@.speaker == \"customer\")') -> -1) ->> 'label')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        "calls",
+        "sentiment_scores",
+        existing_type=sa.JSON(),
+        type_=postgresql.JSONB(astext_type=sa.Text()),
+        existing_nullable=True,
+        existing_comment=SENTIMENT_SCORES_COMMENT,
+        postgresql_using="sentiment_scores::jsonb",
+    )
+    op.add_column(
+        "calls",
+        sa.Column(
+            "sentiment_label",
+            sa.String(length=16),
+            sa.Computed("sentiment_scores -> 'overall' ->> 'label'", persisted=True),
+            nullable=True,
+            comment="Overall sentiment label (generated from sentiment_scores)",
+        ),
+    )
+    op.add_column(
+        "calls",
+        sa.Column(
+            "sentiment_confidence",
+            sa.Float(),
+            sa.Computed(
+                "CAST(sentiment_scores -> 'overall' ->> 'confidence' AS FLOAT)",
+                persisted=True,
+            ),
+            nullable=True,
+            comment="Overall sentiment confidence (generated from sentiment_scores)",
+        ),
+    )
+    op.create_index(
+        "ix_calls_sentiment_scores",
+        "calls",
+        ["sentiment_scores"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"sentiment_scores": "jsonb_path_ops"},
+    )
+    op.create_index(
+        "ix_calls_sentiment_label_confidence",
+        "calls",
+        ["sentiment_label", "sentiment_confidence"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_calls_sentiment_label_start_time",
+        "calls",
+        ["sentiment_label", "start_time"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_calls_final_customer_label_start_time",
+        "calls",
+        [sa.text(FINAL_CUSTOMER_LABEL_SQL), "start_time"],
+        unique=False,
+    )
+    op.execute("ANALYZE calls")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_calls_final_customer_label_start_time", table_name="calls")
+    op.drop_index("ix_calls_sentiment_label_start_time", table_name="calls")
+    op.drop_index("ix_calls_sentiment_label_confidence", table_name="calls")
+    op.drop_index("ix_calls_sentiment_scores", table_name="calls")
+    op.drop_column("calls", "sentiment_confidence")
+    op.drop_column("calls", "sentiment_label")
+    op.alter_column(
+        "calls",
+        "sentiment_scores",
+        existing_type=postgresql.JSONB(astext_type=sa.Text()),
+        type_=sa.JSON(),
+        existing_nullable=True,
+        existing_comment=SENTIMENT_SCORES_COMMENT,
+        postgresql_using="sentiment_scores::json",
+    )
@@ -0,0 +1,148 @@
+"""
+Consistent-hash routing of insights tasks to worker nodes.
+
+Every worker node that opts in consumes its own queue per lane
+("insights.fresh@<node>", ...) ahead of the shared lane queue, and records a
+heartbeat in Redis. Producers hash the task's affinity key (the call's
+customer_id by default) onto a ring of the nodes with a recent heartbeat, so
+the same customer's calls keep landing where its models and cached state are
+already warm. With virtual nodes, a node joining or leaving only moves the
+keys of its own ring segments (about 1/N of them).
+"""
+
+import bisect
+import hashlib
+import socket
+import threading
+import time
+from typing import Iterable, List, Optional
+
+import structlog
+
+from app.cache import redis_client
+from app.settings import (
+    INSIGHTS_AFFINITY_HEARTBEAT_SECONDS,
+    INSIGHTS_AFFINITY_NODE,
+    INSIGHTS_AFFINITY_NODE_TTL_SECONDS,
+    INSIGHTS_AFFINITY_VNODES,
+)
+
+logger = structlog.get_logger(__name__)
+
+# Sorted set of node -> unix time of its last heartbeat
+NODES_KEY = "affinity:nodes"
+
+
+def node_name() -> str:
+    return INSIGHTS_AFFINITY_NODE or socket.gethostname()
+
+
+def node_queue(queue: str, node: str) -> str:
+    return f"{queue}@{node}"
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent-hash ring with `vnodes` points per node."""
+
+    def __init__(self, nodes: Iterable[str], vnodes: int = INSIGHTS_AFFINITY_VNODES):
+        self.nodes = frozenset(nodes)
+        points = sorted(
+            (_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key) -> Optional[str]:
+        """The node owning `key`: the first ring point at or after its hash."""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(str(key))) % len(self._hashes)
+        return self._owners[index]
+
+
+def heartbeat(node: str, client=redis_client):
+    client.zadd(NODES_KEY, {node: time.time()})
+
+
+def leave(node: str, client=redis_client):
+    """
+    Take a node off the ring. It stays listed as stale until its queues have
+    been handed back (app.workers.affinity.requeue_orphaned_affinity_queues).
+    """
+    client.zadd(NODES_KEY, {node: 0})
+
+
+def forget(node: str, client=redis_client):
+    client.zrem(NODES_KEY, node)
+
+
+def live_nodes(
+    ttl: float = INSIGHTS_AFFINITY_NODE_TTL_SECONDS, client=redis_client
+) -> List[str]:
+    members = client.zrangebyscore(NODES_KEY, time.time() - ttl, "+inf")
+    return sorted(member.decode() for member in members)
+
+
+def stale_nodes(
+    ttl: float = INSIGHTS_AFFINITY_NODE_TTL_SECONDS, client=redis_client
+) -> List[str]:
+    members = client.zrangebyscore(NODES_KEY, "-inf", f"({time.time() - ttl}")
+    return sorted(member.decode() for member in members)
+
+
+_ring = {"ring": HashRing([]), "loaded_at": 0.0}
+_ring_lock = threading.Lock()
+
+
+def current_ring(client=redis_client) -> HashRing:
+    """Ring of the live nodes, re-read from Redis at most once per heartbeat interval."""
+    with _ring_lock:
+        if time.monotonic() - _ring["loaded_at"] >= INSIGHTS_AFFINITY_HEARTBEAT_SECONDS:
+            nodes = live_nodes(client=client)
+            if set(nodes) != _ring["ring"].nodes:
+                logger.info("Affinity ring changed", nodes=nodes)
+                _ring["ring"] = HashRing(nodes)
+            _ring["loaded_at"] = time.monotonic()
+        return _ring["ring"]
+
+
+class Heartbeat:
+    """Background thread keeping a node's heartbeat fresh until stopped."""
+
+    def __init__(
+        self,
+        node: str,
+        interval: float = INSIGHTS_AFFINITY_HEARTBEAT_SECONDS,
+        client=redis_client,
+    ):
+        self.node = node
+        self.interval = interval
+        self.client = client
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="affinity-heartbeat", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                heartbeat(self.node, self.client)
+            except Exception as e:
+                logger.error(f"Affinity heartbeat failed: {str(e)}", node=self.node)
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        """Stop beating and take the node off the ring right away."""
+        self._stopped.set()
+        self._thread.join()
+        try:
+            leave(self.node, self.client)
+        except Exception as e:
+            logger.error(f"Could not remove affinity node: {str(e)}", node=self.node)
@@ -0,0 +1,272 @@
+"""
+Online backfills of large tables (chiefly `calls`).
+
+A migration that converts or fills a column with one UPDATE holds its locks
+for the whole table and writes all of its WAL at once. Schema changes that
+touch existing rows are rolled out in steps instead:
+
+1. expand: add the new column (nullable, no default), and have every write
+   fill it from then on, either in the application or with a trigger on the
+   old columns (`sync_trigger_sql`)
+2. backfill: fill existing rows with an OnlineBackfill, in short id-range
+   transactions, pausing between batches and while replicas lag behind
+3. switch reads to the new column (falling back to the old one until the
+   backfill has finished), then drop the trigger and old column in a later
+   migration (contract)
+
+Progress is saved per batch in `backfill_progress`, in the batch's own
+transaction, so an interrupted backfill resumes where it stopped. Batches
+must be idempotent (e.g. `WHERE new IS NULL`): a batch is retried after lock
+timeouts, and rows only need to be caught up once.
+
+Rows created after the backfill started (id above the `max_id` it recorded)
+are not visited: the dual write of step 1 covers them.
+
+Inside a migration, run the backfill in an autocommit block, with sessions
+from migration_session_factory. The block commits the migration's DDL so far
+(the new column), and the factory opens a connection of its own on which
+each batch, with its progress row and SET LOCAL lock_timeout, is one
+transaction:
+
+    with op.get_context().autocommit_block():
+        OnlineBackfill(
+            "calls_new_column",
+            sql_batch(
+                "UPDATE calls SET new_column = ... "
+                "WHERE id BETWEEN :lo AND :hi AND new_column IS NULL"
+            ),
+            session_factory=migration_session_factory(),
+        ).run()
+"""
+
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Sequence
+
+import structlog
+from sqlalchemy import create_engine, func, select, text, update
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db import SessionLocal
+from app.models.backfill import DBBackfillProgress
+from app.models.calls import DBCall
+from app.settings import (
+    BACKFILL_BATCH_SIZE,
+    BACKFILL_LAG_POLL_SECONDS,
+    BACKFILL_LOCK_TIMEOUT_MS,
+    BACKFILL_MAX_REPLICATION_LAG_SECONDS,
+    BACKFILL_MAX_RETRIES,
+    BACKFILL_SLEEP_SECONDS,
+)
+
+logger = structlog.get_logger(__name__)
+
+# process_batch(db, lo, hi) -> rows updated, for rows with lo <= id <= hi.
+# Runs in the batch's transaction; it must not commit.
+BatchFn = Callable[[Session, int, int], int]
+
+
+def sql_batch(statement: str) -> BatchFn:
+    """A batch function running one SQL statement with :lo and :hi bound."""
+
+    def process(db: Session, lo: int, hi: int) -> int:
+        return db.execute(text(statement), {"lo": lo, "hi": hi}).rowcount
+
+    return process
+
+
+def replication_lag_seconds(db: Session) -> float:
+    """Replay lag of the slowest streaming replica (0 without replicas or off Postgres)."""
+    if db.bind.dialect.name != "postgresql":
+        return 0.0
+    lag = db.scalar(
+        text(
+            "SELECT COALESCE(EXTRACT(EPOCH FROM MAX(replay_lag)), 0) "
+            "FROM pg_stat_replication"
+        )
+    )
+    return float(lag or 0.0)
+
+
+def migration_session_factory():
+    """
+    Sessions on a connection of their own to the running Alembic migration's
+    database. The migration's connection is in autocommit mode inside
+    autocommit_block, where every statement commits by itself.
+    """
+    from alembic import op
+
+    engine = create_engine(op.get_bind().engine.url, pool_size=1)
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+def sync_trigger_sql(name: str, table: str, columns: Sequence[str], body: str) -> str:
+    """
+    SQL (Postgres) for a BEFORE INSERT/UPDATE trigger keeping new columns in
+    step with `columns` on every write, e.g.
+    body="NEW.new_column := lower(NEW.old_column);".
+    """
+    return f"""
+CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$
+BEGIN
+    {body}
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER {name}
+BEFORE INSERT OR UPDATE OF {", ".join(columns)} ON {table}
+FOR EACH ROW EXECUTE FUNCTION {name}();
+"""
+
+
+def drop_sync_trigger_sql(name: str, table: str) -> str:
+    return f"DROP TRIGGER IF EXISTS {name} ON {table};\nDROP FUNCTION IF EXISTS {name}();"
+
+
+class OnlineBackfill:
+    """
+    Runs `process_batch` over id ranges of `batch_size` ids, from where the
+    backfill named `name` last stopped up to the highest id at its start.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process_batch: BatchFn,
+        batch_size: int = BACKFILL_BATCH_SIZE,
+        sleep: float = BACKFILL_SLEEP_SECONDS,
+        max_replication_lag: float = BACKFILL_MAX_REPLICATION_LAG_SECONDS,
+        session_factory=SessionLocal,
+        id_column=DBCall.id,
+    ):
+        self.name = name
+        self.process_batch = process_batch
+        self.batch_size = batch_size
+        self.sleep = sleep
+        self.max_replication_lag = max_replication_lag
+        self.session_factory = session_factory
+        self.id_column = id_column
+
+    def _start(self, restart: bool) -> DBBackfillProgress:
+        with self.session_factory() as db:
+            try:
+                progress = db.get(DBBackfillProgress, self.name)
+                if progress is None or restart:
+                    min_id, max_id = db.execute(
+                        select(func.min(self.id_column), func.max(self.id_column))
+                    ).one()
+                    progress = db.merge(
+                        DBBackfillProgress(
+                            name=self.name,
+                            last_id=(min_id or 1) - 1,
+                            max_id=max_id or 0,
+                            rows_updated=0,
+                            batches=0,
+                            started_at=datetime.utcnow(),
+                            finished_at=None,
+                        )
+                    )
+                    db.commit()
+                    db.refresh(progress)
+                db.expunge(progress)
+                return progress
+            except SQLAlchemyError as e:
+                db.rollback()
+                raise e
+
+    def _wait_for_replicas(self):
+        if self.max_replication_lag <= 0:
+            return
+        while True:
+            with self.session_factory() as db:
+                lag = replication_lag_seconds(db)
+            if lag <= self.max_replication_lag:
+                return
+            logger.info("Backfill waiting for replicas", backfill=self.name, lag_s=lag)
+            time.sleep(BACKFILL_LAG_POLL_SECONDS)
+
+    def _run_batch(self, lo: int, hi: int) -> int:
+        for attempt in range(BACKFILL_MAX_RETRIES + 1):
+            with self.session_factory() as db:
+                try:
+                    if db.bind.dialect.name == "postgresql":
+                        # Give way to live traffic instead of queueing behind it
+                        db.execute(
+                            text(f"SET LOCAL lock_timeout = {int(BACKFILL_LOCK_TIMEOUT_MS)}")
+                        )
+                    rows = self.process_batch(db, lo, hi)
+                    db.execute(
+                        update(DBBackfillProgress)
+                        .where(DBBackfillProgress.name == self.name)
+                        .values(
+                            last_id=hi,
+                            rows_updated=DBBackfillProgress.rows_updated + rows,
+                            batches=DBBackfillProgress.batches + 1,
+                            updated_at=datetime.utcnow(),
+                        )
+                    )
+                    db.commit()
+                    return rows
+                except OperationalError as e:
+                    # Lock timeouts, deadlocks, serialization failures
+                    db.rollback()
+                    if attempt == BACKFILL_MAX_RETRIES:
+                        raise e
+                    logger.warning(
+                        f"Backfill batch failed, retrying: {str(e)}",
+                        backfill=self.name,
+                        lo=lo,
+                        hi=hi,
+                        attempt=attempt + 1,
+                    )
+                    time.sleep(self.sleep + 2**attempt)
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    raise e
+
+    def run(self, restart: bool = False) -> Dict:
+        """Run (or resume) the backfill to the end; returns its progress."""
+        progress = self._start(restart)
+        if progress.finished_at is not None:
+            logger.info("Backfill already finished", backfill=self.name)
+            return backfill_status(self.name, self.session_factory)
+
+        lo = progress.last_id + 1
+        logger.info("Backfill started", backfill=self.name, from_id=lo, max_id=progress.max_id)
+        while lo <= progress.max_id:
+            self._wait_for_replicas()
+            hi = min(lo + self.batch_size - 1, progress.max_id)
+            rows = self._run_batch(lo, hi)
+            logger.info("Backfill batch done", backfill=self.name, up_to_id=hi, rows=rows)
+            lo = hi + 1
+            time.sleep(self.sleep)
+
+        with self.session_factory() as db:
+            db.execute(
+                update(DBBackfillProgress)
+                .where(DBBackfillProgress.name == self.name)
+                .values(finished_at=datetime.utcnow())
+            )
+            db.commit()
+        status = backfill_status(self.name, self.session_factory)
+        logger.info("Backfill finished", **status)
+        return status
+
+
+def backfill_status(name: str, session_factory=SessionLocal) -> Optional[Dict]:
+    with session_factory() as db:
+        progress = db.get(DBBackfillProgress, name)
+        if progress is None:
+            return None
+        return {
+            "backfill": progress.name,
+            "last_id": progress.last_id,
+            "max_id": progress.max_id,
+            "rows_updated": progress.rows_updated,
+            "batches": progress.batches,
+            "started_at": progress.started_at,
+            "updated_at": progress.updated_at,
+            "finished_at": progress.finished_at,
+        }
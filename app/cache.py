@@ -0,0 +1,142 @@
+import json
+import threading
+import zlib
+from typing import Any, Callable, List
+
+import redis
+import structlog
+from redis.exceptions import LockError, RedisError
+
+from app.settings import CACHE_ENABLED, CACHE_LOCK_TIMEOUT_SECONDS, REDIS_URL
+
+logger = structlog.get_logger(__name__)
+
+# Shared Redis client; connections are opened lazily from the pool
+redis_client = redis.Redis.from_url(REDIS_URL)
+
+# Cache keys embed a version that every write bumps. A reader that loaded data
+# before a write can only store it under the old version, which is never read
+# again, so invalidation cannot race with an in-flight miss.
+CALL_VERSION_KEY = "cache:call:{call_id}:version"
+CALLS_GENERATION_KEY = "cache:calls:generation"
+
+# Striped in-process locks so concurrent misses in one process coalesce
+# before contending for the cross-process Redis lock
+_LOCAL_LOCKS = [threading.Lock() for _ in range(64)]
+
+
+def _local_lock(key: str) -> threading.Lock:
+    return _LOCAL_LOCKS[zlib.crc32(key.encode("utf-8")) % len(_LOCAL_LOCKS)]
+
+
+def call_cache_key(call_id: int, client=redis_client) -> str:
+    version = client.get(CALL_VERSION_KEY.format(call_id=call_id)) or b"0"
+    return f"cache:call:{call_id}:v{version.decode()}"
+
+
+def aggregates_cache_key(start, end, client=redis_client) -> str:
+    generation = client.get(CALLS_GENERATION_KEY) or b"0"
+    return f"cache:aggregates:{start}:{end}:g{generation.decode()}"
+
+
+def invalidate_call(call_id: int, aggregates: bool = True, client=redis_client):
+    """
+    Invalidate cached reads that include `call_id`: its own details and, unless
+    `aggregates` is False, every aggregate window. Pass False only for writes
+    that change nothing aggregates are computed from.
+    """
+    if not CACHE_ENABLED:
+        return
+    try:
+        pipe = client.pipeline()
+        pipe.incr(CALL_VERSION_KEY.format(call_id=call_id))
+        if aggregates:
+            pipe.incr(CALLS_GENERATION_KEY)
+        pipe.execute()
+    except RedisError as e:
+        logger.error(f"Cache invalidation failed: {str(e)}", call_id=call_id)
+
+
+def invalidate_calls(call_ids: List[int], aggregates: bool = True, client=redis_client):
+    """
+    invalidate_call for many calls at once: one round trip, and a single
+    bump of the aggregates generation.
+    """
+    if not CACHE_ENABLED or not call_ids:
+        return
+    try:
+        pipe = client.pipeline()
+        for call_id in call_ids:
+            pipe.incr(CALL_VERSION_KEY.format(call_id=call_id))
+        if aggregates:
+            pipe.incr(CALLS_GENERATION_KEY)
+        pipe.execute()
+    except RedisError as e:
+        logger.error(f"Cache invalidation failed: {str(e)}", calls=len(call_ids))
+
+
+def invalidate_aggregates(client=redis_client):
+    """Invalidate every cached aggregate window (e.g. after calls are retired)."""
+    if not CACHE_ENABLED:
+        return
+    try:
+        client.incr(CALLS_GENERATION_KEY)
+    except RedisError as e:
+        logger.error(f"Cache invalidation failed: {str(e)}")
+
+
+def read_through(
+    key_fn: Callable[[], str],
+    ttl: int,
+    loader: Callable[[], Any],
+    client=redis_client,
+) -> Any:
+    """
+    Return the JSON value cached under `key_fn()`, computing it with `loader`
+    on a miss. Concurrent misses for the same key (in this process and across
+    processes) wait for a single computation. Redis errors fall back to
+    `loader`.
+    """
+    if not CACHE_ENABLED:
+        return loader()
+
+    try:
+        key = key_fn()
+        cached = client.get(key)
+    except RedisError as e:
+        logger.warning(f"Cache read failed: {str(e)}")
+        return loader()
+    if cached is not None:
+        return json.loads(cached)
+
+    with _local_lock(key):
+        lock = client.lock(
+            f"lock:{key}",
+            timeout=CACHE_LOCK_TIMEOUT_SECONDS,
+            blocking_timeout=CACHE_LOCK_TIMEOUT_SECONDS,
+        )
+        acquired = False
+        try:
+            # Another process may have filled the key while we waited
+            acquired = lock.acquire()
+            cached = client.get(key)
+        except RedisError as e:
+            logger.warning(f"Cache lock failed: {str(e)}")
+            cached = None
+
+        try:
+            if cached is not None:
+                return json.loads(cached)
+
+            value = loader()
+            try:
+                client.set(key, json.dumps(value), ex=ttl)
+            except RedisError as e:
+                logger.warning(f"Cache fill failed: {str(e)}")
+            return value
+        finally:
+            if acquired:
+                try:
+                    lock.release()
+                except (LockError, RedisError):
+                    pass
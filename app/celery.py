@@ -1,10 +1,50 @@
 from celery import Celery
-from app.settings import REDIS_URL
+
+import app.logging  # noqa: F401  (configures logging)
+from app.settings import REDIS_URL, WORKER_MAX_MEMORY_PER_CHILD_MB
 
 # Create Celery instance
 celery = Celery(
     "app",
     broker=REDIS_URL,
     backend=REDIS_URL,
-    include=["app.workers.ingestion", "app.workers.insights"],
+    include=[
+        "app.workers.ingestion",
+        "app.workers.insights",
+        "app.workers.partitions",
+        "app.workers.affinity",
+        "app.workers.memory",
+        "app.workers.degradation",
+    ],
+)
+
+celery.conf.update(
+    # Workers listening on several insights lanes drain them in the order given
+    # with -Q (fresh first) instead of round-robin
+    broker_transport_options={"queue_order_strategy": "priority"},
+    # Don't let a worker reserve backfill messages ahead of newly arrived fresh ones
+    worker_prefetch_multiplier=1,
+    # Keep the queue-based handlers from app.logging on the root logger
+    worker_hijack_root_logger=False,
+    # Replace a prefork child after the task that takes it past the limit
+    # (KB), before a leak gets it OOM-killed in the middle of a task
+    worker_max_memory_per_child=WORKER_MAX_MEMORY_PER_CHILD_MB * 1024 or None,
+    # Run `celery -A app.celery beat` to keep future partitions of `calls`
+    # created ahead of time and old ones retired
+    beat_schedule={
+        "maintain-call-partitions": {
+            "task": "app.workers.partitions.maintain_call_partitions",
+            "schedule": 24 * 60 * 60,
+        },
+        # Affinity queues of nodes that stopped heartbeating go back to the shared queues
+        "requeue-orphaned-affinity-queues": {
+            "task": "app.workers.affinity.requeue_orphaned_affinity_queues",
+            "schedule": 60,
+        },
+        # Calls processed at a cheaper tier during a peak are redone in full
+        "upgrade-degraded-calls": {
+            "task": "app.workers.degradation.upgrade_degraded_calls",
+            "schedule": 5 * 60,
+        },
+    },
 )
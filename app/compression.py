@@ -0,0 +1,101 @@
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+
+import structlog
+import zstandard
+
+from app.db import SessionLocal
+from app.settings import (
+    TRANSCRIPT_COMPRESSION_ENABLED,
+    TRANSCRIPT_COMPRESSION_LEVEL,
+    TRANSCRIPT_DICTIONARY_REFRESH_SECONDS,
+)
+
+logger = structlog.get_logger(__name__)
+
+# Dictionary contents never change once stored, so they are cached per process
+# by id; only "which dictionary is newest" is refreshed periodically.
+_dictionaries = {}
+_dictionaries_lock = threading.Lock()
+_active = {"id": None, "checked_at": 0.0}
+
+# zstd (de)compressors are not safe for concurrent use
+_local = threading.local()
+
+
+def train_dictionary(samples: Iterable[str], dict_size: int = 112_640) -> bytes:
+    """Train a zstd dictionary on a sample of transcripts."""
+    data = [sample.encode("utf-8") for sample in samples if sample]
+    return zstandard.train_dictionary(dict_size, data).as_bytes()
+
+
+def _load_dictionary(dict_id: int) -> zstandard.ZstdCompressionDict:
+    from app.models.compression import DBTranscriptDictionary
+
+    with _dictionaries_lock:
+        if dict_id not in _dictionaries:
+            with SessionLocal() as db:
+                row = db.get(DBTranscriptDictionary, dict_id)
+                if row is None:
+                    raise ValueError(f"Transcript dictionary {dict_id} not found")
+                _dictionaries[dict_id] = zstandard.ZstdCompressionDict(row.dictionary)
+        return _dictionaries[dict_id]
+
+
+def active_dictionary_id() -> Optional[int]:
+    """Id of the newest trained dictionary (None until one is trained)."""
+    from app.models.compression import DBTranscriptDictionary
+
+    now = time.monotonic()
+    if now - _active["checked_at"] >= TRANSCRIPT_DICTIONARY_REFRESH_SECONDS:
+        with SessionLocal() as db:
+            latest = (
+                db.query(DBTranscriptDictionary.id)
+                .order_by(DBTranscriptDictionary.id.desc())
+                .first()
+            )
+        _active["id"] = latest[0] if latest else None
+        _active["checked_at"] = now
+    return _active["id"]
+
+
+def _compressor(dict_id: int) -> zstandard.ZstdCompressor:
+    compressors = _local.__dict__.setdefault("compressors", {})
+    if dict_id not in compressors:
+        compressors[dict_id] = zstandard.ZstdCompressor(
+            level=TRANSCRIPT_COMPRESSION_LEVEL, dict_data=_load_dictionary(dict_id)
+        )
+    return compressors[dict_id]
+
+
+def _decompressor(dict_id: int) -> zstandard.ZstdDecompressor:
+    decompressors = _local.__dict__.setdefault("decompressors", {})
+    if dict_id not in decompressors:
+        decompressors[dict_id] = zstandard.ZstdDecompressor(
+            dict_data=_load_dictionary(dict_id)
+        )
+    return decompressors[dict_id]
+
+
+def compress_transcript(
+    text: str, dict_id: Optional[int] = None
+) -> Tuple[Optional[bytes], Optional[int]]:
+    """
+    Compress a transcript with the given (default: newest) dictionary.
+    Returns (None, None) when compression is disabled or no dictionary exists,
+    in which case the transcript is stored as plain text.
+    """
+    if text is None:
+        return None, None
+    if dict_id is None:
+        if not TRANSCRIPT_COMPRESSION_ENABLED:
+            return None, None
+        dict_id = active_dictionary_id()
+        if dict_id is None:
+            return None, None
+    return _compressor(dict_id).compress(text.encode("utf-8")), dict_id
+
+
+def decompress_transcript(data: bytes, dict_id: int) -> str:
+    return _decompressor(dict_id).decompress(data).decode("utf-8")
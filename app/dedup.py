@@ -0,0 +1,141 @@
+import hashlib
+import zlib
+from typing import Iterable, Optional, Set, Tuple
+
+import numpy as np
+import structlog
+
+from app.cache import redis_client
+from app.settings import (
+    DEDUP_SIMILARITY_THRESHOLD,
+    LSH_BANDS,
+    MINHASH_NUM_PERM,
+    MINHASH_SHINGLE_SIZE,
+)
+
+logger = structlog.get_logger(__name__)
+
+# Universal hashing h(x) = (a * x + b) mod p, with a < 2**31 and x < 2**32 so
+# that the product always fits in uint64.
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+_rng = np.random.RandomState(42)
+_PERM_A = _rng.randint(1, 2**31, size=MINHASH_NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, 2**31, size=MINHASH_NUM_PERM).astype(np.uint64)
+
+
+def shingles(text: str, size: int = MINHASH_SHINGLE_SIZE) -> Set[str]:
+    """
+    Build the set of word n-grams (shingles) for a transcript.
+    Transcripts shorter than `size` words yield a single shingle.
+    """
+    words = text.split()
+    if not words:
+        return set()
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def compute_minhash(text: str) -> np.ndarray:
+    """
+    Compute the MinHash signature (MINHASH_NUM_PERM uint32 values) of a transcript.
+    """
+    signature = np.full(MINHASH_NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    items = shingles(text)
+    if not items:
+        return signature.astype(np.uint32)
+
+    hashes = np.fromiter(
+        (zlib.crc32(item.encode("utf-8")) for item in items),
+        dtype=np.uint64,
+        count=len(items),
+    )
+    permuted = (hashes[:, None] * _PERM_A + _PERM_B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def estimate_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class MinHashLSH:
+    """
+    Banded LSH index over MinHash signatures, stored in Redis.
+
+    Each signature is split into `bands` bands; calls sharing any band bucket
+    become candidates and are then verified against their stored signature.
+    """
+
+    def __init__(self, client=redis_client, bands: int = LSH_BANDS, prefix: str = "lsh"):
+        if MINHASH_NUM_PERM % bands:
+            raise ValueError(
+                f"MINHASH_NUM_PERM ({MINHASH_NUM_PERM}) must be divisible by bands ({bands})"
+            )
+        self.client = client
+        self.bands = bands
+        self.rows = MINHASH_NUM_PERM // bands
+        self.prefix = prefix
+
+    def _signature_key(self, call_id: int) -> str:
+        return f"{self.prefix}:sig:{call_id}"
+
+    def _band_keys(self, signature: np.ndarray) -> Iterable[str]:
+        for band in range(self.bands):
+            chunk = signature[band * self.rows : (band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(chunk, digest_size=8).hexdigest()
+            yield f"{self.prefix}:band:{band}:{digest}"
+
+    def insert(self, call_id: int, signature: np.ndarray):
+        """Add (or replace) a call's signature in the index."""
+        previous = self.client.get(self._signature_key(call_id))
+
+        pipe = self.client.pipeline()
+        if previous is not None:
+            for key in self._band_keys(np.frombuffer(previous, dtype=np.uint32)):
+                pipe.srem(key, call_id)
+        for key in self._band_keys(signature):
+            pipe.sadd(key, call_id)
+        pipe.set(self._signature_key(call_id), signature.tobytes())
+        pipe.execute()
+
+    def query(self, signature: np.ndarray, exclude: Optional[int] = None):
+        """
+        Return [(call_id, similarity)] for candidates at or above the similarity
+        threshold, most similar first.
+        """
+        pipe = self.client.pipeline()
+        for key in self._band_keys(signature):
+            pipe.smembers(key)
+        candidates = {int(member) for members in pipe.execute() for member in members}
+        candidates.discard(exclude)
+        if not candidates:
+            return []
+
+        candidates = sorted(candidates)
+        stored = self.client.mget([self._signature_key(c) for c in candidates])
+
+        matches = []
+        for call_id, raw in zip(candidates, stored):
+            if raw is None:
+                continue
+            similarity = estimate_similarity(
+                signature, np.frombuffer(raw, dtype=np.uint32)
+            )
+            if similarity >= DEDUP_SIMILARITY_THRESHOLD:
+                matches.append((call_id, similarity))
+
+        return sorted(matches, key=lambda match: match[1], reverse=True)
+
+
+def record_dedup_outcome(hit: bool, client=redis_client):
+    """Count reused vs. inferred calls so the saved model load can be measured."""
+    client.incr("dedup:hits" if hit else "dedup:misses")
+
+
+def get_dedup_stats(client=redis_client) -> Tuple[int, int]:
+    """Return (hits, misses) recorded so far."""
+    hits, misses = client.mget("dedup:hits", "dedup:misses")
+    return int(hits or 0), int(misses or 0)
@@ -0,0 +1,99 @@
+"""
+Deadline-aware insights processing (INSIGHTS_DEGRADATION_ENABLED).
+
+Fresh-lane tasks are enqueued with a deadline (see app.lanes.enqueue_insights).
+When a worker picks one up late, or the fresh backlog is long, it runs a
+cheaper tier so the queue drains instead of growing without bound:
+
+    full          every stage
+    no_embedding  no embedding (and so no fast sentiment)
+    minimal       no embedding, no per-turn sentiment: overall sentiment only
+
+Degraded calls are stored as completed, with sentiment_scores["degraded"]
+recording the tier, and are re-run in full on the backfill lane once the
+fresh backlog is low again (app.workers.degradation).
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import structlog
+from redis.exceptions import RedisError
+
+from app.affinity import live_nodes, node_queue
+from app.cache import redis_client
+from app.lanes import FRESH, queue_depth, queue_name
+from app.settings import (
+    INSIGHTS_AFFINITY_ENABLED,
+    INSIGHTS_DEGRADATION_ENABLED,
+    INSIGHTS_DEGRADE_BACKLOG,
+    INSIGHTS_DEGRADE_MINIMAL_BACKLOG,
+    INSIGHTS_DEGRADE_MINIMAL_SLO_SHARE,
+    INSIGHTS_DEGRADE_SLO_SHARE,
+    INSIGHTS_FRESHNESS_SLO_SECONDS,
+)
+
+logger = structlog.get_logger(__name__)
+
+FULL = "full"
+NO_EMBEDDING = "no_embedding"
+MINIMAL = "minimal"
+
+# Cheapest last
+TIERS = [FULL, NO_EMBEDDING, MINIMAL]
+DEGRADED_TIERS = TIERS[1:]
+
+# The backlog is read from Redis at most this often per process
+BACKLOG_CHECK_SECONDS = 1.0
+
+_backlog = {"depth": 0, "checked_at": 0.0}
+_backlog_lock = threading.Lock()
+
+
+def fresh_backlog(client=redis_client) -> int:
+    """Messages waiting on the fresh lane: its shared queue and every live node's queue."""
+    with _backlog_lock:
+        if time.monotonic() - _backlog["checked_at"] >= BACKLOG_CHECK_SECONDS:
+            queue = queue_name(FRESH)
+            try:
+                depth = queue_depth(queue, client)
+                if INSIGHTS_AFFINITY_ENABLED:
+                    depth += sum(
+                        queue_depth(node_queue(queue, node), client)
+                        for node in live_nodes(client=client)
+                    )
+                _backlog["depth"] = depth
+            except RedisError as e:
+                # Keep the last reading rather than degrade (or not) blindly
+                logger.error(f"Could not read insights backlog: {str(e)}")
+            _backlog["checked_at"] = time.monotonic()
+        return _backlog["depth"]
+
+
+def choose_tier(deadline: Optional[float], now: Optional[float] = None) -> str:
+    """
+    Tier for a task due by `deadline` (unix time). Tasks without one
+    (backfill, upgrades) always run in full.
+    """
+    if not INSIGHTS_DEGRADATION_ENABLED or deadline is None:
+        return FULL
+    now = time.time() if now is None else now
+    # Share of the SLO already spent waiting in the queue
+    waited = 1 - (deadline - now) / INSIGHTS_FRESHNESS_SLO_SECONDS
+    backlog = fresh_backlog()
+    if waited >= INSIGHTS_DEGRADE_MINIMAL_SLO_SHARE or backlog >= INSIGHTS_DEGRADE_MINIMAL_BACKLOG:
+        return MINIMAL
+    if waited >= INSIGHTS_DEGRADE_SLO_SHARE or backlog >= INSIGHTS_DEGRADE_BACKLOG:
+        return NO_EMBEDDING
+    return FULL
+
+
+def degraded_marker(tier: str) -> Dict:
+    """What is stored under sentiment_scores["degraded"] for a degraded call."""
+    return {
+        "tier": tier,
+        "backlog": _backlog["depth"],
+        "at": datetime.utcnow().isoformat(),
+    }
@@ -0,0 +1,122 @@
+import io
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import structlog
+
+from app.db import SessionLocal
+from app.settings import KEYWORDS_MODEL_REFRESH_SECONDS, KEYWORDS_TOP_K
+from app.transcript import Turns
+
+logger = structlog.get_logger(__name__)
+
+# Shared by the fitted TF-IDF vectorizer, the inverted index and search
+# queries, so all of them see the same terms
+VECTORIZER_PARAMS = {
+    "lowercase": True,
+    "stop_words": "english",
+    "token_pattern": r"(?u)\b[^\W\d_][^\W_]{2,}\b",
+    "sublinear_tf": True,
+}
+MAX_TERM_LENGTH = 64
+
+# Like transcript dictionaries: fitted vectorizers never change once stored,
+# only "which one is newest" is refreshed periodically
+_vectorizers = {}
+_vectorizers_lock = threading.Lock()
+_active = {"id": None, "checked_at": 0.0}
+_analyzer = []
+
+
+def analyze(text: str) -> List[str]:
+    """Tokens of `text` as indexed and searched (stop words removed)."""
+    if not _analyzer:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        _analyzer.append(TfidfVectorizer(**VECTORIZER_PARAMS).build_analyzer())
+    return [term for term in _analyzer[0](text or "") if len(term) <= MAX_TERM_LENGTH]
+
+
+def search_text(transcript: str, turns: Turns) -> str:
+    """Turn contents only, without the "speaker:" prefixes."""
+    return "\n".join(content for _, content in turns.iter_turns(transcript or ""))
+
+
+def fit_vectorizer(texts: Iterable[str], max_features: int = 100_000, min_df: int = 2):
+    """Fit a TF-IDF vectorizer on a sample of transcripts."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer(
+        max_features=max_features, min_df=min_df, dtype="float32", **VECTORIZER_PARAMS
+    )
+    vectorizer.fit(texts)
+    return vectorizer
+
+
+def dump_vectorizer(vectorizer) -> bytes:
+    import joblib
+
+    buffer = io.BytesIO()
+    joblib.dump(vectorizer, buffer, compress=3)
+    return buffer.getvalue()
+
+
+def _load_vectorizer(model_id: int):
+    import joblib
+
+    from app.models.search import DBKeywordModel
+
+    with _vectorizers_lock:
+        if model_id not in _vectorizers:
+            with SessionLocal() as db:
+                row = db.get(DBKeywordModel, model_id)
+                if row is None:
+                    raise ValueError(f"Keyword model {model_id} not found")
+                vectorizer = joblib.load(io.BytesIO(row.model))
+            _vectorizers[model_id] = (vectorizer, vectorizer.get_feature_names_out())
+        return _vectorizers[model_id]
+
+
+def active_model_id() -> Optional[int]:
+    """Id of the newest fitted vectorizer (None until one is fitted)."""
+    from app.models.search import DBKeywordModel
+
+    now = time.monotonic()
+    if now - _active["checked_at"] >= KEYWORDS_MODEL_REFRESH_SECONDS:
+        with SessionLocal() as db:
+            latest = db.query(DBKeywordModel.id).order_by(DBKeywordModel.id.desc()).first()
+        _active["id"] = latest[0] if latest else None
+        _active["checked_at"] = now
+    return _active["id"]
+
+
+def extract_keywords_batch(
+    texts: List[str], top_k: int = KEYWORDS_TOP_K
+) -> List[Optional[List[Dict]]]:
+    """
+    Top `top_k` TF-IDF terms of each text as [{"term", "score"}], computed in
+    one sparse transform. Returns None per text until a vectorizer is fitted
+    (see app.scripts.index_keywords).
+    """
+    model_id = active_model_id()
+    if model_id is None:
+        return [None] * len(texts)
+
+    vectorizer, terms = _load_vectorizer(model_id)
+    matrix = vectorizer.transform(texts).tocsr()
+    keywords = []
+    for i in range(matrix.shape[0]):
+        row = matrix.getrow(i)
+        top = row.data.argsort()[::-1][:top_k]
+        keywords.append(
+            [
+                {"term": str(terms[row.indices[j]]), "score": round(float(row.data[j]), 4)}
+                for j in top
+            ]
+        )
+    return keywords
+
+
+def extract_keywords(text: str, top_k: int = KEYWORDS_TOP_K) -> Optional[List[Dict]]:
+    return extract_keywords_batch([text], top_k)[0]
@@ -0,0 +1,162 @@
+import importlib
+import time
+from typing import Dict, List, Optional
+
+import structlog
+from redis.exceptions import RedisError
+
+from app.affinity import current_ring, node_queue
+from app.cache import redis_client
+from app.celery import celery
+from app.settings import (
+    INSIGHTS_AFFINITY_ENABLED,
+    INSIGHTS_AFFINITY_KEY,
+    INSIGHTS_AFFINITY_MAX_NODE_DEPTH,
+    INSIGHTS_BACKFILL_MAX_DEPTH,
+    INSIGHTS_BACKPRESSURE_POLL_SECONDS,
+    INSIGHTS_FRESHNESS_SLO_SECONDS,
+    INSIGHTS_LANE_SHARES,
+)
+
+logger = structlog.get_logger(__name__)
+
+GENERATE_CALL_INSIGHTS_TASK = "app.workers.insights.generate_call_insights"
+
+FRESH = "fresh"
+RETRY = "retry"
+BACKFILL = "backfill"
+
+# Most urgent first. A worker pool for a lane also consumes every lane ahead of
+# it (see lane_queues), so spare capacity always goes to fresh work first.
+LANES = [FRESH, RETRY, BACKFILL]
+
+# Celery's Redis transport stores message priorities as extra lists next to
+# the queue's own list: "<queue>\x06\x16<priority>"
+_PRIORITY_STEPS = [0, 3, 6, 9]
+
+
+def queue_name(lane: str) -> str:
+    if lane not in LANES:
+        raise ValueError(f"Unknown insights lane: {lane}")
+    return f"insights.{lane}"
+
+
+def lane_queues(lane: str, node: Optional[str] = None) -> List[str]:
+    """
+    Queues consumed by the worker pool of `lane`, in priority order. With a
+    `node`, each lane's affinity queue for that node comes before the shared one.
+    """
+    queues = []
+    for other in LANES[: LANES.index(lane) + 1]:
+        if node is not None:
+            queues.append(node_queue(queue_name(other), node))
+        queues.append(queue_name(other))
+    return queues
+
+
+def lane_shares(spec: str = INSIGHTS_LANE_SHARES) -> Dict[str, float]:
+    shares = {}
+    for part in spec.split(","):
+        lane, share = part.split(":")
+        queue_name(lane.strip())  # validate
+        shares[lane.strip()] = float(share)
+    return shares
+
+
+def lane_concurrency(total: int, spec: str = INSIGHTS_LANE_SHARES) -> Dict[str, int]:
+    """Split `total` worker processes across lanes by share (at least 1 each)."""
+    shares = lane_shares(spec)
+    weight = sum(shares.values())
+    return {
+        lane: max(1, round(total * share / weight)) for lane, share in shares.items()
+    }
+
+
+def _priority_lists(queue: str) -> List[str]:
+    return [queue if not step else f"{queue}\x06\x16{step}" for step in _PRIORITY_STEPS]
+
+
+def queue_depth(queue: str, client=redis_client) -> int:
+    pipe = client.pipeline()
+    for priority_list in _priority_lists(queue):
+        pipe.llen(priority_list)
+    return sum(pipe.execute())
+
+
+def move_messages(source: str, target: str, client=redis_client) -> int:
+    """Move every message waiting in queue `source` to `target`, keeping priorities."""
+    moved = 0
+    for source_list, target_list in zip(_priority_lists(source), _priority_lists(target)):
+        while client.rpoplpush(source_list, target_list) is not None:
+            moved += 1
+    return moved
+
+
+def wait_for_capacity(
+    lane: str, max_depth: int = INSIGHTS_BACKFILL_MAX_DEPTH, client=redis_client
+):
+    """Block while the lane's queue holds `max_depth` or more messages."""
+    queue = queue_name(lane)
+    while (depth := queue_depth(queue, client)) >= max_depth:
+        logger.info("Backpressure: waiting for queue to drain", queue=queue, depth=depth)
+        time.sleep(INSIGHTS_BACKPRESSURE_POLL_SECONDS)
+
+
+def route_queue(lane: str, affinity_key=None, client=redis_client) -> str:
+    """
+    Queue for a task of `lane`: the affinity queue of the node owning
+    `affinity_key` on the ring, or the shared lane queue when affinity is off,
+    no node is live, or the owner is backlogged.
+    """
+    queue = queue_name(lane)
+    if not INSIGHTS_AFFINITY_ENABLED or affinity_key is None:
+        return queue
+    try:
+        node = current_ring(client).node_for(affinity_key)
+        if node is None:
+            return queue
+        target = node_queue(queue, node)
+        # Also bounds what backfill can park outside the shared queue's backpressure
+        if (
+            INSIGHTS_AFFINITY_MAX_NODE_DEPTH > 0
+            and queue_depth(target, client) >= INSIGHTS_AFFINITY_MAX_NODE_DEPTH
+        ):
+            logger.debug("Affinity node backlogged, using shared queue", node=node)
+            return queue
+        return target
+    except RedisError as e:
+        logger.error(f"Affinity routing failed: {str(e)}", lane=lane)
+        return queue
+
+
+def enqueue_insights(
+    call_id: int, lane: str = FRESH, affinity_key=None, wait: bool = False
+):
+    """
+    Enqueue insights generation for a call on its lane. With `wait`, block
+    while the lane's queue is full (see wait_for_capacity). Only producer
+    scripts should wait: a Celery task blocking here would hold its worker
+    slot, starving fresh ingestion behind backfill.
+
+    `affinity_key` (see app.affinity) defaults to the call_id when
+    INSIGHTS_AFFINITY_KEY is "call_id". Fresh tasks carry the deadline of
+    their freshness SLO (see app.degradation).
+    """
+    kwargs = {"call_id": call_id}
+    if lane == FRESH and INSIGHTS_FRESHNESS_SLO_SECONDS > 0:
+        kwargs["deadline"] = time.time() + INSIGHTS_FRESHNESS_SLO_SECONDS
+
+    if celery.conf.task_always_eager:
+        # In-process execution (e.g. the load harness): run the task right here
+        importlib.import_module("app.workers.insights")
+        return celery.tasks[GENERATE_CALL_INSIGHTS_TASK].apply(kwargs=kwargs)
+
+    if wait and lane == BACKFILL:
+        wait_for_capacity(lane)
+    if affinity_key is None and INSIGHTS_AFFINITY_KEY == "call_id":
+        affinity_key = call_id
+    return celery.send_task(
+        GENERATE_CALL_INSIGHTS_TASK,
+        kwargs=kwargs,
+        queue=route_queue(lane, affinity_key),
+    )
@@ -0,0 +1,163 @@
+import asyncio
+from collections import deque
+from functools import partial
+from typing import Dict, Tuple
+
+import numpy as np
+import structlog
+
+from app.batching import MicroBatcher
+from app.models.calls import CallRepository
+from app.settings import (
+    LIVE_BATCH_MAX_LATENCY_MS,
+    LIVE_BATCH_MAX_SIZE,
+    LIVE_SENTIMENT_WINDOW,
+)
+from app.workers.insights import (
+    analyze_sentiment_batch,
+    generate_embeddings_batch,
+    remove_filler_words,
+)
+from app.workers.registry import registry
+
+logger = structlog.get_logger(__name__)
+
+SPEAKERS = ("agent", "customer")
+
+# One batcher per (kind, language key), shared by all live calls in this process
+_batchers: Dict[Tuple[str, str], MicroBatcher] = {}
+
+
+def _embed_batch(texts, language):
+    return list(generate_embeddings_batch(texts, language))
+
+
+def get_batcher(kind: str, language: str) -> MicroBatcher:
+    # Languages without models of their own share the fallback's batcher
+    language = registry.language_key(language)
+    key = (kind, language)
+    if key not in _batchers:
+        batch_fn = analyze_sentiment_batch if kind == "sentiment" else _embed_batch
+        _batchers[key] = MicroBatcher(
+            partial(batch_fn, language=language),
+            max_batch_size=LIVE_BATCH_MAX_SIZE,
+            max_latency_ms=LIVE_BATCH_MAX_LATENCY_MS,
+        )
+    return _batchers[key]
+
+
+class LiveCallState:
+    """
+    Running insights for a call in progress. Every update is O(turn): word
+    counts and sentiment sums are kept as running totals and the embedding
+    as an incremental mean, so nothing is recomputed over the whole call.
+    """
+
+    def __init__(self, call_id: int, language: str = "en", window: int = LIVE_SENTIMENT_WINDOW):
+        self.call_id = call_id
+        self.language = language
+        self.turns = 0
+        self.agent_words = 0
+        self.customer_words = 0
+
+        self._recent = deque(maxlen=window)
+        self._recent_sum = 0.0
+        self._sentiment_sum = 0.0
+        self._sentiment_count = 0
+
+        self.mean_embedding = None
+        self._embedded = 0
+
+    async def add_turn(self, speaker: str, text: str):
+        speaker = (speaker or "").lower()
+        if speaker not in SPEAKERS:
+            raise ValueError(f"Unknown speaker: {speaker!r}")
+
+        cleaned = remove_filler_words((text or "").lower())
+        self.turns += 1
+        word_count = len(cleaned.split())
+        if speaker == "agent":
+            self.agent_words += word_count
+        else:
+            self.customer_words += word_count
+
+        if not cleaned:
+            return
+
+        sentiment, embedding = await asyncio.gather(
+            get_batcher("sentiment", self.language).submit(cleaned),
+            get_batcher("embedding", self.language).submit(cleaned),
+        )
+        self._add_sentiment(sentiment["score"])
+        self._add_embedding(np.asarray(embedding, dtype=np.float32))
+
+    def _add_sentiment(self, score: float):
+        if len(self._recent) == self._recent.maxlen:
+            self._recent_sum -= self._recent[0]
+        self._recent.append(score)
+        self._recent_sum += score
+
+        self._sentiment_sum += score
+        self._sentiment_count += 1
+
+    def _add_embedding(self, embedding: np.ndarray):
+        self._embedded += 1
+        if self.mean_embedding is None:
+            self.mean_embedding = embedding.copy()
+        else:
+            self.mean_embedding += (embedding - self.mean_embedding) / self._embedded
+
+    @property
+    def agent_talk_ratio(self) -> float:
+        total_words = self.agent_words + self.customer_words
+        return self.agent_words / total_words if total_words > 0 else 0.0
+
+    @property
+    def rolling_sentiment(self) -> float:
+        return self._recent_sum / len(self._recent) if self._recent else 0.0
+
+    @property
+    def sentiment_score(self) -> float:
+        if not self._sentiment_count:
+            return 0.0
+        return self._sentiment_sum / self._sentiment_count
+
+    def sentiment_scores(self) -> Dict:
+        score = self.sentiment_score
+        label = "POSITIVE" if score > 0 else "NEGATIVE" if score < 0 else "NEUTRAL"
+        return {
+            "overall": {"label": label, "score": score},
+            "live": {
+                "rolling_score": self.rolling_sentiment,
+                "window": self._recent.maxlen,
+                "turns": self.turns,
+            },
+        }
+
+    def insights(self, include_embedding: bool = False) -> Dict:
+        insights = {
+            "call_id": self.call_id,
+            "turns": self.turns,
+            "agent_talk_ratio": self.agent_talk_ratio,
+            "sentiment_score": self.sentiment_score,
+            "rolling_sentiment": self.rolling_sentiment,
+        }
+        if include_embedding:
+            insights["embedding"] = self.embedding()
+        return insights
+
+    def embedding(self) -> list:
+        return [] if self.mean_embedding is None else self.mean_embedding.tolist()
+
+
+def persist_live_call(state: LiveCallState):
+    """Store the final live-call state as the call's insights."""
+    CallRepository().update_insights(
+        call_id=state.call_id,
+        agent_talk_ratio=state.agent_talk_ratio,
+        sentiment_score=state.sentiment_score,
+        sentiment_scores=state.sentiment_scores(),
+        embedding=state.embedding(),
+        status="completed",
+    )
+    logger.info("Persisted live call insights", call_id=state.call_id, turns=state.turns)
@@ -1,24 +1,354 @@
+"""
+structlog setup for the API and the workers.
+
+Log calls do as little as possible on the calling thread: level filtering,
+sampling and rate limiting decide early whether an event is kept, and kept
+events are handed to a bounded in-memory queue. A writer thread resolves
+lazy fields, truncates large values, renders JSON and writes it out. When
+the queue is full, events are dropped (and counted) rather than blocking.
+Records from stdlib loggers (SQLAlchemy, Celery, uvicorn) join the same queue.
+
+Hot-path events should use a constant event name with the variable parts as
+fields (`logger.info("Saved call", call_id=...)`): the name is what sampling
+and rate limits are keyed on, and nothing is formatted for filtered events.
+Expensive fields can be wrapped in `Lazy` so they are only computed for
+events that are actually written.
+"""
+
+import atexit
+import json
 import logging
+import os
+import queue
+import random
 import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
 import structlog
 
-logging.basicConfig(
-    format="%(message)s",
-    stream=sys.stdout,
-    level=logging.INFO,
+from app.settings import (
+    LOG_LEVEL,
+    LOG_MAX_FIELD_LENGTH,
+    LOG_QUEUE_ENABLED,
+    LOG_QUEUE_SIZE,
+    LOG_RATE_LIMIT_PER_SECOND,
+    LOG_SAMPLE_RATES,
 )
 
-structlog.configure(
-    processors=[
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.add_log_level,
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.JSONRenderer(),
-    ],
-    wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
-    context_class=dict,
-    cache_logger_on_first_use=True,
-)
+# Lists longer than this are cut when rendered
+MAX_LIST_ITEMS = 50
+
+_state = {"writer": None, "config": None}
+
+
+class Lazy:
+    """A log field computed only if the event is written (on the writer thread)."""
+
+    __slots__ = ("fn",)
+
+    def __init__(self, fn: Callable[[], Any]):
+        self.fn = fn
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """"event=rate,..." -> {event: rate}; "*" sets the default for INFO and below."""
+    rates = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        event, rate = part.rsplit("=", 1)
+        rates[event.strip()] = float(rate)
+    return rates
+
+
+class SampleEvents:
+    """Keep a fraction of INFO/DEBUG events per event name. Warnings and errors are never sampled."""
+
+    def __init__(self, rates: Dict[str, float]):
+        self.rates = rates
+        self.default = rates.get("*", 1.0)
+
+    def __call__(self, logger, method_name: str, event_dict: Dict) -> Dict:
+        if method_name not in ("debug", "info"):
+            return event_dict
+        rate = self.rates.get(event_dict.get("event"), self.default)
+        if rate >= 1.0:
+            return event_dict
+        if random.random() >= rate:
+            raise structlog.DropEvent
+        event_dict["sample_rate"] = rate
+        return event_dict
+
+
+class RateLimitEvents:
+    """
+    Token bucket per (level, event name): at most `per_second` events per
+    second, with bursts of as many. The next event let through reports how
+    many were suppressed.
+    """
+
+    def __init__(self, per_second: float):
+        self.per_second = per_second
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, logger, method_name: str, event_dict: Dict) -> Dict:
+        if self.per_second <= 0:
+            return event_dict
+        key = (method_name, event_dict.get("event"))
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, suppressed = self._buckets.get(
+                key, (self.per_second, now, 0)
+            )
+            tokens = min(self.per_second, tokens + (now - updated) * self.per_second)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                raise structlog.DropEvent
+            self._buckets[key] = (tokens - 1, now, 0)
+        if suppressed:
+            event_dict["suppressed"] = suppressed
+        return event_dict
+
+
+_SCALARS = (int, float, bool, type(None))
+
+
+def _truncate(value: Any, limit: int) -> Any:
+    if type(value) in _SCALARS:
+        return value
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}...(+{len(value) - limit} chars)"
+    if isinstance(value, bytes) and len(value) > limit:
+        return f"<{len(value)} bytes>"
+    if isinstance(value, dict):
+        return {key: _truncate(item, limit) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [_truncate(item, limit) for item in value[:MAX_LIST_ITEMS]]
+        if len(value) > MAX_LIST_ITEMS:
+            items.append(f"...(+{len(value) - MAX_LIST_ITEMS} items)")
+        return items
+    return value
+
+
+class TruncateFields:
+    """Cut long strings and lists in event fields (tracebacks are kept whole)."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+
+    def __call__(self, logger, method_name: str, event_dict: Dict) -> Dict:
+        if self.limit <= 0:
+            return event_dict
+        return {
+            key: value if key == "exception" else _truncate(value, self.limit)
+            for key, value in event_dict.items()
+        }
+
+
+def resolve_lazy_fields(logger, method_name: str, event_dict: Dict) -> Dict:
+    for key, value in event_dict.items():
+        if isinstance(value, Lazy):
+            try:
+                event_dict[key] = value.fn()
+            except Exception as e:
+                event_dict[key] = f"<lazy field failed: {e!r}>"
+    return event_dict
+
+
+def add_timestamp(logger, method_name: str, event_dict: Dict) -> Dict:
+    # Taken on the calling thread as a float, rendered later
+    event_dict["timestamp"] = time.time()
+    return event_dict
+
+
+def render_timestamp(logger, method_name: str, event_dict: Dict) -> Dict:
+    timestamp = event_dict.get("timestamp")
+    if isinstance(timestamp, float):
+        event_dict["timestamp"] = (
+            datetime.fromtimestamp(timestamp, timezone.utc)
+            .isoformat()
+            .replace("+00:00", "Z")
+        )
+    return event_dict
+
+
+class LogWriter:
+    """
+    Renders event dicts as JSON lines. With a queue, a daemon thread renders
+    and writes them; `submit` never blocks and drops events (counting them)
+    when the queue is full. Without one, events are written synchronously.
+    """
+
+    _STOP = object()
+
+    def __init__(self, stream, max_field_length: int, queue_size: int = 0):
+        self.stream = stream
+        self.processors = [
+            resolve_lazy_fields,
+            render_timestamp,
+            TruncateFields(max_field_length),
+            structlog.processors.JSONRenderer(default=repr),
+        ]
+        # Approximate under contention; only used for reporting
+        self.dropped = 0
+        self.queue = queue.Queue(maxsize=queue_size) if queue_size > 0 else None
+        self._thread = None
+        if self.queue is not None:
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def write(self, event_dict: Dict):
+        try:
+            for processor in self.processors:
+                event_dict = processor(None, "", event_dict)
+        except Exception as e:
+            event_dict = json.dumps({"event": "Log rendering failed", "error": repr(e)})
+        self.stream.write(event_dict + "\n")
+
+    def submit(self, event_dict: Dict):
+        if self.queue is None:
+            self.write(event_dict)
+            self.stream.flush()
+            return
+        if self.dropped:
+            # Reported on the next event that makes it into the queue
+            event_dict["log_records_dropped"] = self.dropped
+        try:
+            self.queue.put_nowait(event_dict)
+        except queue.Full:
+            self.dropped += 1
+            return
+        self.dropped = 0
+
+    def _run(self):
+        while True:
+            event_dict = self.queue.get()
+            if event_dict is self._STOP:
+                break
+            self.write(event_dict)
+            if self.queue.empty():
+                self.stream.flush()
+        self.stream.flush()
+
+    def stop(self):
+        """Write out everything queued and stop the thread."""
+        if self._thread is not None:
+            self.queue.put(self._STOP)
+            self._thread.join()
+            self._thread = None
+
+
+class WriterLogger:
+    """structlog logger that hands event dicts to the current LogWriter."""
+
+    def msg(self, event_dict: Dict):
+        _state["writer"].submit(event_dict)
+
+    log = debug = info = warn = warning = error = critical = exception = fatal = msg
+
+
+def _to_writer(logger, method_name: str, event_dict: Dict):
+    return (event_dict,), {}
+
+
+class StdlibHandler(logging.Handler):
+    """Routes records of stdlib loggers (SQLAlchemy, Celery, uvicorn) to the writer."""
+
+    _formatter = logging.Formatter()
+
+    def emit(self, record: logging.LogRecord):
+        event_dict = {
+            "event": record.getMessage(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "timestamp": record.created,
+        }
+        if record.exc_info:
+            event_dict["exception"] = self._formatter.formatException(record.exc_info)
+        _state["writer"].submit(event_dict)
+
+
+def _new_writer() -> LogWriter:
+    config = _state["config"]
+    return LogWriter(
+        config["stream"],
+        config["max_field_length"],
+        config["queue_size"] if config["use_queue"] else 0,
+    )
+
+
+def stop_logging():
+    """Flush queued events and stop the writer thread; later events are written synchronously."""
+    writer = _state["writer"]
+    if writer is not None and writer.queue is not None:
+        writer.stop()
+        config = _state["config"]
+        _state["writer"] = LogWriter(config["stream"], config["max_field_length"])
+
+
+def _restart_after_fork():
+    # Threads don't survive fork (Celery's prefork pool): give the child its own
+    # queue and writer thread instead of inheriting a queue nobody drains
+    if _state["config"] is not None:
+        _state["writer"] = _new_writer()
+
+
+def configure_logging(
+    level: str = LOG_LEVEL,
+    use_queue: bool = LOG_QUEUE_ENABLED,
+    sample_rates: Optional[Dict[str, float]] = None,
+    rate_limit_per_second: float = LOG_RATE_LIMIT_PER_SECOND,
+    max_field_length: int = LOG_MAX_FIELD_LENGTH,
+    stream=None,
+):
+    """Configure structlog and stdlib logging. Safe to call more than once."""
+    stop_logging()
+    level_number = logging.getLevelName(level.upper())
+    sample_rates = (
+        parse_sample_rates(LOG_SAMPLE_RATES) if sample_rates is None else sample_rates
+    )
+    _state["config"] = {
+        "stream": stream or sys.stdout,
+        "max_field_length": max_field_length,
+        "use_queue": use_queue,
+        "queue_size": LOG_QUEUE_SIZE,
+    }
+    _state["writer"] = _new_writer()
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(StdlibHandler())
+    root.setLevel(level_number)
+
+    structlog.configure(
+        processors=[
+            SampleEvents(sample_rates),
+            RateLimitEvents(rate_limit_per_second),
+            structlog.processors.add_log_level,
+            add_timestamp,
+            # Tracebacks have to be captured on the thread that raised
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            _to_writer,
+        ],
+        logger_factory=lambda *args: _writer_logger,
+        wrapper_class=structlog.make_filtering_bound_logger(level_number),
+        context_class=dict,
+        cache_logger_on_first_use=True,
+    )
+
+
+_writer_logger = WriterLogger()
+
+if not _state.get("registered"):
+    _state["registered"] = True
+    atexit.register(stop_logging)
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+configure_logging()
 
 logger = structlog.get_logger()
@@ -1,6 +1,25 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+
+import app.logging  # noqa: F401  (configures logging)
 from app.router import router
+from app.scoring import warm_up
+from app.settings import INSIGHTS_SCORE_WARMUP_LANGUAGES
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep model loading out of the first /insights:score requests
+    languages = [
+        language.strip()
+        for language in INSIGHTS_SCORE_WARMUP_LANGUAGES.split(",")
+        if language.strip()
+    ]
+    await run_in_threadpool(warm_up, languages)
+    yield
 
 
-app = FastAPI(title="Transcript Sentiment Analysis API")
+app = FastAPI(title="Transcript Sentiment Analysis API", lifespan=lifespan)
 app.include_router(router)
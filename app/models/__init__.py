@@ -1,4 +1,22 @@
+from app.models.backfill import DBBackfillProgress
 from app.models.calls import DBCall
+from app.models.compression import DBTranscriptDictionary
+from app.models.search import (
+    DBKeywordModel,
+    DBSearchDocument,
+    DBSearchPosting,
+    DBSearchTerm,
+)
+from app.models.sentiment import DBSentimentHead
 
 
-__all__ = ['DBCall']
+__all__ = [
+    'DBBackfillProgress',
+    'DBCall',
+    'DBTranscriptDictionary',
+    'DBKeywordModel',
+    'DBSearchDocument',
+    'DBSearchPosting',
+    'DBSearchTerm',
+    'DBSentimentHead',
+]
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+
+from app.db import Base
+
+
+class DBBackfillProgress(Base):
+    """Where each online backfill (app.backfill.OnlineBackfill) got to."""
+
+    __tablename__ = "backfill_progress"
+
+    name = Column(String(100), primary_key=True)
+    last_id = Column(
+        Integer, nullable=False, default=0, comment="Rows with id <= last_id are done"
+    )
+    max_id = Column(
+        Integer,
+        nullable=True,
+        comment="Highest id when the backfill started; newer rows are dual-written",
+    )
+    rows_updated = Column(Integer, nullable=False, default=0)
+    batches = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
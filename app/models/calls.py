@@ -1,11 +1,59 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, JSON
-from datetime import datetime
+from sqlalchemy import (
+    Column,
+    Computed,
+    Index,
+    Integer,
+    String,
+    Text,
+    DateTime,
+    Float,
+    JSON,
+    LargeBinary,
+    bindparam,
+    cast,
+    column,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    text,
+    type_coerce,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred, undefer_group
+from datetime import datetime, timedelta
+import json
+import re
+from typing import Dict, Iterable, List, Optional
 
+from app.cache import invalidate_aggregates, invalidate_call, invalidate_calls
+from app.compression import compress_transcript, decompress_transcript
 from app.db import Base, SessionLocal
-from sqlalchemy.exc import SQLAlchemyError
+from app.settings import CALLS_PARTITION_MONTHS_AHEAD
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+# Bounds of a monthly partition as reported by pg_get_expr(relpartbound)
+PARTITION_BOUND = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+# Label of the last customer segment in sentiment_scores (Postgres). Queries
+# must use this exact expression to match ix_calls_final_customer_label_start_time.
+FINAL_CUSTOMER_LABEL_SQL = (
+    "((jsonb_path_query_array(sentiment_scores, "
+    "'$.segments[*] ? (@.speaker == \"customer\")') -> -1) ->> 'label')"
+)
 
 
 class DBCall(Base):
+    """
+    On Postgres `calls` is range-partitioned by month on start_time (see the
+    3a7c5e9f1b26 migration): its primary key is (id, start_time) and call_id
+    uniqueness is enforced through the `call_ids` registry table, since a
+    partitioned table can't have a unique index without the partition key.
+    """
+
     __tablename__ = "calls"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -14,9 +62,31 @@ class DBCall(Base):
     agent_id = Column(Integer)
     customer_id = Column(Integer, index=True)
     language = Column(String)
-    start_time = Column(DateTime, index=True)
+    start_time = Column(DateTime, index=True, nullable=False)
     duration_seconds = Column(Integer)
-    transcript = Column(Text)
+
+    # The transcript is stored either as plain text or zstd-compressed with a
+    # trained dictionary; use the `transcript` property to read/write it.
+    # Both columns are deferred so listing calls doesn't load transcripts.
+    transcript_text = deferred(Column("transcript", Text), group="transcript")
+    transcript_zstd = deferred(
+        Column(
+            LargeBinary,
+            nullable=True,
+            comment="Transcript compressed with zstd using transcript_dict_id",
+        ),
+        group="transcript",
+    )
+    transcript_dict_id = Column(
+        Integer,
+        nullable=True,
+        comment="transcript_dictionaries.id used to compress transcript_zstd",
+    )
+    turns = Column(
+        JSON,
+        nullable=True,
+        comment="Transcript turns: speaker codes, content offsets and word counts",
+    )
 
     # Insights
     agent_talk_ratio = Column(
@@ -28,11 +98,30 @@ class DBCall(Base):
         comment="Overall sentiment score from -1 (negative) to 1 (positive)",
     )
     sentiment_scores = Column(
-        JSON, nullable=True, comment="Detailed sentiment scores for different segments"
+        JSON().with_variant(JSONB(), "postgresql"),
+        nullable=True,
+        comment="Detailed sentiment scores for different segments",
+    )
+    # Hot keys of sentiment_scores, kept by the database so they can be indexed
+    sentiment_label = Column(
+        String(16),
+        Computed("sentiment_scores -> 'overall' ->> 'label'", persisted=True),
+        comment="Overall sentiment label (generated from sentiment_scores)",
+    )
+    sentiment_confidence = Column(
+        Float,
+        Computed(
+            "CAST(sentiment_scores -> 'overall' ->> 'confidence' AS FLOAT)",
+            persisted=True,
+        ),
+        comment="Overall sentiment confidence (generated from sentiment_scores)",
     )
     embedding = Column(
         Text, nullable=True, comment="Sentence embeddings for the call transcript"
     )
+    keywords = Column(
+        JSON, nullable=True, comment="Top TF-IDF terms: [{term, score}]"
+    )
     processed_at = Column(
         DateTime, nullable=True, comment="When the call was processed for insights"
     )
@@ -42,6 +131,165 @@ class DBCall(Base):
         comment="Status of insight processing: pending, processing, completed, failed",
     )
 
+    __table_args__ = (
+        Index("ix_calls_sentiment_label_confidence", "sentiment_label", "sentiment_confidence"),
+        Index("ix_calls_sentiment_label_start_time", "sentiment_label", "start_time"),
+        # Containment (@>) queries on any key of sentiment_scores
+        Index(
+            "ix_calls_sentiment_scores",
+            "sentiment_scores",
+            postgresql_using="gin",
+            postgresql_ops={"sentiment_scores": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_calls_final_customer_label_start_time",
+            text(FINAL_CUSTOMER_LABEL_SQL),
+            "start_time",
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    @property
+    def transcript(self) -> str:
+        """Transcript text, decompressed transparently when stored compressed."""
+        if "_transcript" not in self.__dict__:
+            if self.transcript_zstd is not None:
+                self.__dict__["_transcript"] = decompress_transcript(
+                    self.transcript_zstd, self.transcript_dict_id
+                )
+            else:
+                self.__dict__["_transcript"] = self.transcript_text
+        return self.__dict__["_transcript"]
+
+    @transcript.setter
+    def transcript(self, value: str):
+        data, dict_id = compress_transcript(value)
+        self.transcript_zstd = data
+        self.transcript_dict_id = dict_id
+        self.transcript_text = value if data is None else None
+        self.__dict__["_transcript"] = value
+
+    def copy_transcript_from(self, other: "DBCall"):
+        """Copy the stored transcript as-is, without recompressing it."""
+        self.transcript_text = other.transcript_text
+        self.transcript_zstd = other.transcript_zstd
+        self.transcript_dict_id = other.transcript_dict_id
+        if "_transcript" in other.__dict__:
+            self.__dict__["_transcript"] = other.__dict__["_transcript"]
+
+
+def serialize_embedding(embedding) -> str:
+    """Store embeddings as JSON text in the `embedding` column."""
+    if isinstance(embedding, str):
+        return embedding
+    return json.dumps([float(value) for value in embedding])
+
+
+def parse_embedding(value) -> List[float]:
+    """
+    Read an `embedding` column value. Accepts JSON ("[...]") as well as the
+    Postgres array literal ("{...}") that list values used to be stored as.
+    """
+    if not value:
+        return []
+    value = value.strip()
+    if value.startswith("{"):
+        inner = value[1:-1].strip()
+        return [float(v) for v in inner.split(",")] if inner else []
+    return [float(v) for v in json.loads(value)]
+
+
+# Columns bulk_upsert_calls / bulk_update_insights may set (besides call_id)
+CALL_FIELDS = (
+    "agent_id",
+    "customer_id",
+    "language",
+    "start_time",
+    "duration_seconds",
+    "turns",
+)
+INSIGHT_FIELDS = (
+    "agent_talk_ratio",
+    "sentiment_score",
+    "sentiment_scores",
+    "embedding",
+    "keywords",
+    "processing_status",
+    "processed_at",
+)
+
+# Bound parameters per statement stay under the drivers' limits (32766 on SQLite)
+MAX_BULK_PARAMETERS = 30_000
+
+
+def _call_row(record: Dict, fields: Iterable[str]) -> Dict:
+    """A `calls` table row from a record of DBCall attributes."""
+    row = {"call_id": record["call_id"]}
+    row.update({field: record[field] for field in fields if field in record})
+    if row.get("embedding") is not None:
+        row["embedding"] = serialize_embedding(row["embedding"])
+    if "transcript" in record:
+        data, dict_id = compress_transcript(record["transcript"])
+        row["transcript"] = record["transcript"] if data is None else None
+        row["transcript_zstd"] = data
+        row["transcript_dict_id"] = dict_id
+    return row
+
+
+def _by_columns(rows: List[Dict]) -> Dict[tuple, List[Dict]]:
+    """Rows grouped by the columns they set; each group is one statement."""
+    groups = {}
+    for row in sorted(rows, key=lambda row: row["call_id"]):
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return groups
+
+
+def _chunks(rows: List[Dict], columns: tuple):
+    size = max(1, MAX_BULK_PARAMETERS // len(columns))
+    for start in range(0, len(rows), size):
+        yield rows[start : start + size]
+
+
+def _update_by_call_id(db, rows: List[Dict]) -> List[int]:
+    """
+    Update calls from rows keyed by call_id; returns the call_ids updated.
+    On Postgres each group of rows is a single UPDATE ... FROM (VALUES ...).
+    Rows with nothing but a call_id set nothing and are returned if the call exists.
+    """
+    calls = DBCall.__table__
+    updated = []
+    for columns, group in _by_columns(rows).items():
+        names = [name for name in columns if name != "call_id"]
+        for chunk in _chunks(group, columns):
+            if names and db.bind.dialect.name != "postgresql":
+                # No VALUES column aliases on SQLite; in-process, so executemany is cheap
+                db.execute(
+                    update(calls)
+                    .where(calls.c.call_id == bindparam("key_call_id"))
+                    .values({name: bindparam(f"key_{name}") for name in names}),
+                    [{f"key_{name}": row[name] for name in columns} for row in chunk],
+                )
+            if not names or db.bind.dialect.name != "postgresql":
+                updated.extend(
+                    db.scalars(
+                        select(calls.c.call_id).where(
+                            calls.c.call_id.in_([row["call_id"] for row in chunk])
+                        )
+                    )
+                )
+                continue
+            source = values(
+                *(column(name, calls.c[name].type) for name in columns), name="source"
+            ).data([tuple(row[name] for name in columns) for row in chunk])
+            updated.extend(
+                db.scalars(
+                    update(calls)
+                    .where(calls.c.call_id == source.c.call_id)
+                    .values({name: cast(source.c[name], calls.c[name].type) for name in names})
+                    .returning(calls.c.call_id)
+                )
+            )
+    return updated
+
 
 class CallRepository:
     def __init__(self, session_factory=SessionLocal):
@@ -65,9 +313,119 @@ class CallRepository:
                 db.rollback()
                 raise e
 
-    def get(self, call_id: int) -> DBCall:
+    def get(self, call_id: int, with_transcript: bool = True) -> DBCall:
         with self.session_factory() as db:
-            return db.query(DBCall).filter_by(call_id=call_id).first()
+            query = db.query(DBCall).filter_by(call_id=call_id)
+            if with_transcript:
+                query = query.options(undefer_group("transcript"))
+            return query.first()
+
+    def aggregate(self, start: datetime, end: datetime) -> dict:
+        """
+        Aggregate insights over calls with start_time in [start, end).
+        """
+        with self.session_factory() as db:
+            rows = (
+                db.query(
+                    DBCall.processing_status,
+                    func.count(DBCall.id),
+                    func.avg(DBCall.sentiment_score),
+                    func.avg(DBCall.agent_talk_ratio),
+                )
+                .filter(DBCall.start_time >= start, DBCall.start_time < end)
+                .group_by(DBCall.processing_status)
+                .all()
+            )
+
+        total = sum(count for _, count, _, _ in rows)
+        completed = [row for row in rows if row[0] == "completed"]
+        _, completed_count, avg_sentiment, avg_talk_ratio = (
+            completed[0] if completed else (None, 0, None, None)
+        )
+        return {
+            "total_calls": total,
+            "completed_calls": completed_count,
+            "status_counts": {status: count for status, count, _, _ in rows},
+            "avg_sentiment_score": avg_sentiment,
+            "avg_agent_talk_ratio": avg_talk_ratio,
+        }
+
+    def _find(self, *criteria, start: datetime = None, end: datetime = None, limit: int = 100):
+        with self.session_factory() as db:
+            query = db.query(DBCall).filter(*criteria)
+            if start is not None:
+                query = query.filter(DBCall.start_time >= start)
+            if end is not None:
+                query = query.filter(DBCall.start_time < end)
+            return query.order_by(DBCall.start_time.desc()).limit(limit).all()
+
+    def find_by_sentiment(
+        self,
+        label: str,
+        min_confidence: Optional[float] = None,
+        start: datetime = None,
+        end: datetime = None,
+        limit: int = 100,
+    ) -> List[DBCall]:
+        """
+        Calls whose overall sentiment is `label` (with at least
+        `min_confidence`), newest first. Filters on the generated
+        sentiment_label / sentiment_confidence columns and their indexes.
+        """
+        criteria = [DBCall.sentiment_label == label.upper()]
+        if min_confidence is not None:
+            criteria.append(DBCall.sentiment_confidence > min_confidence)
+        return self._find(*criteria, start=start, end=end, limit=limit)
+
+    def find_by_segment(
+        self,
+        speaker: str,
+        label: str,
+        start: datetime = None,
+        end: datetime = None,
+        limit: int = 100,
+    ) -> List[DBCall]:
+        """
+        Calls with any `speaker` segment labelled `label`, newest first
+        (Postgres only: a containment query on the sentiment_scores GIN index).
+        """
+        segment = {"segments": [{"speaker": speaker, "label": label.upper()}]}
+        return self._find(
+            type_coerce(DBCall.sentiment_scores, JSONB).contains(segment),
+            start=start,
+            end=end,
+            limit=limit,
+        )
+
+    def find_by_final_customer_label(
+        self,
+        label: str = "NEGATIVE",
+        start: datetime = None,
+        end: datetime = None,
+        limit: int = 100,
+    ) -> List[DBCall]:
+        """
+        Calls whose last customer segment is labelled `label`, e.g. calls that
+        ended with the customer negative, newest first (Postgres only).
+        """
+        return self._find(
+            literal_column(FINAL_CUSTOMER_LABEL_SQL)
+            == bindparam("final_customer_label", label.upper()),
+            start=start,
+            end=end,
+            limit=limit,
+        )
+
+    def find_degraded(self, tiers: List[str], limit: int = 100) -> List[DBCall]:
+        """
+        Calls processed at one of the degraded `tiers` (app.degradation),
+        newest first (Postgres only: containment on the sentiment_scores GIN index).
+        """
+        scores = type_coerce(DBCall.sentiment_scores, JSONB)
+        return self._find(
+            or_(*(scores.contains({"degraded": {"tier": tier}}) for tier in tiers)),
+            limit=limit,
+        )
 
     def update(self, db_call):
         with self.session_factory() as db:
@@ -86,6 +444,7 @@ class CallRepository:
         sentiment_score: float = None,
         sentiment_scores: dict = None,
         embedding: list = None,
+        keywords: list = None,
         status: str = "completed",
     ) -> DBCall:
         """
@@ -97,6 +456,7 @@ class CallRepository:
             sentiment_score: Overall sentiment score (-1 to 1)
             sentiment_scores: Detailed sentiment scores
             embedding: Sentence embeddings
+            keywords: Top TF-IDF terms of the transcript
             status: Processing status (pending, processing, completed, failed)
 
         Returns:
@@ -115,12 +475,18 @@ class CallRepository:
                 if sentiment_scores is not None:
                     call.sentiment_scores = sentiment_scores
                 if embedding is not None:
-                    call.embedding = embedding
+                    call.embedding = serialize_embedding(embedding)
+                if keywords is not None:
+                    call.keywords = keywords
 
+                # Aggregates count calls per status and average completed ones;
+                # a write that changes neither leaves them cached
+                aggregates = status != call.processing_status or status == "completed"
                 call.processing_status = status
                 call.processed_at = datetime.utcnow()
 
                 db.commit()
+                invalidate_call(call_id, aggregates=aggregates)
                 db.refresh(call)
                 return call
 
@@ -147,26 +513,180 @@ class CallRepository:
                     existing_call.language = db_call.language
                     existing_call.start_time = db_call.start_time
                     existing_call.duration_seconds = db_call.duration_seconds
-                    existing_call.transcript = db_call.transcript
-                    existing_call.agent_talk_ratio = db_call.agent_talk_ratio
-                    existing_call.sentiment_score = db_call.sentiment_score
+                    existing_call.copy_transcript_from(db_call)
+                    existing_call.turns = db_call.turns
                     existing_call.agent_talk_ratio = db_call.agent_talk_ratio
                     existing_call.sentiment_score = db_call.sentiment_score
                     existing_call.sentiment_scores = db_call.sentiment_scores
                     existing_call.embedding = db_call.embedding
+                    existing_call.keywords = db_call.keywords
                     existing_call.processed_at = db_call.processed_at
                     existing_call.processing_status = db_call.processing_status
 
                     db.commit()
+                    invalidate_call(existing_call.call_id)
                     db.refresh(existing_call)
                     return existing_call
                 else:
                     # Create new call
                     db.add(db_call)
                     db.commit()
+                    invalidate_call(db_call.call_id)
                     db.refresh(db_call)
                     return db_call
 
             except SQLAlchemyError as e:
                 db.rollback()
                 raise e
+
+    def bulk_upsert_calls(self, records: List[Dict]) -> Dict[str, int]:
+        """
+        Insert or update calls, given as dicts of DBCall attributes (call_id,
+        the CALL_FIELDS and INSIGHT_FIELDS, "transcript" as text), in one
+        transaction without loading or refreshing any row. Records of calls
+        that exist may be partial; new calls need every non-null column.
+
+        On Postgres `calls` is partitioned and call_id uniqueness lives in the
+        call_ids registry, so there is no index INSERT ... ON CONFLICT could
+        arbitrate on. Existing calls are instead updated with one
+        UPDATE ... FROM (VALUES ...) and the rest inserted with one multi-row
+        INSERT (SQLite takes the same path). A call inserted concurrently by
+        another writer fails the batch on call_id, which is then retried once
+        and updates it.
+
+        Returns {"inserted": n, "updated": m}.
+        """
+        if not records:
+            return {"inserted": 0, "updated": 0}
+        rows = [_call_row(record, CALL_FIELDS + INSIGHT_FIELDS) for record in records]
+        calls = DBCall.__table__
+
+        for attempt in range(2):
+            with self.session_factory() as db:
+                try:
+                    existing = set(_update_by_call_id(db, rows))
+                    new_rows = [row for row in rows if row["call_id"] not in existing]
+                    for columns, group in _by_columns(new_rows).items():
+                        for chunk in _chunks(group, columns):
+                            db.execute(insert(calls).values(chunk))
+                    db.commit()
+                    break
+                except IntegrityError as e:
+                    db.rollback()
+                    if attempt == 1:
+                        raise e
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    raise e
+
+        invalidate_calls([row["call_id"] for row in rows])
+        return {"inserted": len(new_rows), "updated": len(existing)}
+
+    def bulk_update_insights(self, results: List[Dict]) -> int:
+        """
+        Store insights for many calls in one transaction: dicts with call_id
+        and any of INSIGHT_FIELDS (processing_status defaults to "completed",
+        processed_at to now). Calls setting the same fields share a single
+        UPDATE ... FROM (VALUES ...). Returns the number of calls updated.
+        """
+        if not results:
+            return 0
+        now = datetime.utcnow()
+        rows = [
+            _call_row(
+                {"processing_status": "completed", "processed_at": now, **result},
+                INSIGHT_FIELDS,
+            )
+            for result in results
+        ]
+        with self.session_factory() as db:
+            try:
+                updated = _update_by_call_id(db, rows)
+                db.commit()
+            except SQLAlchemyError as e:
+                db.rollback()
+                raise e
+
+        invalidate_calls(updated)
+        return len(updated)
+
+    def ensure_partitions(
+        self, months_ahead: int = CALLS_PARTITION_MONTHS_AHEAD, now: datetime = None
+    ) -> int:
+        """
+        Create the monthly partitions of `calls` from the current month through
+        `months_ahead` months out (Postgres only). Returns how many were created.
+        """
+        now = now or datetime.utcnow()
+        with self.session_factory() as db:
+            try:
+                created = db.scalar(
+                    text("SELECT ensure_calls_partitions(:start, :end)"),
+                    {"start": now, "end": now + timedelta(days=31 * months_ahead)},
+                )
+                db.commit()
+                return created
+            except SQLAlchemyError as e:
+                db.rollback()
+                raise e
+
+    def list_partitions(self) -> List[dict]:
+        """
+        Partitions attached to `calls` with their [lower, upper) start_time
+        bounds; the default partition has no bounds.
+        """
+        with self.session_factory() as db:
+            rows = db.execute(
+                text(
+                    "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+                    "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = 'calls'::regclass ORDER BY c.relname"
+                )
+            ).all()
+
+        partitions = []
+        for name, bound in rows:
+            match = PARTITION_BOUND.search(bound)
+            partitions.append(
+                {
+                    "name": name,
+                    "lower": datetime.fromisoformat(match.group(1)) if match else None,
+                    "upper": datetime.fromisoformat(match.group(2)) if match else None,
+                }
+            )
+        return partitions
+
+    def retire_partitions(self, before: datetime, drop: bool = False) -> List[str]:
+        """
+        Detach every monthly partition holding only calls that started before
+        `before`, and forget their call_ids. Detached partitions are kept as
+        standalone tables (e.g. for archiving) unless `drop` is set.
+        Returns the names of the retired partitions.
+        """
+        retired = []
+        for partition in self.list_partitions():
+            if partition["upper"] is None or partition["upper"] > before:
+                continue
+            with self.session_factory() as db:
+                try:
+                    db.execute(
+                        text(f'ALTER TABLE calls DETACH PARTITION "{partition["name"]}"')
+                    )
+                    db.execute(
+                        text(
+                            "DELETE FROM call_ids "
+                            "WHERE start_time >= :lower AND start_time < :upper"
+                        ),
+                        {"lower": partition["lower"], "upper": partition["upper"]},
+                    )
+                    if drop:
+                        db.execute(text(f'DROP TABLE "{partition["name"]}"'))
+                    db.commit()
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    raise e
+            retired.append(partition["name"])
+
+        if retired:
+            invalidate_aggregates()
+        return retired
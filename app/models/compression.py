@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, LargeBinary
+
+from app.db import Base
+
+
+class DBTranscriptDictionary(Base):
+    __tablename__ = "transcript_dictionaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    dictionary = Column(
+        LargeBinary, nullable=False, comment="zstd dictionary trained on transcripts"
+    )
+    sample_size = Column(
+        Integer, nullable=True, comment="Number of transcripts the dictionary was trained on"
+    )
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,230 @@
+import heapq
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    delete,
+    func,
+    insert,
+    select,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.db import Base, SessionLocal
+from app.keywords import analyze
+from app.models.calls import DBCall
+from app.settings import (
+    SEARCH_BM25_B,
+    SEARCH_BM25_K1,
+    SEARCH_INDEX_ENABLED,
+    SEARCH_MAX_POSTINGS_PER_TERM,
+    SEARCH_STATS_REFRESH_SECONDS,
+)
+
+
+class DBKeywordModel(Base):
+    __tablename__ = "keyword_models"
+
+    id = Column(Integer, primary_key=True, index=True)
+    model = Column(
+        LargeBinary, nullable=False, comment="joblib-dumped fitted TfidfVectorizer"
+    )
+    vocabulary_size = Column(Integer, nullable=True)
+    sample_size = Column(
+        Integer, nullable=True, comment="Number of transcripts the model was fitted on"
+    )
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class DBSearchTerm(Base):
+    __tablename__ = "search_terms"
+
+    term = Column(String(64), primary_key=True)
+    doc_freq = Column(
+        Integer, nullable=False, default=0, comment="Number of indexed calls with the term"
+    )
+
+
+class DBSearchDocument(Base):
+    __tablename__ = "search_documents"
+
+    call_id = Column(Integer, primary_key=True)
+    length = Column(Integer, nullable=False, comment="Number of indexed terms")
+    indexed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class DBSearchPosting(Base):
+    """
+    One (term, call) entry of the inverted index. `weight` is the BM25 term
+    frequency component at indexing time; postings are read per term in
+    weight order, so a lookup only touches a term's best postings.
+    """
+
+    __tablename__ = "search_postings"
+
+    term = Column(String(64), primary_key=True)
+    call_id = Column(Integer, primary_key=True, index=True)
+    tf = Column(Integer, nullable=False)
+    length = Column(Integer, nullable=False, comment="Indexed terms in the call")
+    weight = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_search_postings_term_weight", "term", weight.desc()),
+    )
+
+
+def bm25_tf(tf: int, length: int, avg_length: float) -> float:
+    norm = SEARCH_BM25_K1 * (1 - SEARCH_BM25_B + SEARCH_BM25_B * length / avg_length)
+    return tf * (SEARCH_BM25_K1 + 1) / (tf + norm)
+
+
+def bm25_idf(doc_freq: int, doc_count: int) -> float:
+    return math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+
+def _upsert(db):
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    return dialect.insert
+
+
+class SearchRepository:
+    # Corpus size and average length only drift slowly; refreshed periodically
+    _stats = {"value": (0, 0.0), "checked_at": float("-inf")}
+    _stats_lock = threading.Lock()
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def stats(self) -> Tuple[int, float]:
+        """(number of indexed calls, average indexed length)."""
+        with self._stats_lock:
+            now = time.monotonic()
+            if now - self._stats["checked_at"] >= SEARCH_STATS_REFRESH_SECONDS:
+                with self.session_factory() as db:
+                    count, avg_length = db.execute(
+                        select(func.count(), func.avg(DBSearchDocument.length))
+                    ).one()
+                self._stats["value"] = (count, float(avg_length or 0))
+                self._stats["checked_at"] = now
+            return self._stats["value"]
+
+    def index_documents(self, documents: Dict[int, str]):
+        """
+        (Re)index calls given as {call_id: text}, replacing their previous
+        postings. Document frequencies are adjusted by the net change per
+        term, applied in term order so concurrent indexers can't deadlock.
+        """
+        if not SEARCH_INDEX_ENABLED or not documents:
+            return
+
+        _, avg_length = self.stats()
+        postings, lengths, new_freqs = [], [], Counter()
+        for call_id, text in documents.items():
+            terms = Counter(analyze(text))
+            length = sum(terms.values())
+            lengths.append({"call_id": call_id, "length": length})
+            for term, tf in terms.items():
+                postings.append(
+                    {
+                        "term": term,
+                        "call_id": call_id,
+                        "tf": tf,
+                        "length": length,
+                        "weight": bm25_tf(tf, length, avg_length or length),
+                    }
+                )
+                new_freqs[term] += 1
+
+        call_ids = list(documents)
+        with self.session_factory() as db:
+            try:
+                old_freqs = dict(
+                    db.execute(
+                        select(DBSearchPosting.term, func.count())
+                        .where(DBSearchPosting.call_id.in_(call_ids))
+                        .group_by(DBSearchPosting.term)
+                    ).all()
+                )
+                db.execute(delete(DBSearchPosting).where(DBSearchPosting.call_id.in_(call_ids)))
+                db.execute(delete(DBSearchDocument).where(DBSearchDocument.call_id.in_(call_ids)))
+                db.execute(insert(DBSearchDocument), lengths)
+                if postings:
+                    db.execute(insert(DBSearchPosting), postings)
+
+                changes = [
+                    {"term": term, "doc_freq": new_freqs[term] - old_freqs.get(term, 0)}
+                    for term in sorted(new_freqs.keys() | old_freqs.keys())
+                    if new_freqs[term] != old_freqs.get(term, 0)
+                ]
+                if changes:
+                    stmt = _upsert(db)(DBSearchTerm)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[DBSearchTerm.term],
+                        set_={"doc_freq": DBSearchTerm.doc_freq + stmt.excluded.doc_freq},
+                    )
+                    db.execute(stmt, changes)
+                db.commit()
+            except SQLAlchemyError as e:
+                db.rollback()
+                raise e
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """
+        Calls matching `query` ranked by BM25, best first. Calls whose
+        partition was retired are skipped.
+        """
+        terms = list(dict.fromkeys(analyze(query)))
+        if not terms:
+            return []
+
+        doc_count, avg_length = self.stats()
+        scores = defaultdict(float)
+        with self.session_factory() as db:
+            freqs = db.execute(
+                select(DBSearchTerm.term, DBSearchTerm.doc_freq).where(
+                    DBSearchTerm.term.in_(terms), DBSearchTerm.doc_freq > 0
+                )
+            ).all()
+            for term, doc_freq in freqs:
+                idf = bm25_idf(doc_freq, max(doc_count, doc_freq))
+                postings = db.execute(
+                    select(DBSearchPosting.call_id, DBSearchPosting.tf, DBSearchPosting.length)
+                    .where(DBSearchPosting.term == term)
+                    .order_by(DBSearchPosting.weight.desc())
+                    .limit(SEARCH_MAX_POSTINGS_PER_TERM)
+                ).all()
+                for call_id, tf, length in postings:
+                    scores[call_id] += idf * bm25_tf(tf, length, avg_length or length or 1)
+
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            calls = {
+                row.call_id: row
+                for row in db.execute(
+                    select(DBCall.call_id, DBCall.start_time, DBCall.keywords).where(
+                        DBCall.call_id.in_([call_id for call_id, _ in top])
+                    )
+                )
+            }
+
+        return [
+            {
+                "call_id": call_id,
+                "score": score,
+                "start_time": calls[call_id].start_time,
+                "keywords": calls[call_id].keywords,
+            }
+            for call_id, score in top
+            if call_id in calls
+        ]
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, Column, DateTime, Float, Integer, LargeBinary, String
+
+from app.db import Base
+
+
+class DBSentimentHead(Base):
+    """
+    A classifier predicting the sentiment model's overall label from the
+    embedding of a call (app.workers.sentiment_head), one per embedding model.
+    """
+
+    __tablename__ = "sentiment_heads"
+
+    id = Column(Integer, primary_key=True, index=True)
+    embedding_model = Column(String(200), nullable=False, index=True)
+    model = Column(
+        LargeBinary, nullable=False, comment="joblib-dumped fitted LogisticRegression"
+    )
+    sample_size = Column(
+        Integer, nullable=True, comment="Number of calls the head was fitted on"
+    )
+    agreement = Column(
+        Float, nullable=True, comment="Share of held-out calls labelled as the full model did"
+    )
+    report = Column(
+        JSON, nullable=True, comment="Agreement and calibration on the held-out calls"
+    )
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,5 +1,25 @@
-from fastapi import APIRouter
+from datetime import datetime
+
+import structlog
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi import status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from app.cache import aggregates_cache_key, call_cache_key, read_through
+from app.live import LiveCallState, persist_live_call
+from app.models.calls import CallRepository, DBCall
+from app.models.search import SearchRepository
+from app.scoring import ScoringOverloaded, score_transcript
+from app.settings import (
+    CACHE_TTL_AGGREGATES_SECONDS,
+    CACHE_TTL_CALL_SECONDS,
+    INSIGHTS_SCORE_MAX_TRANSCRIPT_CHARS,
+)
+from app.transcript import SPEAKER_NAMES, Turns, parse_transcript
+
+logger = structlog.get_logger(__name__)
 
 router = APIRouter(prefix="/api/v1")
 
@@ -7,3 +27,158 @@ router = APIRouter(prefix="/api/v1")
 @router.get("/health", status_code=status.HTTP_200_OK, tags=["Health Check"])
 def health_check():
     return {"message": "API is ready"}
+
+
+def serialize_call(call: DBCall) -> dict:
+    """Call details with its turns sliced out of the stored transcript."""
+    if call.turns is not None:
+        transcript, turns = call.transcript or "", Turns.from_dict(call.turns)
+    else:
+        transcript, turns = parse_transcript(call.transcript)
+
+    return {
+        "call_id": call.call_id,
+        "agent_id": call.agent_id,
+        "customer_id": call.customer_id,
+        "language": call.language,
+        "start_time": call.start_time,
+        "duration_seconds": call.duration_seconds,
+        "turns": [
+            {
+                "speaker": SPEAKER_NAMES[speaker],
+                "text": content,
+                "word_count": word_count,
+            }
+            for (speaker, content), word_count in zip(
+                turns.iter_turns(transcript), turns.word_counts
+            )
+        ],
+        "agent_talk_ratio": call.agent_talk_ratio,
+        "sentiment_score": call.sentiment_score,
+        "sentiment_scores": call.sentiment_scores,
+        "keywords": call.keywords,
+        "processed_at": call.processed_at,
+        "processing_status": call.processing_status,
+    }
+
+
+@router.get("/calls/aggregates", tags=["Calls"])
+def get_call_aggregates(start: datetime, end: datetime):
+    return read_through(
+        lambda: aggregates_cache_key(start.isoformat(), end.isoformat()),
+        CACHE_TTL_AGGREGATES_SECONDS,
+        lambda: jsonable_encoder(CallRepository().aggregate(start, end)),
+    )
+
+
+@router.get("/calls/{call_id}", tags=["Calls"])
+def get_call(call_id: int):
+    def load():
+        call = CallRepository().get(call_id)
+        return None if call is None else jsonable_encoder(serialize_call(call))
+
+    details = read_through(
+        lambda: call_cache_key(call_id), CACHE_TTL_CALL_SECONDS, load
+    )
+    if details is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Call {call_id} not found"
+        )
+    return details
+
+
+@router.get("/search", tags=["Search"])
+def search_calls(q: str, limit: int = Query(20, ge=1, le=100)):
+    """Calls whose transcripts match `q`, ranked by BM25."""
+    return jsonable_encoder(SearchRepository().search(q, limit))
+
+
+class ScoreRequest(BaseModel):
+    transcript: str
+    language: str = "en"
+    include_embedding: bool = False
+
+
+@router.post("/insights:score", tags=["Insights"])
+async def score_insights(request: ScoreRequest):
+    """
+    Talk ratio, sentiment (overall and per turn) and, optionally, the
+    embedding of a raw transcript, computed inline without storing a call.
+    """
+    if len(request.transcript) > INSIGHTS_SCORE_MAX_TRANSCRIPT_CHARS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Transcript longer than {INSIGHTS_SCORE_MAX_TRANSCRIPT_CHARS} characters",
+        )
+    try:
+        return await score_transcript(
+            request.transcript, request.language, request.include_embedding
+        )
+    except ScoringOverloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+
+
+@router.websocket("/calls/{call_id}/live")
+async def live_call(websocket: WebSocket, call_id: int, language: str = "en"):
+    """
+    Stream transcript turns as {"speaker": "agent"|"customer", "text": "..."}
+    and receive updated insights after each turn. Send {"type": "hangup"} (or
+    disconnect) to end the call; the final state is persisted to the call.
+    """
+    await websocket.accept()
+    state = LiveCallState(call_id, language)
+    connected = True
+
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except ValueError:
+                await websocket.send_json({"error": "Messages must be JSON"})
+                continue
+            if not isinstance(message, dict):
+                await websocket.send_json({"error": "Messages must be JSON objects"})
+                continue
+            if message.get("type") == "hangup":
+                break
+            if not isinstance(message.get("text") or "", str):
+                await websocket.send_json({"error": "text must be a string"})
+                continue
+            try:
+                await state.add_turn(message.get("speaker"), message.get("text"))
+            except ValueError as e:
+                await websocket.send_json({"error": str(e)})
+                continue
+            except Exception as e:
+                logger.error(f"Live call turn failed: {str(e)}", call_id=call_id)
+                await websocket.send_json({"error": "Could not score turn"})
+                continue
+            await websocket.send_json(state.insights())
+    except WebSocketDisconnect:
+        connected = False
+    except Exception:
+        # Still store the turns received so far before the error propagates
+        connected = False
+        raise
+    finally:
+        await finish_live_call(websocket, state, connected)
+
+
+async def finish_live_call(websocket: WebSocket, state: LiveCallState, connected: bool):
+    """Persist the final state and, if the client is still there, send it and close."""
+    try:
+        await run_in_threadpool(persist_live_call, state)
+    except ValueError as e:
+        # The call has to be created (ingested) before its insights can be stored
+        if connected:
+            await websocket.send_json({"error": str(e)})
+            await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        return
+
+    if connected:
+        await websocket.send_json(state.insights(include_embedding=True))
+        await websocket.close()
@@ -0,0 +1,117 @@
+"""
+On-demand insights for raw transcripts (POST /api/v1/insights:score).
+
+Requests are scored with the same steps as stored calls (cleaning, talk
+ratio, overall and per-turn sentiment, embedding; see
+app.workers.pipeline.prepare_call / score_calls), but batched across
+concurrent requests: a MicroBatcher per language turns every request that
+arrives within a few milliseconds into one model call per kind. Identical
+transcripts already in flight are not scored again; their requests share
+the pending result.
+"""
+
+import asyncio
+import hashlib
+from functools import partial
+from typing import Dict, List, Tuple
+
+import structlog
+
+from app.batching import MicroBatcher
+from app.settings import (
+    INSIGHTS_SCORE_BATCH_MAX_LATENCY_MS,
+    INSIGHTS_SCORE_BATCH_MAX_SIZE,
+    INSIGHTS_SCORE_MAX_PENDING,
+)
+from app.workers.pipeline import prepare_call, score_calls
+from app.workers.registry import registry
+
+logger = structlog.get_logger(__name__)
+
+
+class ScoringOverloaded(Exception):
+    """More distinct transcripts in flight than INSIGHTS_SCORE_MAX_PENDING."""
+
+
+# One batcher per language key (see ModelRegistry.language_key), and the
+# pending result of every distinct (language, embedding?, transcript) being
+# scored in this process
+_batchers: Dict[str, MicroBatcher] = {}
+_inflight: Dict[Tuple[str, bool, str], asyncio.Future] = {}
+
+
+def score_batch(requests: List[Dict], language: str) -> List[Dict]:
+    """Insights for a batch of {"transcript", "include_embedding"} of one language."""
+    items = [
+        prepare_call(
+            {
+                "transcript": request["transcript"],
+                "turns": None,
+                "embed": request["include_embedding"],
+            }
+        )
+        for request in requests
+    ]
+    score_calls(items, language)
+
+    results = []
+    for item in items:
+        result = {
+            "agent_talk_ratio": item["agent_talk_ratio"],
+            "sentiment_score": item["sentiment"]["score"],
+            "sentiment_scores": {
+                "overall": item["sentiment"],
+                "segments": item["segments"],
+            },
+        }
+        if item["embed"]:
+            result["embedding"] = item["embedding"]
+        results.append(result)
+    return results
+
+
+def get_batcher(language: str) -> MicroBatcher:
+    if language not in _batchers:
+        _batchers[language] = MicroBatcher(
+            partial(score_batch, language=language),
+            max_batch_size=INSIGHTS_SCORE_BATCH_MAX_SIZE,
+            max_latency_ms=INSIGHTS_SCORE_BATCH_MAX_LATENCY_MS,
+        )
+    return _batchers[language]
+
+
+async def score_transcript(
+    transcript: str, language: str = "en", include_embedding: bool = False
+) -> Dict:
+    """Score one transcript, joining an identical request already in flight."""
+    # Languages without models of their own share the fallback's batcher
+    language = registry.language_key(language)
+    digest = hashlib.sha256(transcript.encode("utf-8")).hexdigest()
+    key = (language, include_embedding, digest)
+
+    pending = _inflight.get(key)
+    if pending is None:
+        if len(_inflight) >= INSIGHTS_SCORE_MAX_PENDING:
+            raise ScoringOverloaded(f"{len(_inflight)} transcripts already being scored")
+        pending = asyncio.ensure_future(
+            get_batcher(language).submit(
+                {"transcript": transcript, "include_embedding": include_embedding}
+            )
+        )
+        _inflight[key] = pending
+        pending.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        logger.debug("Coalesced scoring request", language=language)
+
+    # A client going away must not cancel the result other requests wait on
+    return await asyncio.shield(pending)
+
+
+def warm_up(languages: List[str]):
+    """Load the models serving `languages`, and run them once, ahead of the first request."""
+    for language in languages:
+        score_batch(
+            [{"transcript": "Agent: hello. Customer: hi", "include_embedding": True}],
+            language,
+        )
+        logger.info("Warmed up scoring models", language=language)
@@ -0,0 +1,68 @@
+"""
+Show the insights affinity ring: live and stale nodes with the depth of their
+affinity queues per lane, and how customers are spread across live nodes.
+
+--simulate N checks the ring itself without Redis: for N nodes, the share of
+keys each owns and the share that moves when a node joins or leaves.
+
+Usage:
+    python -m app.scripts.affinity_status
+    python -m app.scripts.affinity_status --simulate 8 --keys 100000
+"""
+
+import argparse
+from collections import Counter
+
+from app.affinity import HashRing, live_nodes, node_queue, stale_nodes
+from app.lanes import LANES, queue_depth, queue_name
+from app.settings import INSIGHTS_AFFINITY_VNODES
+
+
+def moved_share(before: HashRing, after: HashRing, keys: int) -> float:
+    return sum(before.node_for(key) != after.node_for(key) for key in range(keys)) / keys
+
+
+def simulate(nodes: int, keys: int, vnodes: int):
+    names = [f"node-{i}" for i in range(nodes)]
+    ring = HashRing(names, vnodes)
+    owners = Counter(ring.node_for(key) for key in range(keys))
+    print(f"{nodes} nodes, {vnodes} vnodes each, {keys} keys")
+    print(
+        f"  keys per node: min {min(owners.values()) / keys:.1%} "
+        f"max {max(owners.values()) / keys:.1%} (ideal {1 / nodes:.1%})"
+    )
+    joined = HashRing(names + [f"node-{nodes}"], vnodes)
+    left = HashRing(names[1:], vnodes)
+    print(f"  moved when a node joins: {moved_share(ring, joined, keys):.1%} (ideal {1 / (nodes + 1):.1%})")
+    print(f"  moved when a node leaves: {moved_share(ring, left, keys):.1%} (ideal {1 / nodes:.1%})")
+
+
+def status(keys: int):
+    live, stale = live_nodes(), stale_nodes()
+    for state, nodes in (("live", live), ("stale", stale)):
+        for node in nodes:
+            depths = {lane: queue_depth(node_queue(queue_name(lane), node)) for lane in LANES}
+            print(f"{state:<6} {node:<30} " + " ".join(f"{lane}={depth}" for lane, depth in depths.items()))
+    if not live and not stale:
+        print("No affinity nodes; all insights tasks use the shared lane queues")
+    if live:
+        owners = Counter(HashRing(live).node_for(key) for key in range(keys))
+        for node in live:
+            print(f"  {node}: {owners[node] / keys:.1%} of customers")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--simulate", type=int, metavar="N", help="Simulate a ring of N nodes")
+    parser.add_argument("--keys", type=int, default=10000, help="Keys to spread over the ring")
+    parser.add_argument("--vnodes", type=int, default=INSIGHTS_AFFINITY_VNODES)
+    args = parser.parse_args()
+
+    if args.simulate:
+        simulate(args.simulate, args.keys, args.vnodes)
+    else:
+        status(args.keys)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Inspect or reset the progress of online backfills (app.backfill).
+
+    status  every backfill (or one) with how far it got
+    reset   forget a backfill's progress so its next run starts over
+
+Backfills themselves are run by their own scripts (e.g.
+app.scripts.compress_transcripts backfill) or by migrations.
+
+Usage:
+    python -m app.scripts.backfills status
+    python -m app.scripts.backfills reset compress_transcripts
+"""
+
+import argparse
+import json
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, select
+
+from app.backfill import backfill_status
+from app.db import SessionLocal
+from app.models import DBBackfillProgress
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    status_parser = commands.add_parser("status")
+    status_parser.add_argument("name", nargs="?")
+    reset_parser = commands.add_parser("reset")
+    reset_parser.add_argument("name")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        if args.name:
+            names = [args.name]
+        else:
+            with SessionLocal() as db:
+                names = db.scalars(
+                    select(DBBackfillProgress.name).order_by(DBBackfillProgress.name)
+                ).all()
+        statuses = [backfill_status(name) for name in names]
+        print(json.dumps(jsonable_encoder([s for s in statuses if s]), indent=2))
+    else:
+        with SessionLocal() as db:
+            db.execute(delete(DBBackfillProgress).where(DBBackfillProgress.name == args.name))
+            db.commit()
+        print(f"Reset backfill {args.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Measure logging overhead per processed call.
+
+Emits the log events of one call's trip through ingestion and insights for
+FakerDB calls under several logging setups, writing to /dev/null:
+
+    off      level CRITICAL (baseline: every call is a no-op)
+    legacy   the previous setup: JSON rendered on the calling thread, f-string
+             messages and the full normalized call (transcript included)
+    sync     app.logging rendering on the calling thread
+    queued   app.logging with the queue handler (the default)
+    sampled  queued, keeping 10% of INFO events
+
+Reports the time spent on the calling thread and the process CPU time
+(including the writer thread) per call.
+
+Usage:
+    python -m app.scripts.benchmark_logging --calls 2000
+"""
+
+import argparse
+import json
+import os
+import time
+
+import structlog
+
+from app import logging as app_logging
+from app.faker import FakerDB
+from app.transcript import parse_transcript
+
+MODES = ["off", "legacy", "sync", "queued", "sampled"]
+
+
+def make_calls(count: int):
+    calls = []
+    for call_id in range(1, count + 1):
+        raw = FakerDB.get_call(call_id)
+        transcript, turns = parse_transcript(raw["transcript"])
+        calls.append(
+            {
+                "call_id": call_id,
+                "agent_id": raw["agent_id"],
+                "customer_id": raw["customer_id"],
+                "language": raw["language"],
+                "start_time": raw["start_time"],
+                "duration_seconds": raw["duration_seconds"],
+                "transcript": transcript,
+                "turns": turns.to_dict(),
+            }
+        )
+    return calls
+
+
+def legacy_events(logger, call: dict):
+    call_id = call["call_id"]
+    logger.info(f"Starting ingestion for call_id: {call_id}")
+    logger.info(f"Dumped call {call_id} to data/all_calls.json (total calls: {call_id})")
+    logger.info(f"Normalized call data for call_id: {call_id}", normalized_data=call)
+    logger.info("Saved call to DB", call_id=call_id)
+    logger.info(f"Completed ingestion for call_id: {call_id}", taskId="benchmark")
+    logger.info(f"Starting insights generation for call {call_id}")
+    logger.info(f"Successfully processed call {call_id}")
+
+
+def current_events(logger, call: dict):
+    call_id = call["call_id"]
+    logger.info("Starting ingestion", call_id=call_id)
+    logger.info("Dumped call", call_id=call_id, path="data/all_calls.json", total_calls=call_id)
+    logger.info(
+        "Normalized call",
+        call_id=call_id,
+        language=call["language"],
+        transcript_chars=len(call["transcript"]),
+        turns=len(call["turns"]["speakers"]),
+    )
+    logger.info("Saved call to DB", call_id=call_id)
+    logger.info("Completed ingestion", call_id=call_id, taskId="benchmark")
+    logger.info("Starting insights generation", call_id=call_id)
+    logger.info("Processed call insights", call_id=call_id)
+
+
+def configure(mode: str, sink):
+    if mode == "legacy":
+        app_logging.stop_logging()
+        structlog.configure(
+            processors=[
+                structlog.processors.TimeStamper(fmt="iso"),
+                structlog.processors.add_log_level,
+                structlog.processors.StackInfoRenderer(),
+                structlog.processors.format_exc_info,
+                structlog.processors.JSONRenderer(default=str),
+            ],
+            logger_factory=structlog.PrintLoggerFactory(sink),
+            wrapper_class=structlog.make_filtering_bound_logger(20),
+            context_class=dict,
+            cache_logger_on_first_use=True,
+        )
+        return legacy_events
+
+    app_logging.configure_logging(
+        level="CRITICAL" if mode == "off" else "INFO",
+        use_queue=mode in ("queued", "sampled"),
+        sample_rates={"*": 0.1} if mode == "sampled" else {},
+        stream=sink,
+    )
+    return current_events
+
+
+def run(mode: str, calls) -> dict:
+    with open(os.devnull, "w") as sink:
+        emit = configure(mode, sink)
+        logger = structlog.get_logger("benchmark")
+
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        for call in calls:
+            emit(logger, call)
+        caller = time.perf_counter() - start
+        # Wait for the writer thread to write everything that was queued
+        app_logging.stop_logging()
+        cpu = time.process_time() - cpu_start
+
+    return {
+        "caller_us_per_call": 1e6 * caller / len(calls),
+        "cpu_us_per_call": 1e6 * cpu / len(calls),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    calls = make_calls(args.calls)
+    results = {}
+    for mode in MODES:
+        runs = [run(mode, calls) for _ in range(args.repeat)]
+        results[mode] = {
+            key: min(r[key] for r in runs) for key in ("caller_us_per_call", "cpu_us_per_call")
+        }
+        print(
+            f"{mode:<8} caller={results[mode]['caller_us_per_call']:8.1f}us/call "
+            f"cpu={results[mode]['cpu_us_per_call']:8.1f}us/call"
+        )
+
+    app_logging.configure_logging()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
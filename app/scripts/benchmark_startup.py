@@ -0,0 +1,80 @@
+"""
+Measure import time and resident memory for each process entry point.
+
+Every entry point is imported in a fresh interpreter so module caches from one
+measurement don't leak into the next.
+
+Usage:
+    python -m app.scripts.benchmark_startup [--repeat N] [--output results.json]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = {
+    "api": "app.main",
+    "ingestion_worker": "app.workers.ingestion",
+    "insights_worker": "app.workers.insights",
+}
+
+HEAVY_MODULES = ["torch", "transformers", "sentence_transformers"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+rss_kb = 0
+with open("/proc/self/status") as f:
+    for line in f:
+        if line.startswith("VmRSS:"):
+            rss_kb = int(line.split()[1])
+print(json.dumps({{
+    "import_seconds": elapsed,
+    "rss_mb": rss_kb / 1024,
+    "heavy_modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure(module: str) -> dict:
+    code = PROBE.format(module=module, heavy=HEAVY_MODULES)
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, module in ENTRY_POINTS.items():
+        runs = [measure(module) for _ in range(args.repeat)]
+        results[name] = {
+            "module": module,
+            "import_seconds_median": statistics.median(
+                r["import_seconds"] for r in runs
+            ),
+            "rss_mb_median": statistics.median(r["rss_mb"] for r in runs),
+            "heavy_modules": runs[-1]["heavy_modules"],
+        }
+        print(
+            f"{name:<18} import={results[name]['import_seconds_median']:.3f}s "
+            f"rss={results[name]['rss_mb_median']:.1f}MB "
+            f"heavy={results[name]['heavy_modules']}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
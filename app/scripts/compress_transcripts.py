@@ -0,0 +1,204 @@
+"""
+Manage dictionary-compressed (zstd) transcript storage.
+
+    train       train a dictionary on a random sample of transcripts and store it
+    backfill    compress plain-text transcripts in id-range batches
+    decompress  restore compressed transcripts to plain text (before downgrading)
+    report      bytes stored plain vs. compressed and bytes saved
+
+New calls are compressed on write once TRANSCRIPT_COMPRESSION_ENABLED=true and
+a dictionary exists. backfill and decompress run as online backfills
+(app.backfill): they resume where an interrupted run stopped unless given
+--restart.
+
+Usage:
+    python -m app.scripts.compress_transcripts train --sample-size 5000
+    python -m app.scripts.compress_transcripts backfill --batch-size 1000
+    python -m app.scripts.compress_transcripts report
+"""
+
+import argparse
+import json
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.orm import undefer_group
+
+from app.backfill import OnlineBackfill
+from app.compression import (
+    compress_transcript,
+    decompress_transcript,
+    train_dictionary,
+)
+from app.db import SessionLocal
+from app.models import DBCall, DBTranscriptDictionary
+from app.settings import BACKFILL_BATCH_SIZE, BACKFILL_SLEEP_SECONDS
+
+
+def train(sample_size: int, dict_size: int) -> int:
+    with SessionLocal() as db:
+        calls = (
+            db.query(DBCall)
+            .options(undefer_group("transcript"))
+            .order_by(func.random())
+            .limit(sample_size)
+            .all()
+        )
+        samples = [call.transcript for call in calls if call.transcript]
+        if not samples:
+            raise SystemExit("No transcripts to train on")
+
+        row = DBTranscriptDictionary(
+            dictionary=train_dictionary(samples, dict_size), sample_size=len(samples)
+        )
+        db.add(row)
+        db.commit()
+        print(f"Trained dictionary {row.id} on {len(samples)} transcripts")
+        return row.id
+
+
+def compress_batch(dict_id: int):
+    def process(db, lo: int, hi: int) -> int:
+        rows = db.execute(
+            select(DBCall.id, DBCall.transcript_text).where(
+                DBCall.id.between(lo, hi),
+                DBCall.transcript_text.isnot(None),
+                DBCall.transcript_zstd.is_(None),
+            )
+        ).all()
+        values = []
+        for row in rows:
+            data, _ = compress_transcript(row.transcript_text, dict_id)
+            values.append(
+                {
+                    "id": row.id,
+                    "transcript_zstd": data,
+                    "transcript_dict_id": dict_id,
+                    "transcript_text": None,
+                }
+            )
+        if values:
+            db.execute(update(DBCall), values)
+        return len(values)
+
+    return process
+
+
+def decompress_batch(db, lo: int, hi: int) -> int:
+    rows = db.execute(
+        select(DBCall.id, DBCall.transcript_zstd, DBCall.transcript_dict_id).where(
+            DBCall.id.between(lo, hi), DBCall.transcript_zstd.isnot(None)
+        )
+    ).all()
+    values = [
+        {
+            "id": row.id,
+            "transcript_text": decompress_transcript(
+                row.transcript_zstd, row.transcript_dict_id
+            ),
+            "transcript_zstd": None,
+            "transcript_dict_id": None,
+        }
+        for row in rows
+    ]
+    if values:
+        db.execute(update(DBCall), values)
+    return len(values)
+
+
+def backfill(batch_size: int, sleep: float, dict_id: int = None, restart: bool = False):
+    if dict_id is None:
+        with SessionLocal() as db:
+            dict_id = db.scalar(select(func.max(DBTranscriptDictionary.id)))
+        if dict_id is None:
+            raise SystemExit("Train a dictionary first")
+
+    # Calls written meanwhile are compressed on write
+    # (TRANSCRIPT_COMPRESSION_ENABLED=true)
+    return OnlineBackfill(
+        "compress_transcripts", compress_batch(dict_id), batch_size, sleep
+    ).run(restart)
+
+
+def decompress(batch_size: int, sleep: float, restart: bool = False):
+    # Turn TRANSCRIPT_COMPRESSION_ENABLED off first, or new calls keep being compressed
+    return OnlineBackfill("decompress_transcripts", decompress_batch, batch_size, sleep).run(
+        restart
+    )
+
+
+def report(chunk_size: int = 5000) -> dict:
+    with SessionLocal() as db:
+        postgres = db.bind.dialect.name == "postgresql"
+        length = func.octet_length if postgres else func.length
+
+        plain_rows, plain_bytes = db.execute(
+            select(func.count(), func.coalesce(func.sum(length(DBCall.transcript_text)), 0))
+            .where(DBCall.transcript_text.isnot(None))
+        ).one()
+
+        # Original size of compressed transcripts is only known by
+        # decompressing them; stream through them in chunks
+        compressed_rows = compressed_bytes = original_bytes = 0
+        result = db.execute(
+            select(DBCall.transcript_zstd, DBCall.transcript_dict_id)
+            .where(DBCall.transcript_zstd.isnot(None))
+            .execution_options(yield_per=chunk_size)
+        )
+        for data, dict_id in result:
+            compressed_rows += 1
+            compressed_bytes += len(data)
+            original_bytes += len(decompress_transcript(data, dict_id).encode("utf-8"))
+
+        summary = {
+            "plain_rows": plain_rows,
+            "plain_bytes": plain_bytes,
+            "compressed_rows": compressed_rows,
+            "compressed_bytes": compressed_bytes,
+            "compressed_original_bytes": original_bytes,
+            "bytes_saved": original_bytes - compressed_bytes,
+            "compression_ratio": (
+                original_bytes / compressed_bytes if compressed_bytes else None
+            ),
+        }
+        if postgres:
+            summary["calls_total_relation_bytes"] = db.scalar(
+                text("SELECT pg_total_relation_size('calls')")
+            )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train")
+    train_parser.add_argument("--sample-size", type=int, default=5000)
+    train_parser.add_argument("--dict-size", type=int, default=112_640)
+
+    for name in ("backfill", "decompress"):
+        command = commands.add_parser(name)
+        command.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+        command.add_argument(
+            "--sleep",
+            type=float,
+            default=BACKFILL_SLEEP_SECONDS,
+            help="Seconds between batches",
+        )
+        command.add_argument("--restart", action="store_true", help="Start over")
+    commands.choices["backfill"].add_argument("--dict-id", type=int)
+
+    commands.add_parser("report")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        train(args.sample_size, args.dict_size)
+    elif args.command == "backfill":
+        backfill(args.batch_size, args.sleep, args.dict_id, args.restart)
+    elif args.command == "decompress":
+        decompress(args.batch_size, args.sleep, args.restart)
+    else:
+        print(json.dumps(report(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
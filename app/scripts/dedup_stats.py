@@ -0,0 +1,32 @@
+"""
+Show how many calls reused a near-duplicate's insights (DEDUP_ENABLED)
+instead of running inference, and the resulting hit rate.
+
+Usage:
+    python -m app.scripts.dedup_stats
+"""
+
+import argparse
+
+from app.dedup import get_dedup_stats
+from app.settings import DEDUP_ENABLED, DEDUP_SIMILARITY_THRESHOLD
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.parse_args()
+
+    hits, misses = get_dedup_stats()
+    if not hits + misses:
+        print("No dedup lookups recorded (is DEDUP_ENABLED on?)")
+        return
+
+    print(f"dedup enabled:        {DEDUP_ENABLED}")
+    print(f"similarity threshold: {DEDUP_SIMILARITY_THRESHOLD}")
+    print(f"reused (hits):        {hits}")
+    print(f"inferred (misses):    {misses}")
+    print(f"hit rate:             {hits / (hits + misses):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Stream calls and their insights out of Postgres for offline analytics.
+
+Writes, per run:
+  insights-<run>.parquet (or .arrow)   one row per exported call
+  embeddings-<run>.npy                 float32 (n, dim) matrix, memory-mappable
+  embeddings-<run>.call_ids.npy        int64 (n,) call_id of each matrix row
+
+Rows are read through a server-side cursor in fixed-size chunks, so memory use
+does not depend on the table size. Only completed calls are exported. Runs are
+incremental on `processed_at`: the upper bound of each run is stored in
+export_state.json and the next run starts --max-commit-lag seconds before it
+(use --full to ignore it). processed_at is stamped before the insights commit,
+so a call committed after a run started can carry a timestamp inside that
+run's window; the overlap picks it up, and calls already exported in the
+overlap are remembered in the state file and skipped.
+
+Usage:
+    python -m app.scripts.export_calls --output-dir exports [--chunk-size 5000]
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import func, select
+
+from app.db import SessionLocal
+from app.models import DBCall
+from app.models.calls import parse_embedding
+
+STATE_FILE = "export_state.json"
+
+# Stored embeddings of calls that have none (empty or degraded transcripts)
+EMPTY_EMBEDDINGS = ("", "[]", "{}")
+
+INSIGHT_COLUMNS = [
+    DBCall.call_id,
+    DBCall.agent_id,
+    DBCall.customer_id,
+    DBCall.language,
+    DBCall.start_time,
+    DBCall.duration_seconds,
+    DBCall.agent_talk_ratio,
+    DBCall.sentiment_score,
+    DBCall.sentiment_scores,
+    DBCall.processed_at,
+    DBCall.processing_status,
+]
+
+SCHEMA = pa.schema(
+    [
+        ("call_id", pa.int64()),
+        ("agent_id", pa.int64()),
+        ("customer_id", pa.int64()),
+        ("language", pa.string()),
+        ("start_time", pa.timestamp("us")),
+        ("duration_seconds", pa.int64()),
+        ("agent_talk_ratio", pa.float64()),
+        ("sentiment_score", pa.float64()),
+        ("sentiment_label", pa.string()),
+        ("sentiment_confidence", pa.float64()),
+        ("sentiment_scores", pa.string()),
+        ("processed_at", pa.timestamp("us")),
+        ("processing_status", pa.string()),
+    ]
+)
+
+
+def load_watermark(output_dir: str):
+    """The last run's upper bound and the (call_id, processed_at) it exported near it."""
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None, set()
+    with open(path) as f:
+        state = json.load(f)
+    return (
+        datetime.fromisoformat(state["processed_at"]),
+        {(call_id, processed_at) for call_id, processed_at in state.get("recent", [])},
+    )
+
+
+def save_watermark(output_dir: str, watermark: datetime, recent: set):
+    with open(os.path.join(output_dir, STATE_FILE), "w") as f:
+        json.dump({"processed_at": watermark.isoformat(), "recent": sorted(recent)}, f)
+
+
+def truncate_npy(path: str, array, rows: int):
+    """Rewrite the .npy file at `path` with only the first `rows` rows of `array`."""
+    tmp_path = path[: -len(".npy")] + ".tmp.npy"
+    np.save(tmp_path, array[:rows])
+    os.replace(tmp_path, path)
+
+
+def open_table_writer(path: str, fmt: str):
+    if fmt == "parquet":
+        return pq.ParquetWriter(path, SCHEMA, compression="zstd")
+    return pa.ipc.new_file(pa.OSFile(path, "wb"), SCHEMA)
+
+
+def chunk_to_batch(rows) -> pa.RecordBatch:
+    columns = {name: [] for name in SCHEMA.names}
+    for row in rows:
+        overall = (row.sentiment_scores or {}).get("overall", {})
+        columns["call_id"].append(row.call_id)
+        columns["agent_id"].append(row.agent_id)
+        columns["customer_id"].append(row.customer_id)
+        columns["language"].append(row.language)
+        columns["start_time"].append(row.start_time)
+        columns["duration_seconds"].append(row.duration_seconds)
+        columns["agent_talk_ratio"].append(row.agent_talk_ratio)
+        columns["sentiment_score"].append(row.sentiment_score)
+        columns["sentiment_label"].append(overall.get("label"))
+        columns["sentiment_confidence"].append(overall.get("confidence"))
+        columns["sentiment_scores"].append(
+            json.dumps(row.sentiment_scores) if row.sentiment_scores else None
+        )
+        columns["processed_at"].append(row.processed_at)
+        columns["processing_status"].append(row.processing_status)
+    return pa.RecordBatch.from_pydict(columns, schema=SCHEMA)
+
+
+def export(
+    output_dir: str, chunk_size: int, fmt: str, full: bool, max_commit_lag: float
+) -> dict:
+    os.makedirs(output_dir, exist_ok=True)
+    lower, seen = (None, set()) if full else load_watermark(output_dir)
+    upper = datetime.utcnow()
+    run = upper.strftime("%Y%m%dT%H%M%S")
+    lag = timedelta(seconds=max_commit_lag)
+
+    window = [
+        DBCall.processing_status == "completed",
+        DBCall.processed_at.isnot(None),
+        DBCall.processed_at <= upper,
+    ]
+    if lower is not None:
+        window.append(DBCall.processed_at > lower - lag)
+    has_embedding = [DBCall.embedding.isnot(None), DBCall.embedding.notin_(EMPTY_EMBEDDINGS)]
+
+    table_path = os.path.join(
+        output_dir, f"insights-{run}.{'parquet' if fmt == 'parquet' else 'arrow'}"
+    )
+    matrix_path = os.path.join(output_dir, f"embeddings-{run}.npy")
+    index_path = os.path.join(output_dir, f"embeddings-{run}.call_ids.npy")
+
+    exported = embedded = skipped = 0
+    recent = set()
+    with SessionLocal() as db:
+        if db.bind.dialect.name == "postgresql":
+            # Count and stream from the same snapshot so the preallocated
+            # embedding matrix matches the rows we read
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+        n_embeddings = db.scalar(
+            select(func.count()).select_from(DBCall).where(*window, *has_embedding)
+        )
+
+        matrix = index = None
+        writer = open_table_writer(table_path, fmt)
+        try:
+            result = db.execute(
+                select(*INSIGHT_COLUMNS, DBCall.embedding)
+                .where(*window)
+                .order_by(DBCall.processed_at, DBCall.id)
+                .execution_options(yield_per=chunk_size)
+            )
+            for rows in result.partitions():
+                new_rows = []
+                for row in rows:
+                    key = (row.call_id, row.processed_at.isoformat())
+                    if row.processed_at > upper - lag:
+                        recent.add(key)
+                    if key in seen:
+                        skipped += 1
+                    else:
+                        new_rows.append(row)
+                rows = new_rows
+                if not rows:
+                    continue
+                writer.write_batch(chunk_to_batch(rows))
+                exported += len(rows)
+
+                for row in rows:
+                    vector = parse_embedding(row.embedding)
+                    if not vector or embedded >= n_embeddings:
+                        continue
+                    if matrix is None:
+                        matrix = np.lib.format.open_memmap(
+                            matrix_path,
+                            mode="w+",
+                            dtype=np.float32,
+                            shape=(n_embeddings, len(vector)),
+                        )
+                        index = np.lib.format.open_memmap(
+                            index_path, mode="w+", dtype=np.int64, shape=(n_embeddings,)
+                        )
+                    matrix[embedded] = vector
+                    index[embedded] = row.call_id
+                    embedded += 1
+        finally:
+            writer.close()
+            if matrix is not None:
+                matrix.flush()
+                index.flush()
+
+    if matrix is not None and embedded < n_embeddings:
+        # Counted rows that had no usable vector or were exported already;
+        # never leave zero rows (call_id 0) at the end of the matrix
+        truncate_npy(matrix_path, matrix, embedded)
+        truncate_npy(index_path, index, embedded)
+        del matrix, index
+
+    save_watermark(output_dir, upper, recent)
+    return {
+        "run": run,
+        "rows": exported,
+        "already_exported": skipped,
+        "embeddings": embedded,
+        "processed_after": lower.isoformat() if lower else None,
+        "processed_until": upper.isoformat(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output-dir", default="exports")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument(
+        "--full", action="store_true", help="Ignore the incremental watermark"
+    )
+    parser.add_argument(
+        "--max-commit-lag",
+        type=float,
+        default=300,
+        help="Seconds between stamping processed_at and committing it, at most",
+    )
+    args = parser.parse_args()
+
+    summary = export(
+        args.output_dir, args.chunk_size, args.format, args.full, args.max_commit_lag
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
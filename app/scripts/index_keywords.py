@@ -0,0 +1,134 @@
+"""
+Manage transcript keywords and the search index.
+
+    fit       fit a TF-IDF vectorizer on a random sample of transcripts and store it
+    backfill  extract keywords and (re)index calls in id-range batches
+    search    run a BM25 query against the index
+
+New calls get keywords and are indexed by the insights pipeline; keywords stay
+empty until a vectorizer has been fitted. backfill is an online backfill
+(app.backfill) that resumes where it stopped; pass --restart after fitting a
+new vectorizer.
+
+Usage:
+    python -m app.scripts.index_keywords fit --sample-size 20000
+    python -m app.scripts.index_keywords backfill --batch-size 500
+    python -m app.scripts.index_keywords search "refund not received"
+"""
+
+import argparse
+import json
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, update
+from sqlalchemy.orm import undefer_group
+
+from app.backfill import OnlineBackfill
+from app.db import SessionLocal
+from app.keywords import (
+    dump_vectorizer,
+    extract_keywords_batch,
+    fit_vectorizer,
+    search_text,
+)
+from app.models import DBCall, DBKeywordModel
+from app.models.search import SearchRepository
+from app.settings import BACKFILL_SLEEP_SECONDS
+from app.transcript import Turns, parse_transcript
+
+
+def call_search_text(call: DBCall) -> str:
+    if call.turns is not None:
+        return search_text(call.transcript, Turns.from_dict(call.turns))
+    return search_text(*parse_transcript(call.transcript))
+
+
+def fit(sample_size: int, max_features: int, min_df: int) -> int:
+    with SessionLocal() as db:
+        calls = (
+            db.query(DBCall)
+            .options(undefer_group("transcript"))
+            .order_by(func.random())
+            .limit(sample_size)
+            .all()
+        )
+        texts = [call_search_text(call) for call in calls if call.transcript]
+        if not texts:
+            raise SystemExit("No transcripts to fit on")
+
+        vectorizer = fit_vectorizer(texts, max_features, min(min_df, len(texts)))
+        row = DBKeywordModel(
+            model=dump_vectorizer(vectorizer),
+            vocabulary_size=len(vectorizer.vocabulary_),
+            sample_size=len(texts),
+        )
+        db.add(row)
+        db.commit()
+        print(
+            f"Fitted keyword model {row.id} on {len(texts)} transcripts "
+            f"({row.vocabulary_size} terms)"
+        )
+        return row.id
+
+
+def index_batch(db, lo: int, hi: int) -> int:
+    calls = (
+        db.query(DBCall)
+        .options(undefer_group("transcript"))
+        .filter(DBCall.id.between(lo, hi))
+        .all()
+    )
+    if not calls:
+        return 0
+    documents = {call.call_id: call_search_text(call) for call in calls}
+    ids = {call.call_id: call.id for call in calls}
+
+    keywords = extract_keywords_batch(list(documents.values()))
+    values = [
+        {"id": ids[call_id], "keywords": call_keywords}
+        for call_id, call_keywords in zip(documents, keywords)
+        if call_keywords is not None
+    ]
+    if values:
+        db.execute(update(DBCall), values)
+    # Commits on its own; re-indexing a call is idempotent
+    SearchRepository().index_documents(documents)
+    return len(calls)
+
+
+def backfill(batch_size: int, sleep: float, restart: bool = False):
+    return OnlineBackfill("index_keywords", index_batch, batch_size, sleep).run(restart)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fit_parser = commands.add_parser("fit")
+    fit_parser.add_argument("--sample-size", type=int, default=20_000)
+    fit_parser.add_argument("--max-features", type=int, default=100_000)
+    fit_parser.add_argument("--min-df", type=int, default=2)
+
+    backfill_parser = commands.add_parser("backfill")
+    backfill_parser.add_argument("--batch-size", type=int, default=500)
+    backfill_parser.add_argument(
+        "--sleep", type=float, default=BACKFILL_SLEEP_SECONDS, help="Seconds between batches"
+    )
+    backfill_parser.add_argument("--restart", action="store_true", help="Start over")
+
+    search_parser = commands.add_parser("search")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "fit":
+        fit(args.sample_size, args.max_features, args.min_df)
+    elif args.command == "backfill":
+        backfill(args.batch_size, args.sleep, args.restart)
+    else:
+        results = SearchRepository().search(args.query, args.limit)
+        print(json.dumps(jsonable_encoder(results), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from app.workers.ingestion import ingest_call
 from app.celery import celery
+from app.lanes import BACKFILL, wait_for_capacity
 
 
 ingest_call.app = celery
@@ -7,7 +8,11 @@ ingest_call.app = celery
 
 def main():
     for i in range(1, 11):
-        result = ingest_call.apply_async(kwargs={"call_id": i}, queue="ingestion")
+        # Each ingested call triggers insights on the backfill lane
+        wait_for_capacity(BACKFILL)
+        result = ingest_call.apply_async(
+            kwargs={"call_id": i, "lane": BACKFILL}, queue="ingestion"
+        )
         print(f"Enqueued task for call_id={i}, task_id={result.id}")
 
 
@@ -1,15 +1,11 @@
-from app.workers.insights import generate_call_insights
-from app.celery import celery
-
-
-generate_call_insights.app = celery
+from app.lanes import BACKFILL, enqueue_insights
 
 
 def main():
+    # Reprocessing existing calls goes to the backfill lane so it can't starve
+    # fresh calls; enqueueing waits whenever the lane is already deep enough
     for i in range(1, 11):
-        result = generate_call_insights.apply_async(
-            kwargs={"call_id": i}, queue="insights"
-        )
+        result = enqueue_insights(i, lane=BACKFILL, wait=True)
         print(f"Enqueued task for call_id={i}, task_id={result.id}")
 
 
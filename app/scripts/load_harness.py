@@ -0,0 +1,301 @@
+"""
+Offline load harness for the ingest_call -> generate_call_insights pipeline.
+
+Runs the real tasks in-process (Celery eager mode, no broker) against SQLite
+or a local Postgres, with stub or real models, on FakerDB-generated calls.
+Calls arrive open-loop (Poisson by default) at each requested rate and are
+processed by a pool of worker threads. For every rate it reports sustained
+throughput, end-to-end latency percentiles (arrival -> insights stored) and a
+per-stage time breakdown.
+
+Usage:
+    python -m app.scripts.load_harness --rate 5 10 20 --duration 30 --workers 4
+    python -m app.scripts.load_harness --database-url postgresql://... --models real
+"""
+
+import argparse
+import functools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of `samples` (0 when empty)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(samples) -> dict:
+    return {
+        "count": len(samples),
+        "mean_ms": 1000 * sum(samples) / len(samples) if samples else 0.0,
+        "p50_ms": 1000 * percentile(samples, 50),
+        "p95_ms": 1000 * percentile(samples, 95),
+        "p99_ms": 1000 * percentile(samples, 99),
+        "max_ms": 1000 * max(samples) if samples else 0.0,
+    }
+
+
+class StageTimer:
+    """Wraps pipeline functions in place and records their wall time per stage."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def wrap(self, owner, name: str, stage: str = None, static: bool = False):
+        fn = getattr(owner, name)
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(stage or name, time.perf_counter() - start)
+
+        setattr(owner, name, staticmethod(timed) if static else timed)
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+
+    def report(self) -> dict:
+        with self._lock:
+            return {stage: summarize(s) for stage, s in sorted(self.samples.items())}
+
+
+class StubSentimentPipeline:
+    """Stands in for the transformers pipeline with a fixed per-text cost."""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+
+    def __call__(self, texts, **kwargs):
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        time.sleep(self.latency * len(batch))
+        return [
+            {"label": "NEGATIVE" if "?" in text else "POSITIVE", "score": 0.9}
+            for text in batch
+        ]
+
+
+class StubSentenceTransformer:
+    """Stands in for SentenceTransformer with a fixed per-text cost."""
+
+    def __init__(self, latency_ms: float, dim: int = 384):
+        self.latency = latency_ms / 1000
+        self.dim = dim
+
+    def encode(self, texts, **kwargs):
+        import numpy as np
+
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        time.sleep(self.latency * len(batch))
+        vectors = np.stack(
+            [
+                np.random.default_rng(abs(hash(text))).random(self.dim, dtype=np.float32)
+                for text in batch
+            ]
+        )
+        return vectors[0] if single else vectors
+
+
+def configure_environment(args):
+    """Must run before any app module is imported (settings are read at import)."""
+    os.environ["DATABASE_URL"] = args.database_url
+    if not args.with_redis:
+        os.environ["DEDUP_ENABLED"] = "false"
+        os.environ["CACHE_ENABLED"] = "false"
+        os.environ["INSIGHTS_CHECKPOINTS_ENABLED"] = "false"
+
+
+def setup_pipeline(args, timer: StageTimer):
+    import logging
+
+    import structlog
+
+    from app.celery import celery
+    from app.db import Base, engine
+    from app.faker import FakerDB
+    from app.models.calls import CallRepository
+    from app.workers import ingestion, insights, pipeline, registry
+
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+    engine.echo = False
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+    )
+
+    celery.conf.task_always_eager = True
+    Base.metadata.create_all(engine)
+    ingestion.DATA_DIR = tempfile.mkdtemp(prefix="load-harness-")
+
+    if args.models == "stub":
+        registry.LOADERS[registry.SENTIMENT] = lambda name: StubSentimentPipeline(
+            args.stub_sentiment_ms
+        )
+        registry.LOADERS[registry.EMBEDDING] = lambda name: StubSentenceTransformer(
+            args.stub_embedding_ms
+        )
+
+    timer.wrap(FakerDB, "get_call", "ingest.fetch", static=True)
+    timer.wrap(ingestion, "dump_call", "ingest.dump")
+    timer.wrap(ingestion, "normalize_call", "ingest.normalize")
+    timer.wrap(ingestion, "save_call", "ingest.save")
+    timer.wrap(ingestion, "reuse_near_duplicate_insights", "ingest.dedup")
+    timer.wrap(insights, "clean_transcript", "insights.clean")
+    timer.wrap(insights, "calculate_agent_talk_ratio", "insights.talk_ratio")
+    # Overall sentiment and the embedding are scored together
+    timer.wrap(pipeline, "score_texts", "insights.score")
+    timer.wrap(insights, "analyze_turn_sentiment", "insights.turn_sentiment")
+    timer.wrap(CallRepository, "update_insights", "db.update_insights")
+
+    return ingestion.ingest_call
+
+
+def next_call_id() -> int:
+    from sqlalchemy import func
+
+    from app.db import SessionLocal
+    from app.models import DBCall
+
+    with SessionLocal() as db:
+        return (db.query(func.max(DBCall.call_id)).scalar() or 0) + 1
+
+
+def failed_calls(call_ids) -> int:
+    from app.db import SessionLocal
+    from app.models import DBCall
+
+    if not call_ids:
+        return 0
+    with SessionLocal() as db:
+        return (
+            db.query(DBCall)
+            .filter(
+                DBCall.call_id.between(min(call_ids), max(call_ids)),
+                DBCall.processing_status != "completed",
+            )
+            .count()
+        )
+
+
+def run_step(ingest_call, rate: float, args, timer: StageTimer, first_call_id: int):
+    rng = random.Random(args.seed)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    completed_at = []
+
+    def process(call_id: int, arrival: float):
+        result = ingest_call.apply(kwargs={"call_id": call_id})
+        finished = time.perf_counter()
+        with lock:
+            completed_at.append(finished)
+            if result.failed():
+                errors.append(call_id)
+            else:
+                latencies.append(finished - arrival)
+
+    timer.reset()
+    call_ids = []
+    start = time.perf_counter()
+    arrival = start
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        while arrival - start < args.duration:
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            call_id = first_call_id + len(call_ids)
+            call_ids.append(call_id)
+            pool.submit(process, call_id, arrival)
+            interval = 1 / rate
+            arrival += rng.expovariate(rate) if args.arrivals == "poisson" else interval
+
+    elapsed = (max(completed_at) if completed_at else time.perf_counter()) - start
+    return {
+        "offered_rate": rate,
+        "submitted": len(call_ids),
+        "completed": len(latencies),
+        "task_errors": len(errors),
+        "calls_without_insights": failed_calls(call_ids),
+        "throughput_per_s": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "latency": summarize(latencies),
+        "stages": timer.report(),
+    }, call_ids
+
+
+def print_step(step: dict):
+    latency = step["latency"]
+    print(
+        f"\nrate={step['offered_rate']}/s submitted={step['submitted']} "
+        f"completed={step['completed']} errors={step['task_errors']} "
+        f"without_insights={step['calls_without_insights']} "
+        f"throughput={step['throughput_per_s']:.2f}/s"
+    )
+    print(
+        f"  latency p50={latency['p50_ms']:.1f}ms p95={latency['p95_ms']:.1f}ms "
+        f"p99={latency['p99_ms']:.1f}ms max={latency['max_ms']:.1f}ms"
+    )
+    for stage, stats in step["stages"].items():
+        print(
+            f"  {stage:<24} mean={stats['mean_ms']:8.2f}ms "
+            f"p95={stats['p95_ms']:8.2f}ms n={stats['count']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--rate", type=float, nargs="+", default=[5.0], help="Arrivals per second"
+    )
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per rate")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--arrivals", choices=["poisson", "constant"], default="poisson")
+    parser.add_argument("--database-url", default="sqlite:///load_harness.db")
+    parser.add_argument("--models", choices=["stub", "real"], default="stub")
+    parser.add_argument("--stub-sentiment-ms", type=float, default=15)
+    parser.add_argument("--stub-embedding-ms", type=float, default=10)
+    parser.add_argument(
+        "--with-redis",
+        action="store_true",
+        help="Keep dedup, cache and checkpoints enabled (needs REDIS_URL)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    timer = StageTimer()
+    ingest_call = setup_pipeline(args, timer)
+
+    results = []
+    call_id = next_call_id()
+    for rate in args.rate:
+        step, call_ids = run_step(ingest_call, rate, args, timer, call_id)
+        call_id += len(call_ids)
+        print_step(step)
+        results.append(step)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Manage the monthly range partitions of `calls` (Postgres).
+
+    list     partitions with their start_time bounds
+    ensure   create partitions from this month through --months-ahead months out
+    retire   detach (or --drop) partitions older than --keep-months months
+
+The same maintenance runs daily from Celery beat
+(app.workers.partitions.maintain_call_partitions).
+
+Usage:
+    python -m app.scripts.manage_partitions list
+    python -m app.scripts.manage_partitions ensure --months-ahead 6
+    python -m app.scripts.manage_partitions retire --keep-months 12 --drop
+"""
+
+import argparse
+from datetime import datetime
+
+from app.models.calls import CallRepository
+from app.settings import CALLS_PARTITION_MONTHS_AHEAD
+from app.workers.partitions import retention_cutoff
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list")
+    ensure_parser = commands.add_parser("ensure")
+    ensure_parser.add_argument(
+        "--months-ahead", type=int, default=CALLS_PARTITION_MONTHS_AHEAD
+    )
+    retire_parser = commands.add_parser("retire")
+    retire_parser.add_argument("--keep-months", type=int, required=True)
+    retire_parser.add_argument(
+        "--drop", action="store_true", help="Drop instead of keeping detached tables"
+    )
+    args = parser.parse_args()
+
+    repo = CallRepository()
+    if args.command == "list":
+        for partition in repo.list_partitions():
+            lower = partition["lower"] or "DEFAULT"
+            upper = partition["upper"] or ""
+            print(f"{partition['name']:<20} {lower} {upper}")
+    elif args.command == "ensure":
+        print(f"Created {repo.ensure_partitions(args.months_ahead)} partitions")
+    else:
+        cutoff = retention_cutoff(datetime.utcnow(), args.keep_months)
+        retired = repo.retire_partitions(cutoff, drop=args.drop)
+        action = "Dropped" if args.drop else "Detached"
+        print(f"{action} {len(retired)} partitions before {cutoff:%Y-%m}: {retired}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Start one Celery worker per insights lane, sized by INSIGHTS_LANE_SHARES.
+
+Each lane's worker also consumes the lanes ahead of it (fresh, then retry),
+so fresh calls get the whole fresh share plus any idle capacity elsewhere.
+With INSIGHTS_AFFINITY_ENABLED, the workers also consume this node's
+affinity queues (ahead of the shared ones) and join the affinity ring.
+
+Usage:
+    python -m app.scripts.run_insights_workers --concurrency 8
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+from app.affinity import node_name
+from app.lanes import lane_concurrency, lane_queues
+from app.settings import INSIGHTS_AFFINITY_ENABLED
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--loglevel", default="info")
+    parser.add_argument(
+        "--node", default=node_name(), help="Affinity node name (default: hostname)"
+    )
+    args = parser.parse_args()
+
+    node = args.node if INSIGHTS_AFFINITY_ENABLED else None
+    env = dict(os.environ, INSIGHTS_AFFINITY_NODE=args.node)
+
+    workers = []
+    for lane, concurrency in lane_concurrency(args.concurrency).items():
+        command = [
+            sys.executable,
+            "-m",
+            "celery",
+            "-A",
+            "app.celery",
+            "worker",
+            "-Q",
+            ",".join(lane_queues(lane, node)),
+            "-c",
+            str(concurrency),
+            "-n",
+            f"insights-{lane}@%h",
+            "--loglevel",
+            args.loglevel,
+        ]
+        print(f"Starting {lane} lane: {' '.join(command)}")
+        workers.append(subprocess.Popen(command, env=env))
+
+    try:
+        for worker in workers:
+            worker.wait()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+
+
+if __name__ == "__main__":
+    main()
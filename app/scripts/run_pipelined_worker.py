@@ -0,0 +1,191 @@
+"""
+Run the pipelined insights worker (app.workers.pipeline.InsightsPipeline).
+
+Instead of one generate_call_insights task at a time, calls are processed in
+batches with DB reads, cleaning, inference and DB writes overlapped.
+
+    --source queue    consume an insights lane's Celery queue in place of a
+                      Celery worker; messages are acked once their batch is
+                      stored and failed calls are re-sent to the retry lane
+    --source pending  one pass over calls still pending insights
+
+The retry lane is left to Celery workers, which honour retry countdowns.
+
+Usage:
+    python -m app.scripts.run_pipelined_worker --source queue --lane backfill
+    python -m app.scripts.run_pipelined_worker --source pending --batch-size 64
+"""
+
+import argparse
+import json
+import queue
+import socket
+import time
+from collections import deque
+
+import kombu
+import structlog
+
+from app.celery import celery
+from app.db import SessionLocal
+from app.lanes import BACKFILL, FRESH, GENERATE_CALL_INSIGHTS_TASK, RETRY, queue_name
+from app.models import DBCall
+from app.settings import (
+    INSIGHTS_PIPELINE_BATCH_SIZE,
+    INSIGHTS_PIPELINE_BATCH_WAIT_SECONDS,
+    INSIGHTS_PIPELINE_CLEAN_WORKERS,
+    INSIGHTS_PIPELINE_QUEUE_DEPTH,
+)
+from app.workers.pipeline import InsightsPipeline
+
+logger = structlog.get_logger(__name__)
+
+
+class QueueSource:
+    """
+    Batches of call_ids from a lane's Celery queue. All broker operations run
+    on the pipeline's reader thread (the one iterating this source); results
+    reported by the writer thread are settled there between polls.
+    """
+
+    def __init__(self, lane: str, batch_size: int, batch_wait: float, prefetch: int):
+        self.queue = queue_name(lane)
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.prefetch = prefetch
+        self.finished = queue.Queue()
+        # Batches in pipeline order, with the messages they came from
+        self.inflight = deque()
+        # Freshness deadlines of fresh-lane calls in flight (app.degradation)
+        self.deadlines = {}
+
+    def on_done(self, call_ids, error):
+        self.finished.put(error)
+
+    def deadline_for(self, call_id):
+        return self.deadlines.get(call_id)
+
+    def _settle(self):
+        while True:
+            try:
+                error = self.finished.get_nowait()
+            except queue.Empty:
+                return
+            call_ids, messages = self.inflight.popleft()
+            for call_id in call_ids:
+                self.deadlines.pop(call_id, None)
+            if error is not None:
+                for call_id in call_ids:
+                    celery.send_task(
+                        GENERATE_CALL_INSIGHTS_TASK,
+                        kwargs={"call_id": call_id},
+                        queue=queue_name(RETRY),
+                        countdown=60,
+                    )
+            for message in messages:
+                message.ack()
+
+    def __iter__(self):
+        pending, messages = [], []
+        deadline = None
+
+        def on_message(body, message):
+            nonlocal deadline
+            args, kwargs, _ = body
+            if message.headers.get("task") != GENERATE_CALL_INSIGHTS_TASK:
+                logger.warning(
+                    "Dropping unexpected task", task=message.headers.get("task")
+                )
+                message.ack()
+                return
+            call_id = kwargs.get("call_id", args[0] if args else None)
+            if kwargs.get("deadline") is not None:
+                self.deadlines[call_id] = kwargs["deadline"]
+            pending.append(call_id)
+            messages.append(message)
+            if deadline is None:
+                deadline = time.monotonic() + self.batch_wait
+
+        with celery.connection_for_read() as connection:
+            consumer = kombu.Consumer(
+                connection,
+                queues=[kombu.Queue(self.queue)],
+                callbacks=[on_message],
+                accept=["json"],
+                prefetch_count=self.prefetch,
+            )
+            with consumer:
+                logger.info("Pipelined worker consuming", queue=self.queue)
+                while True:
+                    self._settle()
+                    try:
+                        connection.drain_events(timeout=0.1)
+                    except socket.timeout:
+                        pass
+                    if pending and (
+                        len(pending) >= self.batch_size or time.monotonic() >= deadline
+                    ):
+                        self.inflight.append((pending, messages))
+                        yield pending
+                        pending, messages, deadline = [], [], None
+
+
+def pending_batches(batch_size: int):
+    """Call ids still pending insights, in id-ordered batches (one pass)."""
+    last_id = 0
+    while True:
+        with SessionLocal() as db:
+            rows = (
+                db.query(DBCall.id, DBCall.call_id)
+                .filter(DBCall.id > last_id, DBCall.processing_status == "pending")
+                .order_by(DBCall.id)
+                .limit(batch_size)
+                .all()
+            )
+        if not rows:
+            return
+        yield [row.call_id for row in rows]
+        last_id = rows[-1].id
+
+
+def log_failures(call_ids, error):
+    if error is not None:
+        logger.error(f"Batch failed: {str(error)}", call_ids=call_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--source", choices=["queue", "pending"], default="queue")
+    parser.add_argument("--lane", choices=[FRESH, BACKFILL], default=BACKFILL)
+    parser.add_argument("--batch-size", type=int, default=INSIGHTS_PIPELINE_BATCH_SIZE)
+    parser.add_argument(
+        "--batch-wait",
+        type=float,
+        default=INSIGHTS_PIPELINE_BATCH_WAIT_SECONDS,
+        help="Seconds to wait for a queue batch to fill",
+    )
+    parser.add_argument("--queue-depth", type=int, default=INSIGHTS_PIPELINE_QUEUE_DEPTH)
+    parser.add_argument(
+        "--clean-workers", type=int, default=INSIGHTS_PIPELINE_CLEAN_WORKERS
+    )
+    args = parser.parse_args()
+
+    if args.source == "queue":
+        # Enough unacked messages to keep every stage and queue between them busy
+        prefetch = args.batch_size * (3 * args.queue_depth + 4)
+        source = QueueSource(args.lane, args.batch_size, args.batch_wait, prefetch)
+        batches, on_done, deadline_for = source, source.on_done, source.deadline_for
+    else:
+        batches, on_done, deadline_for = pending_batches(args.batch_size), log_failures, None
+
+    pipeline = InsightsPipeline(
+        on_done=on_done,
+        deadline_for=deadline_for,
+        queue_depth=args.queue_depth,
+        clean_workers=args.clean_workers,
+    )
+    print(json.dumps(pipeline.run(batches), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Fit and evaluate fast-sentiment heads (app.workers.sentiment_head).
+
+    fit     fit a head for a language's embedding model on a random sample of
+            calls scored by the sentiment model, report agreement and
+            calibration on a held-out part, and store it
+    report  the same report for the newest stored head on a fresh sample
+
+Pick INSIGHTS_FAST_SENTIMENT_MIN_CONFIDENCE from the report's thresholds
+(agreement on the calls the head keeps vs the share it keeps), then turn on
+INSIGHTS_FAST_SENTIMENT_ENABLED.
+
+Usage:
+    python -m app.scripts.sentiment_head fit --language en --sample-size 50000
+    python -m app.scripts.sentiment_head report --language en
+"""
+
+import argparse
+import json
+
+from sqlalchemy import func
+
+from app.db import SessionLocal
+from app.models import DBCall, DBSentimentHead
+from app.models.calls import parse_embedding
+from app.workers.registry import EMBEDDING, registry
+from app.workers.sentiment_head import (
+    HEAD_SOURCE,
+    LABELS,
+    active_head_id,
+    dump_head,
+    evaluate_head,
+    fit_head,
+    load_head,
+)
+
+
+def load_samples(embedding_model: str, sample_size: int):
+    """Embeddings and sentiment-model labels of a random sample of calls."""
+    import numpy as np
+
+    with SessionLocal() as db:
+        rows = (
+            db.query(DBCall.language, DBCall.sentiment_scores, DBCall.embedding)
+            .filter(
+                DBCall.processing_status == "completed",
+                DBCall.sentiment_scores.isnot(None),
+                DBCall.embedding.isnot(None),
+            )
+            .order_by(func.random())
+            .limit(sample_size)
+            .all()
+        )
+
+    embeddings, labels = [], []
+    for language, scores, embedding in rows:
+        scores = scores or {}
+        overall = scores.get("overall") or {}
+        # Labels must come from the sentiment model on the whole transcript:
+        # not from an earlier head, a live call (mean over turns, embedding a
+        # mean of turn embeddings), a dedup copy of another call, or an error
+        if "live" in scores or "dedup" in scores or overall.get("source") == HEAD_SOURCE:
+            continue
+        if overall.get("label") not in LABELS:
+            continue
+        if registry.resolve(EMBEDDING, language) != embedding_model:
+            continue
+        vector = parse_embedding(embedding)
+        if vector:
+            embeddings.append(vector)
+            labels.append(overall["label"])
+    if not embeddings:
+        raise SystemExit(f"No scored calls with {embedding_model} embeddings")
+    return np.asarray(embeddings, dtype=np.float32), labels
+
+
+def fit(embedding_model: str, sample_size: int, test_fraction: float, regularization: float):
+    from sklearn.model_selection import train_test_split
+
+    embeddings, labels = load_samples(embedding_model, sample_size)
+    train_x, test_x, train_y, test_y = train_test_split(
+        embeddings, labels, test_size=test_fraction, stratify=labels, random_state=0
+    )
+    head = fit_head(train_x, train_y, regularization)
+    report = evaluate_head(head, test_x, test_y)
+
+    with SessionLocal() as db:
+        row = DBSentimentHead(
+            embedding_model=embedding_model,
+            model=dump_head(head),
+            sample_size=len(train_y),
+            agreement=report["agreement"],
+            report=report,
+        )
+        db.add(row)
+        db.commit()
+        print(json.dumps(report, indent=2))
+        print(
+            f"Fitted sentiment head {row.id} for {embedding_model} on {len(train_y)} calls "
+            f"(agreement {report['agreement']:.2%} on {len(test_y)} held out)"
+        )
+        return row.id
+
+
+def report(embedding_model: str, sample_size: int):
+    head_id = active_head_id(embedding_model)
+    if head_id is None:
+        raise SystemExit(f"No sentiment head fitted for {embedding_model}")
+    embeddings, labels = load_samples(embedding_model, sample_size)
+    report = evaluate_head(load_head(head_id), embeddings, labels)
+    print(json.dumps({"head_id": head_id, **report}, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fit_parser = commands.add_parser("fit")
+    fit_parser.add_argument("--language", default="en")
+    fit_parser.add_argument("--sample-size", type=int, default=50_000)
+    fit_parser.add_argument("--test-fraction", type=float, default=0.2)
+    fit_parser.add_argument(
+        "--regularization", type=float, default=1.0, help="Inverse regularization strength (C)"
+    )
+
+    report_parser = commands.add_parser("report")
+    report_parser.add_argument("--language", default="en")
+    report_parser.add_argument("--sample-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    embedding_model = registry.resolve(EMBEDDING, args.language)
+    if args.command == "fit":
+        fit(embedding_model, args.sample_size, args.test_fraction, args.regularization)
+    else:
+        report(embedding_model, args.sample_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Show the latest memory figures of every worker process with profiling on
+(WORKER_MEMORY_PROFILING_ENABLED): RSS, growth per task, whether it looks like
+a leak and how many tasks it has left before it is recycled.
+
+Usage:
+    python -m app.scripts.worker_memory
+    python -m app.scripts.worker_memory --allocations
+"""
+
+import argparse
+import json
+
+from app.cache import redis_client
+from app.workers.memory import STATS_KEY
+
+
+def _str(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def mb(value) -> str:
+    return f"{int(float(value)) / (1024 * 1024):.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--allocations",
+        action="store_true",
+        help="also print the top allocation sites of each process's last traced task",
+    )
+    args = parser.parse_args()
+
+    keys = sorted(redis_client.scan_iter(STATS_KEY.format(host="*", pid="*")))
+    if not keys:
+        print("No worker memory stats (is WORKER_MEMORY_PROFILING_ENABLED on?)")
+        return
+
+    print(f"{'process':<40} {'tasks':>7} {'rss MB':>9} {'KB/task':>9} {'leak':>5} {'tasks left':>10}")
+    for key in keys:
+        stats = {_str(k): _str(v) for k, v in redis_client.hgetall(key).items()}
+        process = _str(key).split(":", 2)[2]
+        tasks_left = json.loads(stats.get("tasks_until_recycle", "null"))
+        print(
+            f"{process:<40} {stats.get('tasks', 0):>7} {mb(stats.get('rss_bytes', 0)):>9} "
+            f"{int(stats.get('growth_bytes_per_task', 0)) // 1024:>9} "
+            f"{'yes' if stats.get('leaking') == '1' else 'no':>5} "
+            f"{'-' if tasks_left is None else tasks_left:>10}"
+        )
+        if args.allocations:
+            for allocation in json.loads(stats.get("top_allocations", "null")) or []:
+                print(f"    {allocation['bytes']:>12} B {allocation['count']:>8}x  {allocation['site']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,3 +9,188 @@ DATABASE_URL = os.getenv(
     "DATABASE_URL", "postgresql://postgres:postgres@db:5432/postgres"
 )
 REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+# Near-duplicate detection (MinHash/LSH) at ingestion
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_SIMILARITY_THRESHOLD = float(os.getenv("DEDUP_SIMILARITY_THRESHOLD", "0.9"))
+MINHASH_NUM_PERM = int(os.getenv("MINHASH_NUM_PERM", "128"))
+MINHASH_SHINGLE_SIZE = int(os.getenv("MINHASH_SHINGLE_SIZE", "3"))
+LSH_BANDS = int(os.getenv("LSH_BANDS", "16"))
+
+# Upper bound for memory held by loaded models in one worker process
+MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "2048"))
+
+# Live-call (WebSocket) insights
+LIVE_SENTIMENT_WINDOW = int(os.getenv("LIVE_SENTIMENT_WINDOW", "5"))
+LIVE_BATCH_MAX_SIZE = int(os.getenv("LIVE_BATCH_MAX_SIZE", "32"))
+LIVE_BATCH_MAX_LATENCY_MS = float(os.getenv("LIVE_BATCH_MAX_LATENCY_MS", "20"))
+
+# Read-through cache for API responses
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_TTL_CALL_SECONDS = int(os.getenv("CACHE_TTL_CALL_SECONDS", "300"))
+CACHE_TTL_AGGREGATES_SECONDS = int(os.getenv("CACHE_TTL_AGGREGATES_SECONDS", "60"))
+CACHE_LOCK_TIMEOUT_SECONDS = float(os.getenv("CACHE_LOCK_TIMEOUT_SECONDS", "10"))
+
+# Insights priority lanes: share of worker capacity per lane, and the queue
+# depth at which producers of backfill work wait before enqueueing more
+INSIGHTS_LANE_SHARES = os.getenv(
+    "INSIGHTS_LANE_SHARES", "fresh:0.6,retry:0.15,backfill:0.25"
+)
+INSIGHTS_BACKFILL_MAX_DEPTH = int(os.getenv("INSIGHTS_BACKFILL_MAX_DEPTH", "500"))
+INSIGHTS_BACKPRESSURE_POLL_SECONDS = float(
+    os.getenv("INSIGHTS_BACKPRESSURE_POLL_SECONDS", "1")
+)
+
+# Per-stage checkpoints of insights results, so task retries resume
+INSIGHTS_CHECKPOINTS_ENABLED = (
+    os.getenv("INSIGHTS_CHECKPOINTS_ENABLED", "true").lower() == "true"
+)
+INSIGHTS_CHECKPOINT_TTL_SECONDS = int(
+    os.getenv("INSIGHTS_CHECKPOINT_TTL_SECONDS", "86400")
+)
+
+# Dictionary-compressed (zstd) transcript storage
+TRANSCRIPT_COMPRESSION_ENABLED = (
+    os.getenv("TRANSCRIPT_COMPRESSION_ENABLED", "false").lower() == "true"
+)
+TRANSCRIPT_COMPRESSION_LEVEL = int(os.getenv("TRANSCRIPT_COMPRESSION_LEVEL", "9"))
+TRANSCRIPT_DICTIONARY_REFRESH_SECONDS = int(
+    os.getenv("TRANSCRIPT_DICTIONARY_REFRESH_SECONDS", "300")
+)
+
+# Monthly range partitions of `calls` (Postgres): how many months ahead to
+# create, and how many months to keep (0 keeps everything). Retired partitions
+# are detached and kept as standalone tables unless CALLS_RETENTION_DROP=true.
+CALLS_PARTITION_MONTHS_AHEAD = int(os.getenv("CALLS_PARTITION_MONTHS_AHEAD", "3"))
+CALLS_RETENTION_MONTHS = int(os.getenv("CALLS_RETENTION_MONTHS", "0"))
+CALLS_RETENTION_DROP = os.getenv("CALLS_RETENTION_DROP", "false").lower() == "true"
+
+# Transcript keywords (TF-IDF) and the BM25 inverted index behind /search.
+# Lookups read at most SEARCH_MAX_POSTINGS_PER_TERM of each term's
+# highest-weighted postings.
+KEYWORDS_TOP_K = int(os.getenv("KEYWORDS_TOP_K", "10"))
+KEYWORDS_MODEL_REFRESH_SECONDS = int(os.getenv("KEYWORDS_MODEL_REFRESH_SECONDS", "300"))
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "true").lower() == "true"
+SEARCH_BM25_K1 = float(os.getenv("SEARCH_BM25_K1", "1.2"))
+SEARCH_BM25_B = float(os.getenv("SEARCH_BM25_B", "0.75"))
+SEARCH_MAX_POSTINGS_PER_TERM = int(os.getenv("SEARCH_MAX_POSTINGS_PER_TERM", "1000"))
+SEARCH_STATS_REFRESH_SECONDS = int(os.getenv("SEARCH_STATS_REFRESH_SECONDS", "300"))
+
+# Pipelined insights worker (app.scripts.run_pipelined_worker): calls per
+# batch, batches buffered between stages, and cleaning threads
+INSIGHTS_PIPELINE_BATCH_SIZE = int(os.getenv("INSIGHTS_PIPELINE_BATCH_SIZE", "32"))
+INSIGHTS_PIPELINE_BATCH_WAIT_SECONDS = float(
+    os.getenv("INSIGHTS_PIPELINE_BATCH_WAIT_SECONDS", "0.5")
+)
+INSIGHTS_PIPELINE_QUEUE_DEPTH = int(os.getenv("INSIGHTS_PIPELINE_QUEUE_DEPTH", "2"))
+INSIGHTS_PIPELINE_CLEAN_WORKERS = int(os.getenv("INSIGHTS_PIPELINE_CLEAN_WORKERS", "4"))
+INSIGHTS_PIPELINE_STATS_SECONDS = float(
+    os.getenv("INSIGHTS_PIPELINE_STATS_SECONDS", "30")
+)
+# Batched scoring tokenizes each transcript once for both models when their
+# tokenizers agree (app/workers/tokenization.py)
+INSIGHTS_SHARED_TOKENIZATION_ENABLED = (
+    os.getenv("INSIGHTS_SHARED_TOKENIZATION_ENABLED", "true").lower() == "true"
+)
+# Fast sentiment (app/workers/sentiment_head.py): the overall label comes from
+# a classifier on the call embedding, and from the sentiment model only when
+# the classifier is less confident than INSIGHTS_FAST_SENTIMENT_MIN_CONFIDENCE
+INSIGHTS_FAST_SENTIMENT_ENABLED = (
+    os.getenv("INSIGHTS_FAST_SENTIMENT_ENABLED", "false").lower() == "true"
+)
+INSIGHTS_FAST_SENTIMENT_MIN_CONFIDENCE = float(
+    os.getenv("INSIGHTS_FAST_SENTIMENT_MIN_CONFIDENCE", "0.9")
+)
+SENTIMENT_HEAD_REFRESH_SECONDS = int(os.getenv("SENTIMENT_HEAD_REFRESH_SECONDS", "300"))
+
+# Logging (app/logging.py). LOG_SAMPLE_RATES keeps a fraction of INFO/DEBUG
+# events per event name ("Saved call=0.1,*=1"); LOG_RATE_LIMIT_PER_SECOND caps
+# each event name (0 disables); string fields are cut at LOG_MAX_FIELD_LENGTH.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_QUEUE_ENABLED = os.getenv("LOG_QUEUE_ENABLED", "true").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+LOG_RATE_LIMIT_PER_SECOND = float(os.getenv("LOG_RATE_LIMIT_PER_SECOND", "0"))
+LOG_MAX_FIELD_LENGTH = int(os.getenv("LOG_MAX_FIELD_LENGTH", "512"))
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+
+# Cache-affinity routing of insights tasks (app/affinity.py): calls with the
+# same INSIGHTS_AFFINITY_KEY (customer_id or call_id) go to the same worker
+# node's queues. Nodes whose heartbeat is older than the TTL, or whose queue
+# holds INSIGHTS_AFFINITY_MAX_NODE_DEPTH messages (0 disables), are skipped
+# in favour of the shared lane queue.
+INSIGHTS_AFFINITY_ENABLED = os.getenv("INSIGHTS_AFFINITY_ENABLED", "false").lower() == "true"
+INSIGHTS_AFFINITY_KEY = os.getenv("INSIGHTS_AFFINITY_KEY", "customer_id")
+INSIGHTS_AFFINITY_NODE = os.getenv("INSIGHTS_AFFINITY_NODE", "")
+INSIGHTS_AFFINITY_VNODES = int(os.getenv("INSIGHTS_AFFINITY_VNODES", "64"))
+INSIGHTS_AFFINITY_HEARTBEAT_SECONDS = float(
+    os.getenv("INSIGHTS_AFFINITY_HEARTBEAT_SECONDS", "5")
+)
+INSIGHTS_AFFINITY_NODE_TTL_SECONDS = float(
+    os.getenv("INSIGHTS_AFFINITY_NODE_TTL_SECONDS", "20")
+)
+INSIGHTS_AFFINITY_MAX_NODE_DEPTH = int(os.getenv("INSIGHTS_AFFINITY_MAX_NODE_DEPTH", "200"))
+
+# Synchronous scoring endpoint (POST /api/v1/insights:score): concurrent
+# requests are micro-batched per language; requests beyond
+# INSIGHTS_SCORE_MAX_PENDING in flight are rejected (503) rather than queued.
+# Models for INSIGHTS_SCORE_WARMUP_LANGUAGES are loaded when the API starts.
+INSIGHTS_SCORE_BATCH_MAX_SIZE = int(os.getenv("INSIGHTS_SCORE_BATCH_MAX_SIZE", "32"))
+INSIGHTS_SCORE_BATCH_MAX_LATENCY_MS = float(
+    os.getenv("INSIGHTS_SCORE_BATCH_MAX_LATENCY_MS", "5")
+)
+INSIGHTS_SCORE_MAX_PENDING = int(os.getenv("INSIGHTS_SCORE_MAX_PENDING", "256"))
+INSIGHTS_SCORE_MAX_TRANSCRIPT_CHARS = int(
+    os.getenv("INSIGHTS_SCORE_MAX_TRANSCRIPT_CHARS", "50000")
+)
+INSIGHTS_SCORE_WARMUP_LANGUAGES = os.getenv("INSIGHTS_SCORE_WARMUP_LANGUAGES", "")
+
+# Online backfills (app/backfill.py): rows per id-range batch, pause between
+# batches, replica lag (seconds) above which batches wait (0 disables), and
+# the lock_timeout of each batch's transaction
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "1000"))
+BACKFILL_SLEEP_SECONDS = float(os.getenv("BACKFILL_SLEEP_SECONDS", "0.1"))
+BACKFILL_MAX_REPLICATION_LAG_SECONDS = float(
+    os.getenv("BACKFILL_MAX_REPLICATION_LAG_SECONDS", "10")
+)
+BACKFILL_LAG_POLL_SECONDS = float(os.getenv("BACKFILL_LAG_POLL_SECONDS", "5"))
+BACKFILL_LOCK_TIMEOUT_MS = int(os.getenv("BACKFILL_LOCK_TIMEOUT_MS", "2000"))
+BACKFILL_MAX_RETRIES = int(os.getenv("BACKFILL_MAX_RETRIES", "5"))
+
+# Worker memory (app/workers/memory.py). Prefork children are recycled after
+# a task once their RSS passes WORKER_MAX_MEMORY_PER_CHILD_MB (0 disables).
+# With profiling on, RSS and torch allocator stats are recorded around every
+# task, a sampled fraction of tasks is traced with tracemalloc, and RSS
+# growing by more than WORKER_MEMORY_LEAK_BYTES_PER_TASK over the last
+# WORKER_MEMORY_WINDOW tasks is reported as a leak.
+WORKER_MAX_MEMORY_PER_CHILD_MB = int(os.getenv("WORKER_MAX_MEMORY_PER_CHILD_MB", "4096"))
+WORKER_MEMORY_PROFILING_ENABLED = (
+    os.getenv("WORKER_MEMORY_PROFILING_ENABLED", "false").lower() == "true"
+)
+WORKER_MEMORY_TRACEMALLOC_SAMPLE_RATE = float(
+    os.getenv("WORKER_MEMORY_TRACEMALLOC_SAMPLE_RATE", "0.01")
+)
+WORKER_MEMORY_TOP_ALLOCATIONS = int(os.getenv("WORKER_MEMORY_TOP_ALLOCATIONS", "10"))
+WORKER_MEMORY_WINDOW = int(os.getenv("WORKER_MEMORY_WINDOW", "50"))
+WORKER_MEMORY_LEAK_BYTES_PER_TASK = int(
+    os.getenv("WORKER_MEMORY_LEAK_BYTES_PER_TASK", str(512 * 1024))
+)
+
+# Deadline-aware insights (app/degradation.py). Fresh-lane tasks carry a
+# deadline INSIGHTS_FRESHNESS_SLO_SECONDS after they are enqueued. Once a task
+# has waited a share of its SLO, or the fresh backlog reaches a threshold, it
+# runs a cheaper tier: "no_embedding" skips the embedding, "minimal" also
+# skips per-turn sentiment. Degraded calls are re-run in full on the backfill
+# lane while the fresh backlog is below INSIGHTS_UPGRADE_MAX_BACKLOG.
+INSIGHTS_DEGRADATION_ENABLED = (
+    os.getenv("INSIGHTS_DEGRADATION_ENABLED", "false").lower() == "true"
+)
+INSIGHTS_FRESHNESS_SLO_SECONDS = float(os.getenv("INSIGHTS_FRESHNESS_SLO_SECONDS", "120"))
+INSIGHTS_DEGRADE_SLO_SHARE = float(os.getenv("INSIGHTS_DEGRADE_SLO_SHARE", "0.5"))
+INSIGHTS_DEGRADE_MINIMAL_SLO_SHARE = float(
+    os.getenv("INSIGHTS_DEGRADE_MINIMAL_SLO_SHARE", "1.0")
+)
+INSIGHTS_DEGRADE_BACKLOG = int(os.getenv("INSIGHTS_DEGRADE_BACKLOG", "500"))
+INSIGHTS_DEGRADE_MINIMAL_BACKLOG = int(os.getenv("INSIGHTS_DEGRADE_MINIMAL_BACKLOG", "2000"))
+INSIGHTS_UPGRADE_MAX_BACKLOG = int(os.getenv("INSIGHTS_UPGRADE_MAX_BACKLOG", "50"))
+INSIGHTS_UPGRADE_BATCH_SIZE = int(os.getenv("INSIGHTS_UPGRADE_BATCH_SIZE", "200"))
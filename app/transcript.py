@@ -0,0 +1,120 @@
+import re
+from array import array
+from typing import Dict, Iterator, List, Tuple
+
+# Speaker codes stored in Turns.speakers
+AGENT = 0
+CUSTOMER = 1
+UNKNOWN = 2
+SPEAKER_NAMES = ("agent", "customer", "unknown")
+
+# A speaker tag starts a new turn wherever it appears, so transcripts that were
+# stored on a single line (before turns existed) still parse into turns.
+_SPEAKER_TAG = re.compile(r"(?:^|(?<=\s))(agent|customer)\s*:", re.IGNORECASE)
+
+
+class Turns:
+    """
+    Compact per-turn view of a normalized transcript.
+
+    Each turn i has a speaker code, the [start, end) character offsets of its
+    content (without the "speaker: " prefix) inside the transcript, and its
+    word count. Stored alongside the transcript so nothing has to re-split it.
+    """
+
+    __slots__ = ("speakers", "starts", "ends", "word_counts")
+
+    def __init__(self, speakers=(), starts=(), ends=(), word_counts=()):
+        self.speakers = array("B", speakers)
+        self.starts = array("I", starts)
+        self.ends = array("I", ends)
+        self.word_counts = array("I", word_counts)
+
+    def __len__(self) -> int:
+        return len(self.speakers)
+
+    def append(self, speaker: int, start: int, end: int, word_count: int):
+        self.speakers.append(speaker)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.word_counts.append(word_count)
+
+    def content(self, transcript: str, i: int) -> str:
+        return transcript[self.starts[i] : self.ends[i]]
+
+    def iter_turns(self, transcript: str) -> Iterator[Tuple[int, str]]:
+        """Yield (speaker code, content) for every turn."""
+        for i in range(len(self)):
+            yield self.speakers[i], transcript[self.starts[i] : self.ends[i]]
+
+    def word_totals(self) -> Tuple[int, int]:
+        """Return (agent words, customer words)."""
+        agent_words = customer_words = 0
+        for speaker, count in zip(self.speakers, self.word_counts):
+            if speaker == AGENT:
+                agent_words += count
+            elif speaker == CUSTOMER:
+                customer_words += count
+        return agent_words, customer_words
+
+    def to_dict(self) -> Dict[str, List[int]]:
+        return {
+            "speakers": self.speakers.tolist(),
+            "starts": self.starts.tolist(),
+            "ends": self.ends.tolist(),
+            "word_counts": self.word_counts.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, List[int]]) -> "Turns":
+        return cls(
+            data["speakers"], data["starts"], data["ends"], data["word_counts"]
+        )
+
+
+class TranscriptBuilder:
+    """Builds a "speaker: content" per line transcript and its Turns together."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.turns = Turns()
+        self._length = 0
+
+    def add(self, speaker: int, words: List[str]):
+        if not words:
+            return
+        if self.lines:
+            self._length += 1  # newline separating turns
+
+        prefix = f"{SPEAKER_NAMES[speaker]}: " if speaker != UNKNOWN else ""
+        content = " ".join(words)
+        start = self._length + len(prefix)
+        self.lines.append(prefix + content)
+        self.turns.append(speaker, start, start + len(content), len(words))
+        self._length = start + len(content)
+
+    def build(self) -> Tuple[str, Turns]:
+        return "\n".join(self.lines), self.turns
+
+
+def parse_transcript(raw: str) -> Tuple[str, Turns]:
+    """
+    Tokenize a raw transcript in a single pass.
+
+    Returns the normalized transcript (lowercased, whitespace collapsed, one
+    "speaker: content" turn per line) and its Turns.
+    """
+    builder = TranscriptBuilder()
+    if not raw:
+        return builder.build()
+
+    tags = list(_SPEAKER_TAG.finditer(raw))
+    # Text before the first speaker tag (or untagged transcripts)
+    builder.add(UNKNOWN, raw[: tags[0].start() if tags else len(raw)].lower().split())
+
+    for i, tag in enumerate(tags):
+        end = tags[i + 1].start() if i + 1 < len(tags) else len(raw)
+        speaker = AGENT if tag.group(1).lower() == "agent" else CUSTOMER
+        builder.add(speaker, raw[tag.end() : end].lower().split())
+
+    return builder.build()
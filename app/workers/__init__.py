@@ -1,5 +1,16 @@
-from app.workers.ingestion import ingest_call as ingest_call
-from app.workers.insights import generate_call_insights as generate_call_insights
+import importlib
+
+# Tasks are resolved lazily so that importing one worker module does not pull in
+# the other (the insights worker loads the ML stack on demand).
+_TASK_MODULES = {
+    "ingest_call": "app.workers.ingestion",
+    "generate_call_insights": "app.workers.insights",
+}
 
 __all__ = ['ingest_call', 'generate_call_insights']
-    
\ No newline at end of file
+
+
+def __getattr__(name):
+    if name in _TASK_MODULES:
+        return getattr(importlib.import_module(_TASK_MODULES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,53 @@
+import structlog
+from celery import shared_task
+from celery.signals import worker_ready, worker_shutdown
+
+from app.affinity import Heartbeat, forget, node_name, node_queue, stale_nodes
+from app.lanes import LANES, move_messages, queue_name
+from app.settings import INSIGHTS_AFFINITY_ENABLED
+
+logger = structlog.get_logger(__name__)
+
+_heartbeat = {"thread": None}
+
+
+@worker_ready.connect
+def join_affinity_ring(sender=None, **kwargs):
+    """
+    Start heartbeating once the worker consumes this node's affinity queues
+    (see app.scripts.run_insights_workers); other workers never join the ring.
+    """
+    if not INSIGHTS_AFFINITY_ENABLED or _heartbeat["thread"] is not None:
+        return
+    node = node_name()
+    consumed = set(sender.app.amqp.queues.consume_from or {})
+    if not any(node_queue(queue_name(lane), node) in consumed for lane in LANES):
+        return
+    _heartbeat["thread"] = Heartbeat(node)
+    _heartbeat["thread"].start()
+    logger.info("Joined affinity ring", node=node)
+
+
+@worker_shutdown.connect
+def leave_affinity_ring(**kwargs):
+    if _heartbeat["thread"] is not None:
+        _heartbeat["thread"].stop()
+        logger.info("Left affinity ring", node=_heartbeat["thread"].node)
+        _heartbeat["thread"] = None
+
+
+@shared_task
+def requeue_orphaned_affinity_queues():
+    """
+    Hand the affinity queues of nodes that stopped heartbeating (crashed or
+    gone) back to the shared lane queues. Scheduled every minute by Celery beat.
+    """
+    moved = {}
+    for node in stale_nodes():
+        moved[node] = sum(
+            move_messages(node_queue(queue_name(lane), node), queue_name(lane))
+            for lane in LANES
+        )
+        forget(node)
+        logger.info("Requeued orphaned affinity queue", node=node, messages=moved[node])
+    return moved
@@ -0,0 +1,107 @@
+import hashlib
+import json
+from typing import Any, Callable
+
+import structlog
+from redis.exceptions import RedisError
+
+from app.cache import redis_client
+from app.settings import INSIGHTS_CHECKPOINT_TTL_SECONDS, INSIGHTS_CHECKPOINTS_ENABLED
+
+logger = structlog.get_logger(__name__)
+
+_MISSING = object()
+
+
+class StageCheckpoint:
+    """
+    Results of finished insights stages for one call, kept in a Redis hash
+    with a TTL so a retried task resumes at the first unfinished stage.
+
+    Checkpoints are tied to a fingerprint of the transcript: if the call was
+    re-ingested with a different transcript in the meantime they are dropped.
+    Redis errors disable checkpointing for the task instead of failing it.
+    """
+
+    def __init__(
+        self,
+        call_id: int,
+        transcript: str,
+        client=redis_client,
+        ttl: int = INSIGHTS_CHECKPOINT_TTL_SECONDS,
+        enabled: bool = INSIGHTS_CHECKPOINTS_ENABLED,
+    ):
+        self.call_id = call_id
+        self.key = f"insights:checkpoint:{call_id}"
+        self.fingerprint = hashlib.sha1((transcript or "").encode("utf-8")).hexdigest()
+        self.client = client
+        self.ttl = ttl
+        self.enabled = enabled
+        self._stages = {}
+
+        if self.enabled:
+            self._load()
+
+    def _load(self):
+        try:
+            stored = self.client.hgetall(self.key)
+        except RedisError as e:
+            self._disable(e)
+            return
+
+        stages = {field.decode(): json.loads(value) for field, value in stored.items()}
+        if stages.pop("_fingerprint", None) == self.fingerprint:
+            self._stages = stages
+        elif stages:
+            logger.info("Discarding stale checkpoint", call_id=self.call_id)
+            self.clear()
+
+    def _disable(self, error: Exception):
+        logger.warning(
+            f"Checkpointing disabled: {str(error)}", call_id=self.call_id
+        )
+        self.enabled = False
+
+    def completed(self):
+        """Names of stages with a stored result."""
+        return list(self._stages)
+
+    def get(self, stage: str, default: Any = _MISSING) -> Any:
+        return self._stages.get(stage, default)
+
+    def save(self, stage: str, value: Any):
+        self._stages[stage] = value
+        if not self.enabled:
+            return
+        try:
+            pipe = self.client.pipeline()
+            pipe.hset(
+                self.key,
+                mapping={
+                    "_fingerprint": json.dumps(self.fingerprint),
+                    stage: json.dumps(value),
+                },
+            )
+            pipe.expire(self.key, self.ttl)
+            pipe.execute()
+        except RedisError as e:
+            self._disable(e)
+
+    def run(self, stage: str, fn: Callable[[], Any]) -> Any:
+        """Return the stage's checkpointed result, or run `fn` and checkpoint it."""
+        value = self.get(stage)
+        if value is not _MISSING:
+            logger.info("Resuming from checkpoint", call_id=self.call_id, stage=stage)
+            return value
+        value = fn()
+        self.save(stage, value)
+        return value
+
+    def clear(self):
+        self._stages = {}
+        if not self.enabled:
+            return
+        try:
+            self.client.delete(self.key)
+        except RedisError as e:
+            self._disable(e)
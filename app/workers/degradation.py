@@ -0,0 +1,51 @@
+import structlog
+from celery import shared_task
+from redis.exceptions import RedisError
+
+from app.cache import redis_client
+from app.degradation import DEGRADED_TIERS, fresh_backlog
+from app.lanes import BACKFILL, queue_depth, queue_name
+from app.models.calls import CallRepository
+from app.settings import (
+    INSIGHTS_BACKFILL_MAX_DEPTH,
+    INSIGHTS_UPGRADE_BATCH_SIZE,
+    INSIGHTS_UPGRADE_MAX_BACKLOG,
+)
+from app.workers.ingestion import trigger_generate_call_insights
+
+logger = structlog.get_logger(__name__)
+
+# Set while a call's upgrade is queued, so later runs don't queue it again
+UPGRADE_KEY = "insights:upgrade:{call_id}"
+UPGRADE_CLAIM_SECONDS = 3600
+
+
+@shared_task
+def upgrade_degraded_calls():
+    """
+    Re-run calls processed at a degraded tier in full, on the backfill lane,
+    while the fresh lane is quiet. Scheduled every few minutes by Celery beat.
+    """
+    try:
+        backlog = fresh_backlog()
+        if backlog >= INSIGHTS_UPGRADE_MAX_BACKLOG:
+            logger.info("Fresh backlog too long to upgrade degraded calls", backlog=backlog)
+            return 0
+        room = INSIGHTS_BACKFILL_MAX_DEPTH - queue_depth(queue_name(BACKFILL))
+    except RedisError as e:
+        logger.error(f"Could not check insights backlog: {str(e)}")
+        return 0
+    limit = min(INSIGHTS_UPGRADE_BATCH_SIZE, room)
+    if limit <= 0:
+        return 0
+
+    queued = 0
+    for call in CallRepository().find_degraded(DEGRADED_TIERS, limit):
+        key = UPGRADE_KEY.format(call_id=call.call_id)
+        if not redis_client.set(key, 1, nx=True, ex=UPGRADE_CLAIM_SECONDS):
+            continue
+        trigger_generate_call_insights(call.call_id, BACKFILL, call.customer_id)
+        queued += 1
+    if queued:
+        logger.info("Queued degraded calls for upgrade", calls=queued)
+    return queued
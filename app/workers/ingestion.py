@@ -5,9 +5,15 @@ from app.faker import FakerDB
 
 from app.models import DBCall
 from app.models.calls import CallRepository
+from app.models.search import SearchRepository
 from datetime import datetime
+import redis
 import structlog
-from app.workers.insights import generate_call_insights
+from app.dedup import MinHashLSH, compute_minhash, record_dedup_outcome
+from app.keywords import search_text
+from app.lanes import FRESH, enqueue_insights
+from app.settings import DEDUP_ENABLED, INSIGHTS_AFFINITY_KEY
+from app.transcript import Turns, parse_transcript
 
 logger = structlog.get_logger(__name__)
 
@@ -16,19 +22,23 @@ os.makedirs(DATA_DIR, exist_ok=True)
 
 
 @shared_task(bind=True)
-def ingest_call(self, call_id: int):
+def ingest_call(self, call_id: int, lane: str = FRESH):
     """
     Orchestrate: get fake call -> dump -> normalize -> map -> save
+
+    `lane` is the insights lane the call is queued on (fresh for live
+    traffic, backfill for bulk reprocessing).
     """
-    logger.info(f"Starting ingestion for call_id: {call_id}")
+    logger.info("Starting ingestion", call_id=call_id)
 
     raw_call = FakerDB.get_call(call_id)
     dump_call(raw_call, call_id)
     norm_call = normalize_call(raw_call)
     db_call = map_to_db_call(norm_call)
     saved = save_call(db_call)
-    trigger_generate_call_insights(saved.call_id)
-    logger.info(f"Completed ingestion for call_id: {call_id}", taskId=self.request.id)
+    if not reuse_near_duplicate_insights(saved):
+        trigger_generate_call_insights(saved.call_id, lane, saved.customer_id)
+    logger.info("Completed ingestion", call_id=call_id, taskId=self.request.id)
 
     return {"status": "success", "call_id": saved.call_id, "taskId": self.request.id}
 
@@ -60,7 +70,9 @@ def dump_call(call: dict, call_id: int):
     with open(filepath, "w") as f:
         json.dump(calls_list, f, indent=2)
 
-    logger.info(f"Dumped call {call_id} to {filepath} (total calls: {len(calls_list)})")
+    logger.info(
+        "Dumped call", call_id=call_id, path=filepath, total_calls=len(calls_list)
+    )
 
 
 def normalize_call(call: dict) -> dict:
@@ -84,11 +96,11 @@ def normalize_call(call: dict) -> dict:
             )
             raise ValueError(f"Missing required field: {field}")
 
-    # 2. Normalize transcript
-    transcript = call.get("transcript", "")
-    transcript = transcript.replace("\n", " ").strip()
-    transcript = " ".join(transcript.split())  # collapse spaces
-    normalized_data["transcript"] = transcript.lower()
+    # 2. Normalize transcript: lowercase, collapse spaces, one turn per line,
+    # tokenized once into turns that later stages reuse
+    transcript, turns = parse_transcript(call.get("transcript", ""))
+    normalized_data["transcript"] = transcript
+    normalized_data["turns"] = turns.to_dict()
 
     # 3. Normalize start_time -> datetime for Postgres
     start_time = call.get("start_time")
@@ -110,9 +122,13 @@ def normalize_call(call: dict) -> dict:
     normalized_data["language"] = str(call["language"]).lower()
     normalized_data["duration_seconds"] = int(call["duration_seconds"])
 
+    # The transcript itself is not logged: it dominated log volume and CPU
     logger.info(
-        f"Normalized call data for call_id: {call['call_id']}",
-        normalized_data=normalized_data,
+        "Normalized call",
+        call_id=normalized_data["call_id"],
+        language=normalized_data["language"],
+        transcript_chars=len(transcript),
+        turns=len(turns),
     )
 
     return normalized_data
@@ -129,6 +145,7 @@ def map_to_db_call(call: dict) -> DBCall:
         start_time=call["start_time"],
         duration_seconds=call["duration_seconds"],
         transcript=call["transcript"],
+        turns=call["turns"],
         agent_talk_ratio=None,
         sentiment_score=None,
         embedding=None,
@@ -142,5 +159,80 @@ def save_call(db_call: DBCall):
     return saved
 
 
-def trigger_generate_call_insights(call_id: int):
-    generate_call_insights.apply_async(kwargs={"call_id": call_id}, queue="insights")
+def trigger_generate_call_insights(
+    call_id: int, lane: str = FRESH, customer_id: int = None
+):
+    # Dispatched by name so ingestion never imports the insights module (and its ML stack)
+    affinity_key = customer_id if INSIGHTS_AFFINITY_KEY == "customer_id" else call_id
+    return enqueue_insights(call_id, lane, affinity_key)
+
+
+def reuse_near_duplicate_insights(db_call: DBCall) -> bool:
+    """
+    Look up the call's MinHash signature in the LSH index and, if an already
+    scored call is similar enough, copy its insights instead of running inference.
+
+    Reused insights are flagged under sentiment_scores["dedup"].
+    Returns True when insights were reused.
+    """
+    if not DEDUP_ENABLED:
+        return False
+
+    try:
+        lsh = MinHashLSH()
+        signature = compute_minhash(db_call.transcript or "")
+        matches = lsh.query(signature, exclude=db_call.call_id)
+        lsh.insert(db_call.call_id, signature)
+
+        repo = CallRepository()
+        for source_call_id, similarity in matches:
+            source = repo.get(source_call_id, with_transcript=False)
+            if source is None or source.processing_status != "completed":
+                continue
+
+            sentiment_scores = dict(source.sentiment_scores or {})
+            sentiment_scores["dedup"] = {
+                "source_call_id": source_call_id,
+                "similarity": similarity,
+            }
+            repo.update_insights(
+                call_id=db_call.call_id,
+                agent_talk_ratio=source.agent_talk_ratio,
+                sentiment_score=source.sentiment_score,
+                sentiment_scores=sentiment_scores,
+                embedding=source.embedding,
+                keywords=source.keywords,
+                status="completed",
+            )
+            # The transcript differs slightly from the source's; index its own terms
+            try:
+                SearchRepository().index_documents(
+                    {
+                        db_call.call_id: search_text(
+                            db_call.transcript, Turns.from_dict(db_call.turns)
+                        )
+                    }
+                )
+            except Exception as e:
+                # The insights are stored; `index_keywords backfill --restart`
+                # rebuilds the index
+                logger.error(
+                    f"Search indexing failed: {str(e)}", call_id=db_call.call_id
+                )
+            record_dedup_outcome(hit=True)
+            logger.info(
+                "Reused insights from near-duplicate call",
+                call_id=db_call.call_id,
+                source_call_id=source_call_id,
+                similarity=similarity,
+            )
+            return True
+
+        record_dedup_outcome(hit=False)
+    except redis.RedisError as e:
+        # The index is an optimisation only; fall back to full inference
+        logger.warning(
+            f"Near-duplicate lookup failed: {str(e)}", call_id=db_call.call_id
+        )
+
+    return False
@@ -1,211 +1,247 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
-import torch
-from sentence_transformers import SentenceTransformer
-from transformers import pipeline, AutoModelForSequenceClassification, AutoTokenizer
+from sqlalchemy.orm import undefer_group
 
 from app.models.calls import DBCall, CallRepository
+from app.models.search import SearchRepository
 from app.db import SessionLocal
+from app.degradation import FULL, MINIMAL, choose_tier, degraded_marker
+from app.keywords import extract_keywords, search_text
+from app.lanes import RETRY, queue_name
+from app.transcript import SPEAKER_NAMES, TranscriptBuilder, Turns, parse_transcript
+from app.workers.checkpoints import StageCheckpoint
+from app.workers.registry import EMBEDDING, SENTIMENT, registry
+from app.workers.sentiment_head import fast_sentiment_head, predict_sentiment
 import structlog
 from celery import shared_task
 
 # Initialize logging
 logger = structlog.get_logger()
 
-# Initialize models (lazy loading)
-MODEL_CACHE = {}
 
-
-def get_sentence_transformer():
-    if "sentence_transformer" not in MODEL_CACHE:
-        MODEL_CACHE["sentence_transformer"] = SentenceTransformer(
-            "sentence-transformers/all-MiniLM-L6-v2",
-            device="cuda" if torch.cuda.is_available() else "cpu",
-        )
-    return MODEL_CACHE["sentence_transformer"]
-
-
-def get_sentiment_analyzer():
-    if "sentiment_analyzer" not in MODEL_CACHE:
-        model_name = "distilbert-base-uncased-finetuned-sst-2-english"
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        model = AutoModelForSequenceClassification.from_pretrained(model_name)
-        MODEL_CACHE["sentiment_analyzer"] = pipeline(
-            "sentiment-analysis",
-            model=model,
-            tokenizer=tokenizer,
-            device=0 if torch.cuda.is_available() else -1,
-        )
-    return MODEL_CACHE["sentiment_analyzer"]
-
-
-def calculate_agent_talk_ratio(transcript: str) -> float:
+# Common filler words and phrases
+FILLER_WORDS = {
+    "um",
+    "uh",
+    "ah",
+    "er",
+    "like",
+    "you know",
+    "i mean",
+    "sort of",
+    "kind of",
+    "basically",
+    "actually",
+    "literally",
+    "right",
+    "okay",
+    "so",
+    "well",
+    "just",
+    "really",
+    "very",
+    "quite",
+    "somewhat",
+    "maybe",
+    "i guess",
+    "i think",
+    "i suppose",
+    "you see",
+    "you know what i mean",
+    "at the end of the day",
+    "to be honest",
+    "believe me",
+    "you know what",
+    "or something",
+    "or whatever",
+    "and stuff",
+    "and things",
+    "and everything",
+    "and all",
+    "or something like that",
+    "or anything",
+    "or whatever",
+    "or so",
+    "or something",
+    "or whatever",
+    "i don't know",
+    "i mean",
+    "you know what i'm saying",
+    "if you will",
+    "as it were",
+}
+
+
+def get_sentence_transformer(language: str = "en"):
+    return registry.get(EMBEDDING, language)
+
+
+def get_sentiment_analyzer(language: str = "en"):
+    return registry.get(SENTIMENT, language)
+
+
+def calculate_agent_talk_ratio(turns: Turns) -> float:
     """
-    Calculate the ratio of agent words to total words in the transcript.
-    Assumes transcript format with speaker tags like 'Agent:' or 'Customer:'.
+    Calculate the ratio of agent words to total words from the transcript turns.
     """
-    if not transcript:
-        return 0.0
-
-    agent_words = 0
-    customer_words = 0
-
-    for line in transcript.split("\n"):
-        line = line.strip()
-        if not line:
-            continue
-
-        # Simple speaker detection (can be enhanced based on actual transcript format)
-        if line.lower().startswith("agent:"):
-            agent_words += len(line.split()) - 1  # Subtract 1 for the 'Agent:' prefix
-        elif line.lower().startswith("customer:"):
-            customer_words += (
-                len(line.split()) - 1
-            )  # Subtract 1 for the 'Customer:' prefix
-
+    agent_words, customer_words = turns.word_totals()
     total_words = agent_words + customer_words
     return agent_words / total_words if total_words > 0 else 0.0
 
 
-def analyze_sentiment(text: str) -> Dict:
+def format_sentiment(result: Dict) -> Dict:
+    """
+    Convert a raw pipeline result into our sentiment dict on a -1 to 1 scale.
     """
-    Analyze sentiment of text using the sentiment analysis pipeline.
-    Returns a dictionary with 'label' and 'score'.
+    # Multilingual models use lowercase labels and add a neutral class
+    label = result["label"].upper()
+
+    # Convert to -1 to 1 scale
+    score = result["score"]
+    if label == "NEGATIVE":
+        score = -score
+    elif label == "NEUTRAL":
+        score = 0.0
+
+    formatted = {
+        "label": label,
+        "score": float(score),
+        "confidence": float(result["score"]),
+    }
+    if "source" in result:
+        # Labelled from the embedding (app.workers.sentiment_head)
+        formatted["source"] = result["source"]
+        formatted["head_id"] = result["head_id"]
+    return formatted
+
+
+def analyze_sentiment(
+    text: str, language: str = "en", embedding: Optional[List[float]] = None
+) -> Dict:
+    """
+    Analyze sentiment of text using the sentiment model for `language`.
+    Returns a dictionary with 'label' and 'score'. Model errors propagate so
+    the task retries this stage. With fast sentiment on, the label comes from
+    `embedding` when the head is confident enough.
     """
     if not text.strip():
         return {"label": "NEUTRAL", "score": 0.0}
 
-    try:
-        sentiment_analyzer = get_sentiment_analyzer()
-        result = sentiment_analyzer(text[:512])[0]  # Limit to first 512 tokens
+    head_id = fast_sentiment_head(language) if embedding else None
+    if head_id is not None:
+        result = predict_sentiment(head_id, [embedding])[0]
+        if result is not None:
+            return format_sentiment(result)
 
-        # Convert to -1 to 1 scale
-        score = result["score"]
-        if result["label"] == "NEGATIVE":
-            score = -score
+    sentiment_analyzer = get_sentiment_analyzer(language)
+    result = sentiment_analyzer(text[:512])[0]  # Limit to first 512 tokens
+    return format_sentiment(result)
 
-        return {
-            "label": result["label"],
-            "score": float(score),
-            "confidence": float(result["score"]),
-        }
-    except Exception as e:
-        logger.error(f"Error in sentiment analysis: {str(e)}")
-        return {"label": "ERROR", "score": 0.0, "error": str(e)}
 
+def analyze_sentiment_batch(texts: List[str], language: str = "en") -> List[Dict]:
+    """
+    Batched analyze_sentiment: one model call for all non-empty texts.
+    """
+    results = [{"label": "NEUTRAL", "score": 0.0} for _ in texts]
+    indices = [i for i, text in enumerate(texts) if text.strip()]
+    if not indices:
+        return results
 
-def generate_embeddings(text: str) -> List[float]:
+    sentiment_analyzer = get_sentiment_analyzer(language)
+    outputs = sentiment_analyzer(
+        [texts[i][:512] for i in indices], batch_size=len(indices)
+    )
+    for i, output in zip(indices, outputs):
+        results[i] = format_sentiment(output)
+    return results
+
+
+def generate_embeddings(text: str, language: str = "en") -> List[float]:
     """
     Generate sentence embeddings for the given text.
+    Model errors propagate so the task retries this stage.
     """
     if not text.strip():
         return []
 
-    try:
-        model = get_sentence_transformer()
-        # Encode the text and convert to list for JSON serialization
-        return model.encode(text, convert_to_tensor=False).tolist()
-    except Exception as e:
-        logger.error(f"Error generating embeddings: {str(e)}")
-        return []
+    model = get_sentence_transformer(language)
+    # Encode the text and convert to list for JSON serialization
+    return model.encode(text, convert_to_tensor=False).tolist()
+
+
+def generate_embeddings_batch(texts: List[str], language: str = "en"):
+    """
+    Batched generate_embeddings: returns a (len(texts), dim) float32 array.
+    """
+    model = get_sentence_transformer(language)
+    return model.encode(texts, convert_to_tensor=False, convert_to_numpy=True)
+
+
+def remove_filler_words(content: str) -> str:
+    """
+    Remove filler words from a single utterance (no speaker prefix).
+    """
+    return " ".join(
+        word
+        for word in content.split()
+        if word.lower().strip(".,!?;:\"'()[]{}") not in FILLER_WORDS
+    )
 
 
-def clean_transcript(transcript: str) -> str:
+def clean_transcript(transcript: str, turns: Turns) -> Tuple[str, Turns]:
     """
     Clean the transcript by removing filler words and normalizing text.
 
     Args:
-        transcript: Raw transcript text
+        transcript: Normalized transcript text
+        turns: Turns of `transcript`
 
     Returns:
-        Cleaned transcript with filler words removed
+        Cleaned transcript with filler words removed, and its turns
     """
-    if not transcript:
-        return ""
-
-    # Common filler words and phrases
-    FILLER_WORDS = {
-        "um",
-        "uh",
-        "ah",
-        "er",
-        "like",
-        "you know",
-        "i mean",
-        "sort of",
-        "kind of",
-        "basically",
-        "actually",
-        "literally",
-        "right",
-        "okay",
-        "so",
-        "well",
-        "just",
-        "really",
-        "very",
-        "quite",
-        "somewhat",
-        "maybe",
-        "i guess",
-        "i think",
-        "i suppose",
-        "you see",
-        "you know what i mean",
-        "at the end of the day",
-        "to be honest",
-        "believe me",
-        "you know what",
-        "or something",
-        "or whatever",
-        "and stuff",
-        "and things",
-        "and everything",
-        "and all",
-        "or something like that",
-        "or anything",
-        "or whatever",
-        "or so",
-        "or something",
-        "or whatever",
-        "i don't know",
-        "i mean",
-        "you know what i'm saying",
-        "if you will",
-        "as it were",
-    }
+    builder = TranscriptBuilder()
+    for speaker, content in turns.iter_turns(transcript):
+        # Only non-empty turns are kept
+        builder.add(speaker, remove_filler_words(content).split())
+    return builder.build()
+
+
+def analyze_turn_sentiment(
+    transcript: str, turns: Turns, language: str = "en"
+) -> List[Dict]:
+    """
+    Sentiment of every turn, scored in one batched model call.
+    """
+    if not len(turns):
+        return []
 
-    # Split into lines and process each line
-    lines = []
-    for line in transcript.split("\n"):
-        line = line.strip()
-        if not line:
-            continue
-
-        # Split into speaker and content
-        parts = line.split(":", 1)
-        if len(parts) == 2:
-            speaker, content = parts
-            # Remove filler words from content
-            words = content.split()
-            cleaned_words = [
-                word
-                for word in words
-                if word.lower().strip(".,!?;:\"'()[]{}") not in FILLER_WORDS
-            ]
-            # Only keep non-empty lines
-            if cleaned_words:
-                lines.append(f"{speaker}: {' '.join(cleaned_words)}")
-
-    return "\n".join(lines)
-
-
-def process_call_transcript(transcript: str) -> Dict:
+    results = analyze_sentiment_batch(
+        [turns.content(transcript, i) for i in range(len(turns))], language
+    )
+    return [
+        {"turn": i, "speaker": SPEAKER_NAMES[turns.speakers[i]], **result}
+        for i, result in enumerate(results)
+    ]
+
+
+def process_call_transcript(
+    transcript: str,
+    language: str = "en",
+    turns: Optional[Dict] = None,
+    checkpoint: Optional[StageCheckpoint] = None,
+    tier: str = FULL,
+) -> Dict:
     """
     Process call transcript to extract insights.
 
     Args:
-        transcript: Raw transcript text
+        transcript: Normalized transcript text
+        language: Call language, used to pick the sentiment/embedding models
+        turns: Stored turns of the transcript (parsed here when missing)
+        checkpoint: Where model stage results are checkpointed; stages already
+            in it are not run again
+        tier: Processing tier (app.degradation); cheaper tiers skip the
+            embedding and, for "minimal", per-turn sentiment
 
     Returns:
         Dictionary containing insights
@@ -216,43 +252,95 @@ def process_call_transcript(transcript: str) -> Dict:
             "sentiment_score": 0.0,
             "sentiment_scores": {},
             "embedding": [],
+            "keywords": [],
+            "search_text": "",
         }
 
+    # Calls stored before turns existed are tokenized once here
+    if turns is None:
+        transcript, parsed_turns = parse_transcript(transcript)
+    else:
+        parsed_turns = Turns.from_dict(turns)
+
     # Clean the transcript first
-    cleaned_transcript = clean_transcript(transcript)
+    cleaned_transcript, cleaned_turns = clean_transcript(transcript, parsed_turns)
 
     # Calculate agent talk ratio on cleaned transcript
-    agent_talk_ratio = calculate_agent_talk_ratio(cleaned_transcript)
+    agent_talk_ratio = calculate_agent_talk_ratio(cleaned_turns)
+
+    # Model stages are checkpointed (cleaning and talk ratio are cheap to redo)
+    if checkpoint is None:
+        checkpoint = StageCheckpoint(None, transcript, enabled=False)
+
+    if tier == FULL and not {"embedding", "sentiment"} & set(checkpoint.completed()):
+        # Both in one score_texts call: the cleaned transcript is tokenized once
+        # for both models and, with fast sentiment, labelled from its embedding
+        # Imported here: app.workers.pipeline imports this module
+        from app.workers.pipeline import score_texts
+
+        sentiments, vectors = score_texts([cleaned_transcript], language, [True])
+        embedding = vectors[0].tolist() if 0 in vectors else []
+        sentiment_result = sentiments[0]
+        checkpoint.save("embedding", embedding)
+        checkpoint.save("sentiment", sentiment_result)
+    else:
+        # Resuming (or degraded): only the stages not checkpointed yet run, and
+        # fast sentiment labels from the stored embedding
+        embedding = (
+            checkpoint.run(
+                "embedding", lambda: generate_embeddings(cleaned_transcript, language)
+            )
+            if tier == FULL
+            else []
+        )
+        sentiment_result = checkpoint.run(
+            "sentiment",
+            lambda: analyze_sentiment(cleaned_transcript, language, embedding),
+        )
 
-    # Analyze sentiment on cleaned transcript
-    sentiment_result = analyze_sentiment(cleaned_transcript)
+    # Per-turn sentiment on cleaned turns
+    segments = (
+        checkpoint.run(
+            "segments",
+            lambda: analyze_turn_sentiment(cleaned_transcript, cleaned_turns, language),
+        )
+        if tier != MINIMAL
+        else []
+    )
+
+    # Keywords and the text indexed for search: turn contents, no speaker tags
+    content = search_text(cleaned_transcript, cleaned_turns)
+    keywords = extract_keywords(content)
 
-    # Generate embeddings on cleaned transcript
-    embedding = generate_embeddings(cleaned_transcript)
+    sentiment_scores = {"overall": sentiment_result, "segments": segments}
+    if tier != FULL:
+        sentiment_scores["degraded"] = degraded_marker(tier)
 
     return {
         "agent_talk_ratio": agent_talk_ratio,
         "sentiment_score": sentiment_result["score"],
-        "sentiment_scores": {
-            "overall": sentiment_result,
-        },
+        "sentiment_scores": sentiment_scores,
         "embedding": embedding,
+        "keywords": keywords,
+        "search_text": content,
         "cleaned_transcript": cleaned_transcript,  # For debugging purposes
     }
 
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def generate_call_insights(self, call_id: int) -> Dict:
+def generate_call_insights(self, call_id: int, deadline: Optional[float] = None) -> Dict:
     """
     Celery task to generate insights for a call.
 
     Args:
         call_id: ID of the call to process
+        deadline: When (unix time) the call's insights are due; late or
+            backlogged tasks run a cheaper tier (app.degradation)
 
     Returns:
         Dict with processing results
     """
-    logger.info(f"Starting insights generation for call {call_id}")
+    logger.info("Starting insights generation", call_id=call_id)
     call_repo = CallRepository()
 
     try:
@@ -261,12 +349,24 @@ def generate_call_insights(self, call_id: int) -> Dict:
 
         # Get call data from database
         with SessionLocal() as db:
-            call = db.query(DBCall).filter(DBCall.call_id == call_id).first()
+            call = (
+                db.query(DBCall)
+                .options(undefer_group("transcript"))
+                .filter(DBCall.call_id == call_id)
+                .first()
+            )
             if not call:
                 raise ValueError(f"Call with ID {call_id} not found")
 
-            # Process the transcript
-            insights = process_call_transcript(call.transcript)
+            # Process the transcript, resuming after any stage that finished
+            # in a previous attempt
+            checkpoint = StageCheckpoint(call_id, call.transcript)
+            tier = choose_tier(deadline)
+            if tier != FULL:
+                logger.info("Degraded insights", call_id=call_id, tier=tier)
+            insights = process_call_transcript(
+                call.transcript, call.language, call.turns, checkpoint, tier
+            )
 
             # Update call with insights
             call_repo.update_insights(
@@ -275,10 +375,18 @@ def generate_call_insights(self, call_id: int) -> Dict:
                 sentiment_score=insights["sentiment_score"],
                 sentiment_scores=insights["sentiment_scores"],
                 embedding=insights["embedding"],
+                keywords=insights["keywords"],
                 status="completed",
             )
-
-            logger.info(f"Successfully processed call {call_id}")
+            checkpoint.clear()
+            try:
+                SearchRepository().index_documents({call_id: insights["search_text"]})
+            except Exception as e:
+                # The insights are stored; don't fail (and rerun) the call over
+                # the index, which `index_keywords backfill --restart` rebuilds
+                logger.error(f"Search indexing failed: {str(e)}", call_id=call_id)
+
+            logger.info("Processed call insights", call_id=call_id)
             return {
                 "status": "success",
                 "call_id": call_id,
@@ -290,12 +398,23 @@ def generate_call_insights(self, call_id: int) -> Dict:
         error_msg = f"Error processing call {call_id}: {str(e)}"
         logger.error(error_msg, exc_info=True)
 
-        # Update status with error
-        call_repo.update_insights(
-            call_id=call_id,
-            status=f"failed: {str(e)[:200]}",  # Truncate error message
+        # Update status with error; the DB may be what failed, so don't let
+        # this prevent the retry
+        try:
+            call_repo.update_insights(
+                call_id=call_id,
+                status=f"failed: {str(e)[:200]}",  # Truncate error message
+            )
+        except Exception as status_error:
+            logger.error(f"Could not record failure for call {call_id}: {str(status_error)}")
+
+        # Retry with exponential backoff on the retry lane. Without the
+        # deadline, which it has likely missed already: a retry runs in full
+        raise self.retry(
+            exc=e,
+            args=(),
+            kwargs={"call_id": call_id},
+            countdown=60 * (2**self.request.retries),
+            queue=queue_name(RETRY),
         )
-
-        # Retry with exponential backoff
-        raise self.retry(exc=e, countdown=60 * (2**self.request.retries))
     pass
@@ -0,0 +1,233 @@
+"""
+Per-task memory profiling of worker processes (WORKER_MEMORY_PROFILING_ENABLED).
+
+Around every task, in the process that runs it (the prefork child):
+
+- RSS and, when torch is loaded, its CUDA allocator stats and the bytes held
+  by loaded models are recorded and logged ("Task memory")
+- a sampled fraction of tasks runs under tracemalloc; the allocation sites
+  still holding memory when the task ends are logged (what a task leaves
+  behind is what leaks)
+- RSS after each task feeds a least-squares fit over the last
+  WORKER_MEMORY_WINDOW tasks; steady growth above
+  WORKER_MEMORY_LEAK_BYTES_PER_TASK is reported, with how many more tasks
+  the child can run before WORKER_MAX_MEMORY_PER_CHILD_MB recycles it
+
+The latest figures of each process are kept in Redis (see
+app.scripts.worker_memory). Recycling itself is Celery's
+worker_max_memory_per_child, checked after each task, so a child leaves
+between tasks instead of being OOM-killed in the middle of one.
+"""
+
+import json
+import os
+import random
+import resource
+import socket
+import sys
+import time
+import tracemalloc
+from collections import deque
+from typing import Dict, List, Optional
+
+import structlog
+from celery.signals import task_postrun, task_prerun
+from redis.exceptions import RedisError
+
+from app.cache import redis_client
+from app.settings import (
+    WORKER_MAX_MEMORY_PER_CHILD_MB,
+    WORKER_MEMORY_LEAK_BYTES_PER_TASK,
+    WORKER_MEMORY_PROFILING_ENABLED,
+    WORKER_MEMORY_TOP_ALLOCATIONS,
+    WORKER_MEMORY_TRACEMALLOC_SAMPLE_RATE,
+    WORKER_MEMORY_WINDOW,
+)
+
+logger = structlog.get_logger(__name__)
+
+# Latest stats of one worker process: "worker:memory:<host>:<pid>"
+STATS_KEY = "worker:memory:{host}:{pid}"
+STATS_TTL_SECONDS = 600
+
+# The first tasks of a process load models; their growth is not a leak
+WARMUP_TASKS = 5
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        # Not Linux: peak RSS is the best available (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def torch_stats() -> Dict[str, int]:
+    """CUDA allocator stats and loaded model bytes; empty until torch is imported."""
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return {}
+    from app.workers.registry import registry
+
+    stats = {"models_bytes": registry.memory_usage()}
+    if torch.cuda.is_available():
+        stats["cuda_allocated_bytes"] = torch.cuda.memory_allocated()
+        stats["cuda_reserved_bytes"] = torch.cuda.memory_reserved()
+        stats["cuda_peak_allocated_bytes"] = torch.cuda.max_memory_allocated()
+    return stats
+
+
+def growth_per_task(samples: List[int]) -> tuple:
+    """Least-squares slope (bytes per task) of `samples` and its correlation."""
+    n = len(samples)
+    if n < 2:
+        return 0.0, 0.0
+    mean_x = (n - 1) / 2
+    mean_y = sum(samples) / n
+    sxx = sum((x - mean_x) ** 2 for x in range(n))
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(samples))
+    syy = sum((y - mean_y) ** 2 for y in samples)
+    slope = sxy / sxx
+    correlation = sxy / (sxx * syy) ** 0.5 if syy > 0 else 0.0
+    return slope, correlation
+
+
+def top_allocations(snapshot, limit: int = WORKER_MEMORY_TOP_ALLOCATIONS) -> List[Dict]:
+    stats = snapshot.filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    ).statistics("lineno")
+    return [
+        {"site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}", "bytes": s.size, "count": s.count}
+        for s in stats[:limit]
+    ]
+
+
+class MemoryProfiler:
+    """Memory figures of the tasks run by this process."""
+
+    def __init__(
+        self,
+        window: int = WORKER_MEMORY_WINDOW,
+        leak_bytes_per_task: int = WORKER_MEMORY_LEAK_BYTES_PER_TASK,
+        sample_rate: float = WORKER_MEMORY_TRACEMALLOC_SAMPLE_RATE,
+        max_rss_bytes: int = WORKER_MAX_MEMORY_PER_CHILD_MB * 1024 * 1024,
+        client=redis_client,
+    ):
+        self.window = window
+        self.leak_bytes_per_task = leak_bytes_per_task
+        self.sample_rate = sample_rate
+        self.max_rss_bytes = max_rss_bytes
+        self.client = client
+        self.pid = os.getpid()
+        self.tasks = 0
+        self.samples = deque(maxlen=window)
+        self.leaking = False
+        self.last_top_allocations: Optional[List[Dict]] = None
+        self._running = {}
+
+    def before(self, task_id: str):
+        traced = not tracemalloc.is_tracing() and random.random() < self.sample_rate
+        if traced:
+            tracemalloc.start()
+        self._running[task_id] = (rss_bytes(), time.perf_counter(), traced)
+
+    def after(self, task_id: str, task_name: str) -> Optional[Dict]:
+        if task_id not in self._running:
+            return None
+        rss_before, started, traced = self._running.pop(task_id)
+        rss_after = rss_bytes()
+        self.tasks += 1
+
+        stats = {
+            "task": task_name,
+            "rss_before_bytes": rss_before,
+            "rss_after_bytes": rss_after,
+            "rss_delta_bytes": rss_after - rss_before,
+            "duration_s": round(time.perf_counter() - started, 3),
+            **torch_stats(),
+        }
+        if traced:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            self.last_top_allocations = top_allocations(snapshot)
+            stats["top_allocations"] = self.last_top_allocations
+        logger.info("Task memory", **stats)
+
+        if self.tasks > WARMUP_TASKS:
+            self.samples.append(rss_after)
+        self._check_growth(rss_after)
+        self._publish(rss_after, stats)
+        return stats
+
+    def tasks_until_recycle(self, rss: int) -> Optional[int]:
+        """Tasks left before the RSS limit at the current growth rate (None if not growing)."""
+        slope, _ = growth_per_task(list(self.samples))
+        if self.max_rss_bytes <= 0 or slope <= 0:
+            return None
+        return max(0, int((self.max_rss_bytes - rss) / slope))
+
+    def _check_growth(self, rss: int):
+        if len(self.samples) < self.window:
+            return
+        slope, correlation = growth_per_task(list(self.samples))
+        leaking = slope > self.leak_bytes_per_task and correlation > 0.9
+        if leaking and not self.leaking:
+            logger.warning(
+                "Steady memory growth",
+                pid=self.pid,
+                growth_bytes_per_task=int(slope),
+                correlation=round(correlation, 3),
+                rss_bytes=rss,
+                tasks_until_recycle=self.tasks_until_recycle(rss),
+                top_allocations=self.last_top_allocations,
+            )
+        self.leaking = leaking
+
+    def _publish(self, rss: int, stats: Dict):
+        slope, _ = growth_per_task(list(self.samples))
+        key = STATS_KEY.format(host=socket.gethostname(), pid=self.pid)
+        values = {
+            "rss_bytes": rss,
+            "tasks": self.tasks,
+            "growth_bytes_per_task": int(slope),
+            "leaking": int(self.leaking),
+            "tasks_until_recycle": json.dumps(self.tasks_until_recycle(rss)),
+            "torch": json.dumps({k: v for k, v in stats.items() if k.endswith("bytes") and not k.startswith("rss")}),
+            "top_allocations": json.dumps(self.last_top_allocations),
+            "updated_at": time.time(),
+        }
+        try:
+            pipe = self.client.pipeline()
+            pipe.hset(key, mapping=values)
+            pipe.expire(key, STATS_TTL_SECONDS)
+            pipe.execute()
+        except RedisError as e:
+            logger.error(f"Could not publish worker memory stats: {str(e)}")
+
+
+_profiler = {"profiler": None}
+
+
+def get_profiler() -> MemoryProfiler:
+    # One per process; a forked child starts its own
+    profiler = _profiler["profiler"]
+    if profiler is None or profiler.pid != os.getpid():
+        profiler = _profiler["profiler"] = MemoryProfiler()
+    return profiler
+
+
+@task_prerun.connect
+def record_memory_before(task_id=None, **kwargs):
+    if WORKER_MEMORY_PROFILING_ENABLED:
+        get_profiler().before(task_id)
+
+
+@task_postrun.connect
+def record_memory_after(task_id=None, task=None, **kwargs):
+    if WORKER_MEMORY_PROFILING_ENABLED:
+        get_profiler().after(task_id, getattr(task, "name", None))
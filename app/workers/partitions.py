@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import structlog
+from celery import shared_task
+
+from app.models.calls import CallRepository
+from app.settings import (
+    CALLS_PARTITION_MONTHS_AHEAD,
+    CALLS_RETENTION_DROP,
+    CALLS_RETENTION_MONTHS,
+)
+
+logger = structlog.get_logger(__name__)
+
+
+def retention_cutoff(now: datetime, months: int) -> datetime:
+    """Start of the month `months` months before `now`'s month."""
+    index = now.year * 12 + now.month - 1 - months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+@shared_task
+def maintain_call_partitions():
+    """
+    Create upcoming monthly partitions of `calls` and retire the ones past
+    the retention window. Scheduled daily by Celery beat.
+    """
+    repo = CallRepository()
+    created = repo.ensure_partitions(CALLS_PARTITION_MONTHS_AHEAD)
+    logger.info(f"Created {created} calls partitions")
+
+    retired = []
+    if CALLS_RETENTION_MONTHS > 0:
+        cutoff = retention_cutoff(datetime.utcnow(), CALLS_RETENTION_MONTHS)
+        retired = repo.retire_partitions(cutoff, drop=CALLS_RETENTION_DROP)
+        logger.info(
+            f"Retired {len(retired)} calls partitions",
+            cutoff=cutoff.isoformat(),
+            partitions=retired,
+            dropped=CALLS_RETENTION_DROP,
+        )
+    return {"created": created, "retired": retired}
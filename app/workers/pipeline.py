@@ -0,0 +1,449 @@
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+from sqlalchemy.orm import undefer_group
+
+from app.db import SessionLocal
+from app.degradation import FULL, MINIMAL, choose_tier, degraded_marker
+from app.keywords import extract_keywords_batch, search_text
+from app.models.calls import CallRepository, DBCall
+from app.models.search import SearchRepository
+from app.settings import (
+    INSIGHTS_PIPELINE_CLEAN_WORKERS,
+    INSIGHTS_PIPELINE_QUEUE_DEPTH,
+    INSIGHTS_PIPELINE_STATS_SECONDS,
+)
+from app.transcript import SPEAKER_NAMES, Turns, parse_transcript
+from app.workers.insights import (
+    analyze_sentiment_batch,
+    calculate_agent_talk_ratio,
+    clean_transcript,
+    format_sentiment,
+    generate_embeddings_batch,
+    get_sentence_transformer,
+    get_sentiment_analyzer,
+)
+from app.workers.sentiment_head import fast_sentiment_head, predict_sentiment
+from app.workers.tokenization import (
+    Encoded,
+    embeddings_from_tokens,
+    sentiment_from_tokens,
+    shared_tokenizer,
+)
+
+logger = structlog.get_logger(__name__)
+
+_DONE = object()
+
+
+class StageStats:
+    """
+    Where one pipeline stage spends its time: working, starved (waiting for
+    input) or blocked (waiting for room downstream, i.e. backpressure).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.batches = 0
+        self.items = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, field: str, seconds: float):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + seconds)
+
+    def done(self, items: int):
+        with self._lock:
+            self.batches += 1
+            self.items += items
+
+    def as_dict(self, elapsed: float) -> Dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "utilization": self.busy / elapsed if elapsed > 0 else 0.0,
+                "starved_s": round(self.starved, 3),
+                "blocked_s": round(self.blocked, 3),
+            }
+
+
+class Batch:
+    def __init__(self, call_ids: List[int]):
+        self.call_ids = call_ids
+        self.items: List[Dict] = []
+        self.error: Optional[Exception] = None
+
+
+class InsightsPipeline:
+    """
+    Generates insights for batches of calls with the stages overlapped:
+
+        reader thread  -> loads the next batch of transcripts from the DB
+        clean stage    -> cleans/tokenizes a batch on a thread pool, extracts keywords
+        model stage    -> batched sentiment and embedding inference (caller's thread)
+        writer thread  -> bulk-writes insights, indexes keywords, invalidates caches
+
+    Stages are connected by bounded queues, so a slow stage holds back the
+    ones before it instead of buffering without limit. `on_done(call_ids,
+    error)` is called from the writer thread once a batch is stored (or failed).
+    `deadline_for(call_id)` gives when a call's insights are due, if ever;
+    the model stage picks each call's tier from it (app.degradation).
+    """
+
+    def __init__(
+        self,
+        on_done: Callable[[List[int], Optional[Exception]], None] = None,
+        deadline_for: Callable[[int], Optional[float]] = None,
+        queue_depth: int = INSIGHTS_PIPELINE_QUEUE_DEPTH,
+        clean_workers: int = INSIGHTS_PIPELINE_CLEAN_WORKERS,
+        stats_interval: float = INSIGHTS_PIPELINE_STATS_SECONDS,
+        session_factory=SessionLocal,
+    ):
+        self.on_done = on_done or (lambda call_ids, error: None)
+        self.deadline_for = deadline_for or (lambda call_id: None)
+        self.loaded = queue.Queue(maxsize=queue_depth)
+        self.cleaned = queue.Queue(maxsize=queue_depth)
+        self.scored = queue.Queue(maxsize=queue_depth)
+        self.clean_workers = clean_workers
+        self.stats_interval = stats_interval
+        self.session_factory = session_factory
+        self.stages = {
+            name: StageStats(name) for name in ("read", "clean", "model", "write")
+        }
+        self._started = None
+        self._last_report = 0.0
+
+    def _get(self, source: queue.Queue, stage: StageStats):
+        start = time.perf_counter()
+        item = source.get()
+        stage.add("starved", time.perf_counter() - start)
+        return item
+
+    def _put(self, target: queue.Queue, item, stage: StageStats):
+        start = time.perf_counter()
+        target.put(item)
+        stage.add("blocked", time.perf_counter() - start)
+
+    def _run_stage(
+        self,
+        source: queue.Queue,
+        target: Optional[queue.Queue],
+        stage: StageStats,
+        work: Callable[[Batch], None],
+        after: Callable[[Batch], None] = None,
+    ):
+        """Loop of one stage: take a batch, process it unless it already failed, pass it on."""
+        while True:
+            batch = self._get(source, stage)
+            if batch is _DONE:
+                if target is not None:
+                    self._put(target, _DONE, stage)
+                return
+            if batch.error is None:
+                start = time.perf_counter()
+                try:
+                    work(batch)
+                except Exception as e:
+                    logger.error(
+                        f"Insights pipeline {stage.name} stage failed: {str(e)}",
+                        call_ids=batch.call_ids,
+                        exc_info=True,
+                    )
+                    batch.error = e
+                stage.add("busy", time.perf_counter() - start)
+                stage.done(len(batch.call_ids))
+            if target is not None:
+                self._put(target, batch, stage)
+            if after is not None:
+                after(batch)
+
+    # Stages
+
+    def _read(self, batches: Iterable[List[int]]):
+        stage = self.stages["read"]
+        try:
+            for call_ids in batches:
+                batch = Batch(list(call_ids))
+                start = time.perf_counter()
+                try:
+                    batch.items = self._load(batch.call_ids)
+                except Exception as e:
+                    logger.error(f"Insights pipeline read failed: {str(e)}", exc_info=True)
+                    batch.error = e
+                stage.add("busy", time.perf_counter() - start)
+                stage.done(len(batch.call_ids))
+                self._put(self.loaded, batch, stage)
+        finally:
+            # Also when the source itself fails, so the other stages drain and stop
+            self._put(self.loaded, _DONE, stage)
+
+    def _load(self, call_ids: List[int]) -> List[Dict]:
+        with self.session_factory() as db:
+            calls = (
+                db.query(DBCall)
+                .options(undefer_group("transcript"))
+                .filter(DBCall.call_id.in_(call_ids))
+                .all()
+            )
+            items = [
+                {
+                    "id": call.id,
+                    "call_id": call.call_id,
+                    "language": call.language,
+                    "transcript": call.transcript or "",
+                    "turns": call.turns,
+                }
+                for call in calls
+            ]
+        missing = set(call_ids) - {item["call_id"] for item in items}
+        if missing:
+            logger.warning("Calls not found, skipping", call_ids=sorted(missing))
+        return items
+
+    def _clean(self, batch: Batch, pool: ThreadPoolExecutor):
+        batch.items = list(pool.map(prepare_call, batch.items))
+        if not batch.items:
+            return
+        keywords = extract_keywords_batch([item["search_text"] for item in batch.items])
+        for item, call_keywords in zip(batch.items, keywords):
+            item["keywords"] = call_keywords
+
+    def _model(self, batch: Batch):
+        by_language = defaultdict(list)
+        for item in batch.items:
+            item["tier"] = choose_tier(self.deadline_for(item["call_id"]))
+            by_language[item["language"]].append(item)
+        for language, items in by_language.items():
+            score_calls(items, language)
+
+    def _write(self, batch: Batch):
+        if batch.items:
+            CallRepository(self.session_factory).bulk_update_insights(
+                [
+                    {
+                        "call_id": item["call_id"],
+                        "agent_talk_ratio": item["agent_talk_ratio"],
+                        "sentiment_score": item["sentiment"]["score"],
+                        "sentiment_scores": {
+                            "overall": item["sentiment"],
+                            "segments": item["segments"],
+                            **(
+                                {"degraded": degraded_marker(item["tier"])}
+                                if item["tier"] != FULL
+                                else {}
+                            ),
+                        },
+                        "embedding": item["embedding"],
+                        **({"keywords": item["keywords"]} if item["keywords"] is not None else {}),
+                    }
+                    for item in batch.items
+                ]
+            )
+            try:
+                SearchRepository(self.session_factory).index_documents(
+                    {item["call_id"]: item["search_text"] for item in batch.items}
+                )
+            except Exception as e:
+                # As in generate_call_insights: the insights are stored, leave
+                # the index to `index_keywords backfill --restart`
+                logger.error(f"Search indexing failed: {str(e)}", call_ids=batch.call_ids)
+
+    def _report(self, batch: Batch):
+        if time.monotonic() - self._last_report >= self.stats_interval:
+            logger.info("Insights pipeline stats", **self.stats())
+            self._last_report = time.monotonic()
+
+    def _finish(self, batch: Batch):
+        try:
+            self.on_done(batch.call_ids, batch.error)
+        except Exception as e:
+            logger.error(f"Insights pipeline on_done failed: {str(e)}", exc_info=True)
+
+    # Driver
+
+    def stats(self) -> Dict:
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "queued": {
+                "loaded": self.loaded.qsize(),
+                "cleaned": self.cleaned.qsize(),
+                "scored": self.scored.qsize(),
+            },
+            "stages": {name: stage.as_dict(elapsed) for name, stage in self.stages.items()},
+        }
+
+    def run(self, batches: Iterable[List[int]]) -> Dict:
+        """
+        Process every batch of call_ids from `batches` (read lazily, so it may
+        be an endless stream) and return the stage statistics.
+        """
+        self._started = time.perf_counter()
+        with ThreadPoolExecutor(
+            self.clean_workers, thread_name_prefix="insights-clean"
+        ) as pool:
+            threads = [
+                threading.Thread(target=self._read, args=(batches,), name="insights-read"),
+                threading.Thread(
+                    target=self._run_stage,
+                    args=(
+                        self.loaded,
+                        self.cleaned,
+                        self.stages["clean"],
+                        lambda batch: self._clean(batch, pool),
+                    ),
+                    name="insights-clean",
+                ),
+                threading.Thread(
+                    target=self._run_stage,
+                    args=(self.scored, None, self.stages["write"], self._write),
+                    kwargs={"after": self._finish},
+                    name="insights-write",
+                ),
+            ]
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+
+            # Inference stays on the calling thread (the one models were loaded on)
+            self._last_report = time.monotonic()
+            self._run_stage(
+                self.cleaned,
+                self.scored,
+                self.stages["model"],
+                self._model,
+                after=self._report,
+            )
+
+            for thread in threads:
+                thread.join()
+
+        stats = self.stats()
+        logger.info("Insights pipeline finished", **stats)
+        return stats
+
+
+def prepare_call(item: Dict) -> Dict:
+    """CPU-side preparation of one call: cleaning, talk ratio and turn texts."""
+    if item["turns"] is None:
+        transcript, turns = parse_transcript(item["transcript"])
+    else:
+        transcript, turns = item["transcript"], Turns.from_dict(item["turns"])
+
+    cleaned, cleaned_turns = clean_transcript(transcript, turns)
+    item["cleaned_transcript"] = cleaned
+    item["agent_talk_ratio"] = calculate_agent_talk_ratio(cleaned_turns)
+    item["turn_speakers"] = [SPEAKER_NAMES[speaker] for speaker in cleaned_turns.speakers]
+    item["turn_texts"] = [content for _, content in cleaned_turns.iter_turns(cleaned)]
+    item["search_text"] = search_text(cleaned, cleaned_turns)
+    return item
+
+
+def score_calls(items: List[Dict], language: str):
+    """
+    Sentiment (overall and per turn) and embeddings for calls of one language,
+    with one model call per kind for the whole batch. Items with a degraded
+    "tier" (app.degradation) skip the embedding and, for "minimal", per-turn
+    sentiment.
+    """
+    texts = [item["cleaned_transcript"] for item in items]
+    full = [item.get("tier", FULL) == FULL for item in items]
+    # Items may opt out of embeddings ("embed": False), e.g. on-demand scoring
+    overall, vectors = score_texts(
+        texts,
+        language,
+        [item.get("embed", True) and full[i] for i, item in enumerate(items)],
+        fast=full,
+    )
+
+    turned = [item.get("tier", FULL) != MINIMAL for item in items]
+    turn_texts = [
+        text for i, item in enumerate(items) if turned[i] for text in item["turn_texts"]
+    ]
+    turn_results = iter(analyze_sentiment_batch(turn_texts, language))
+
+    for i, item in enumerate(items):
+        item["sentiment"] = overall[i]
+        item["segments"] = (
+            [
+                {"turn": turn, "speaker": speaker, **next(turn_results)}
+                for turn, speaker in enumerate(item["turn_speakers"])
+            ]
+            if turned[i]
+            else []
+        )
+        item["embedding"] = vectors[i].tolist() if i in vectors else []
+
+
+def score_texts(
+    texts: List[str], language: str, embed: List[bool], fast: Optional[List[bool]] = None
+) -> Tuple[List[Dict], Dict]:
+    """
+    Overall sentiment of every text, and embeddings (by index) of the
+    non-empty texts with embed[i].
+
+    Texts are tokenized once for both models when their tokenizers agree
+    (app.workers.tokenization). With fast sentiment, texts with fast[i]
+    (default: all) are embedded and only those the head isn't confident
+    about go through the sentiment model (app.workers.sentiment_head).
+    """
+    sentiments = [{"label": "NEUTRAL", "score": 0.0} for _ in texts]
+    nonempty = [i for i, text in enumerate(texts) if text.strip()]
+    if not nonempty:
+        return sentiments, {}
+
+    head_id = fast_sentiment_head(language)
+    labelled = (
+        [i for i in nonempty if fast is None or fast[i]] if head_id is not None else []
+    )
+    embedded = sorted(set(labelled) | {i for i in nonempty if embed[i]})
+
+    # Sharing only pays (and is only checked) when both models may run
+    tokenizer = shared_tokenizer(language) if embedded else None
+    encoded = Encoded.encode(tokenizer, [texts[i] for i in nonempty]) if tokenizer else None
+    rows = {i: row for row, i in enumerate(nonempty)}
+
+    vectors = {}
+    if embedded:
+        if encoded is not None:
+            embeddings = embeddings_from_tokens(
+                get_sentence_transformer(language), encoded.select([rows[i] for i in embedded])
+            )
+        else:
+            embeddings = generate_embeddings_batch([texts[i] for i in embedded], language)
+        vectors = dict(zip(embedded, embeddings))
+
+    unsure = set()
+    if labelled:
+        predictions = predict_sentiment(head_id, [vectors[i] for i in labelled])
+        for i, prediction in zip(labelled, predictions):
+            if prediction is None:
+                unsure.add(i)
+            else:
+                sentiments[i] = format_sentiment(prediction)
+    labelled = set(labelled) - unsure
+    pending = [i for i in nonempty if i not in labelled]
+
+    if pending:
+        if encoded is not None:
+            results = [
+                format_sentiment(result)
+                for result in sentiment_from_tokens(
+                    get_sentiment_analyzer(language), encoded.select([rows[i] for i in pending])
+                )
+            ]
+        else:
+            results = analyze_sentiment_batch([texts[i] for i in pending], language)
+        for i, result in zip(pending, results):
+            sentiments[i] = result
+
+    return sentiments, {i: vector for i, vector in vectors.items() if embed[i]}
@@ -0,0 +1,152 @@
+import gc
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+
+import structlog
+
+from app.settings import MODEL_MEMORY_BUDGET_MB
+
+logger = structlog.get_logger(__name__)
+
+SENTIMENT = "sentiment"
+EMBEDDING = "embedding"
+
+# Model per (task, language); "default" is used for languages without an entry.
+# The multilingual fallbacks keep the same label set / embedding size (384).
+MODEL_NAMES: Dict[str, Dict[str, str]] = {
+    SENTIMENT: {
+        "en": "distilbert-base-uncased-finetuned-sst-2-english",
+        "default": "lxyuan/distilbert-base-multilingual-cased-sentiments-student",
+    },
+    EMBEDDING: {
+        "en": "sentence-transformers/all-MiniLM-L6-v2",
+        "default": "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+    },
+}
+
+
+# torch / transformers / sentence_transformers are imported inside the loaders
+# so that processes which never run inference (API, ingestion) don't pay for them.
+def load_sentiment_analyzer(model_name: str):
+    import torch
+    from transformers import pipeline, AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    return pipeline(
+        "sentiment-analysis",
+        model=model,
+        tokenizer=tokenizer,
+        device=0 if torch.cuda.is_available() else -1,
+    )
+
+
+def load_sentence_transformer(model_name: str):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(
+        model_name,
+        device="cuda" if torch.cuda.is_available() else "cpu",
+    )
+
+
+LOADERS: Dict[str, Callable] = {
+    SENTIMENT: load_sentiment_analyzer,
+    EMBEDDING: load_sentence_transformer,
+}
+
+
+def model_memory_bytes(model) -> int:
+    """
+    Resident size of a loaded model: bytes held by its parameters and buffers.
+    Pipelines are measured through their underlying `.model`.
+    """
+    torch = sys.modules.get("torch")
+    if torch is None:
+        # Nothing torch-backed has been loaded in this process
+        return 0
+
+    module = getattr(model, "model", model)
+    if not isinstance(module, torch.nn.Module):
+        return 0
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class ModelRegistry:
+    """
+    Lazily loads models per (task, language) and keeps them in an LRU bounded
+    by `memory_budget_mb`. Languages that resolve to the same model share one
+    instance. The most recently requested model is never evicted, even when it
+    alone exceeds the budget.
+    """
+
+    def __init__(self, memory_budget_mb: int = MODEL_MEMORY_BUDGET_MB):
+        self.memory_budget_bytes = memory_budget_mb * 1024 * 1024
+        self._models: "OrderedDict[Tuple[str, str], Tuple[object, int]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def resolve(task: str, language: str = None) -> str:
+        """Return the model name serving `task` for `language`."""
+        names = MODEL_NAMES[task]
+        return names.get((language or "").lower(), names["default"])
+
+    @staticmethod
+    def language_key(language: str = None) -> str:
+        """
+        `language` if any task has a model of its own for it, else "default":
+        a bounded key for per-language state built from client input.
+        """
+        language = (language or "").lower()
+        if any(language in names for names in MODEL_NAMES.values()):
+            return language
+        return "default"
+
+    def get(self, task: str, language: str = None):
+        model_name = self.resolve(task, language)
+        key = (task, model_name)
+
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+
+            logger.info("Loading model", task=task, model=model_name, language=language)
+            model = LOADERS[task](model_name)
+            size = model_memory_bytes(model)
+            self._models[key] = (model, size)
+            self._evict()
+            return model
+
+    def memory_usage(self) -> int:
+        """Bytes currently held by loaded models."""
+        return sum(size for _, size in self._models.values())
+
+    def loaded(self) -> Dict[Tuple[str, str], int]:
+        """Loaded models (least recently used first) with their sizes in bytes."""
+        return {key: size for key, (_, size) in self._models.items()}
+
+    def _evict(self):
+        evicted = False
+        while len(self._models) > 1 and self.memory_usage() > self.memory_budget_bytes:
+            (task, model_name), (_, size) = self._models.popitem(last=False)
+            evicted = True
+            logger.info(
+                "Evicted model", task=task, model=model_name, freed_bytes=size
+            )
+
+        if evicted:
+            gc.collect()
+            torch = sys.modules.get("torch")
+            if torch is not None and torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+
+# One registry per worker process
+registry = ModelRegistry()
@@ -0,0 +1,186 @@
+"""
+Fast sentiment from the call embedding (INSIGHTS_FAST_SENTIMENT_ENABLED).
+
+Every call gets an embedding from the sentence transformer anyway. A logistic
+regression on that embedding, fitted on the labels the sentiment model gave
+past calls (app.scripts.sentiment_head fit), predicts the overall label
+without a second transformer pass. Predictions less confident than
+INSIGHTS_FAST_SENTIMENT_MIN_CONFIDENCE fall back to the sentiment model.
+Results from a head carry "source" and "head_id", so they are never used to
+fit another head and can be rescored later.
+
+One head per embedding model. Like keyword vectorizers, stored heads never
+change; only which one is newest is refreshed periodically.
+"""
+
+import io
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import structlog
+
+from app.db import SessionLocal
+from app.settings import (
+    INSIGHTS_FAST_SENTIMENT_ENABLED,
+    INSIGHTS_FAST_SENTIMENT_MIN_CONFIDENCE,
+    SENTIMENT_HEAD_REFRESH_SECONDS,
+)
+from app.workers.registry import EMBEDDING, registry
+
+logger = structlog.get_logger(__name__)
+
+HEAD_SOURCE = "embedding_head"
+
+# Labels a head is fitted on (failed scoring was once stored as "ERROR")
+LABELS = ("POSITIVE", "NEGATIVE", "NEUTRAL")
+
+REPORT_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99)
+
+_heads = {}
+_heads_lock = threading.Lock()
+# embedding model -> (newest head id, when it was checked)
+_active: Dict[str, tuple] = {}
+
+
+def fit_head(embeddings, labels: Sequence[str], regularization: float = 1.0):
+    """Fit a logistic regression from embeddings to sentiment labels."""
+    from sklearn.linear_model import LogisticRegression
+
+    head = LogisticRegression(C=regularization, max_iter=1000)
+    head.fit(embeddings, list(labels))
+    return head
+
+
+def evaluate_head(head, embeddings, labels: Sequence[str], bins: int = 10) -> Dict:
+    """
+    How well `head` reproduces the sentiment model's labels:
+
+    - agreement: share of calls given the same label
+    - thresholds: for each confidence threshold, the share of calls the head
+      would label itself (coverage) and its agreement on those
+    - calibration: per confidence bin, mean confidence against agreement,
+      and the expected calibration error over all bins
+    """
+    import numpy as np
+
+    probabilities = head.predict_proba(embeddings)
+    confidence = probabilities.max(axis=1)
+    predicted = head.classes_[probabilities.argmax(axis=1)]
+    agree = predicted == np.asarray(labels)
+
+    thresholds = []
+    for threshold in REPORT_THRESHOLDS:
+        kept = confidence >= threshold
+        thresholds.append(
+            {
+                "threshold": threshold,
+                "coverage": round(float(kept.mean()), 4),
+                "agreement": round(float(agree[kept].mean()), 4) if kept.any() else None,
+            }
+        )
+
+    calibration = []
+    error = 0.0
+    edges = np.linspace(1 / len(head.classes_), 1.0, bins + 1)
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        in_bin = (confidence >= lo) & ((confidence < hi) | (hi == edges[-1]))
+        if not in_bin.any():
+            continue
+        mean_confidence = float(confidence[in_bin].mean())
+        accuracy = float(agree[in_bin].mean())
+        error += in_bin.mean() * abs(mean_confidence - accuracy)
+        calibration.append(
+            {
+                "bin": [round(float(lo), 3), round(float(hi), 3)],
+                "calls": int(in_bin.sum()),
+                "mean_confidence": round(mean_confidence, 4),
+                "agreement": round(accuracy, 4),
+            }
+        )
+
+    return {
+        "calls": len(agree),
+        "labels": {str(label): int((np.asarray(labels) == label).sum()) for label in head.classes_},
+        "agreement": round(float(agree.mean()), 4),
+        "thresholds": thresholds,
+        "calibration": calibration,
+        "expected_calibration_error": round(float(error), 4),
+    }
+
+
+def dump_head(head) -> bytes:
+    import joblib
+
+    buffer = io.BytesIO()
+    joblib.dump(head, buffer, compress=3)
+    return buffer.getvalue()
+
+
+def load_head(head_id: int):
+    import joblib
+
+    from app.models.sentiment import DBSentimentHead
+
+    with _heads_lock:
+        if head_id not in _heads:
+            with SessionLocal() as db:
+                row = db.get(DBSentimentHead, head_id)
+                if row is None:
+                    raise ValueError(f"Sentiment head {head_id} not found")
+                _heads[head_id] = joblib.load(io.BytesIO(row.model))
+        return _heads[head_id]
+
+
+def active_head_id(embedding_model: str) -> Optional[int]:
+    """Id of the newest head fitted for `embedding_model` (None until one is fitted)."""
+    from app.models.sentiment import DBSentimentHead
+
+    head_id, checked_at = _active.get(embedding_model, (None, None))
+    now = time.monotonic()
+    if checked_at is None or now - checked_at >= SENTIMENT_HEAD_REFRESH_SECONDS:
+        with SessionLocal() as db:
+            latest = (
+                db.query(DBSentimentHead.id)
+                .filter(DBSentimentHead.embedding_model == embedding_model)
+                .order_by(DBSentimentHead.id.desc())
+                .first()
+            )
+        head_id = latest[0] if latest else None
+        _active[embedding_model] = (head_id, now)
+    return head_id
+
+
+def fast_sentiment_head(language: str) -> Optional[int]:
+    """Id of the head to label `language` calls with, or None to use the sentiment model."""
+    if not INSIGHTS_FAST_SENTIMENT_ENABLED:
+        return None
+    return active_head_id(registry.resolve(EMBEDDING, language))
+
+
+def predict_sentiment(
+    head_id: int,
+    embeddings,
+    min_confidence: float = INSIGHTS_FAST_SENTIMENT_MIN_CONFIDENCE,
+) -> List[Optional[Dict]]:
+    """
+    Raw {"label", "score"} per embedding, as the sentiment pipeline returns
+    them, or None where the head is less confident than `min_confidence`.
+    """
+    head = load_head(head_id)
+    probabilities = head.predict_proba(embeddings)
+    results = []
+    for row in probabilities:
+        best = int(row.argmax())
+        if row[best] < min_confidence:
+            results.append(None)
+        else:
+            results.append(
+                {
+                    "label": str(head.classes_[best]),
+                    "score": float(row[best]),
+                    "source": HEAD_SOURCE,
+                    "head_id": head_id,
+                }
+            )
+    return results
@@ -0,0 +1,148 @@
+"""
+One tokenization pass shared by the sentiment and embedding models.
+
+The English models (distilbert-base-uncased-finetuned-sst-2-english and
+all-MiniLM-L6-v2) both use the uncased BERT WordPiece vocabulary, so a batch
+of transcripts is tokenized once with the fast tokenizer and the same
+input_ids feed both models, each cut to its own limits:
+
+- sentiment: tokens within the first SENTIMENT_MAX_CHARS characters (the
+  pipeline path scores text[:512]), at most the model's max length
+- embedding: the first max_seq_length tokens, as SentenceTransformer.encode
+
+Model pairs whose tokenizers don't produce the same ids (e.g. the
+multilingual fallbacks, or stub models) keep tokenizing separately.
+"""
+
+import threading
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+import structlog
+
+from app.settings import INSIGHTS_SHARED_TOKENIZATION_ENABLED
+from app.workers.insights import get_sentence_transformer, get_sentiment_analyzer
+from app.workers.registry import EMBEDDING, SENTIMENT, registry
+
+logger = structlog.get_logger(__name__)
+
+SENTIMENT_MAX_CHARS = 512
+
+# Same vocabulary with different normalization (casing, accents) still splits
+# text differently, so compatibility is also checked on a sample
+PROBE_TEXT = "Hi, I'd like to CANCEL my subscription #4521 — the café app's naïve résumé!"
+
+# (sentiment model, embedding model) -> whether they can share input_ids
+_compatible: Dict[Tuple[str, str], bool] = {}
+_compatible_lock = threading.Lock()
+
+
+def tokenizers_match(first, second) -> bool:
+    """Whether two tokenizers turn text into the same ids."""
+    if not getattr(first, "is_fast", False) or not getattr(second, "is_fast", False):
+        # Offsets (for the sentiment character limit) need fast tokenizers
+        return False
+    if (first.cls_token_id, first.sep_token_id, first.pad_token_id) != (
+        second.cls_token_id,
+        second.sep_token_id,
+        second.pad_token_id,
+    ):
+        return False
+    if first.get_vocab() != second.get_vocab():
+        return False
+    return first(PROBE_TEXT)["input_ids"] == second(PROBE_TEXT)["input_ids"]
+
+
+def shared_tokenizer(language: str):
+    """The tokenizer both models for `language` can be fed from, or None."""
+    if not INSIGHTS_SHARED_TOKENIZATION_ENABLED:
+        return None
+    analyzer = get_sentiment_analyzer(language)
+    key = (registry.resolve(SENTIMENT, language), registry.resolve(EMBEDDING, language))
+    with _compatible_lock:
+        if key not in _compatible:
+            model = get_sentence_transformer(language)
+            _compatible[key] = tokenizers_match(
+                getattr(analyzer, "tokenizer", None), getattr(model, "tokenizer", None)
+            )
+            logger.info(
+                "Shared tokenization",
+                sentiment_model=key[0],
+                embedding_model=key[1],
+                shared=_compatible[key],
+            )
+    return analyzer.tokenizer if _compatible[key] else None
+
+
+class Encoded:
+    """Token ids of a batch of texts (no special tokens) with where each token ends."""
+
+    def __init__(self, tokenizer, ids: List[List[int]], ends: List[List[int]]):
+        self.tokenizer = tokenizer
+        self.ids = ids
+        self.ends = ends
+
+    @classmethod
+    def encode(cls, tokenizer, texts: List[str]) -> "Encoded":
+        encoding = tokenizer(
+            texts,
+            add_special_tokens=False,
+            return_attention_mask=False,
+            return_offsets_mapping=True,
+        )
+        ends = [[end for _, end in offsets] for offsets in encoding["offset_mapping"]]
+        return cls(tokenizer, encoding["input_ids"], ends)
+
+    def select(self, rows: List[int]) -> "Encoded":
+        return Encoded(self.tokenizer, [self.ids[r] for r in rows], [self.ends[r] for r in rows])
+
+    def model_inputs(self, max_tokens: int, max_chars: Optional[int] = None, device=None):
+        """
+        Padded input_ids / attention_mask for one model: [CLS] tokens [SEP],
+        with at most `max_tokens` in all and only tokens ending within
+        `max_chars` characters.
+        """
+        import torch
+
+        tokenizer = self.tokenizer
+        rows = []
+        for ids, ends in zip(self.ids, self.ends):
+            count = len(ids) if max_chars is None else bisect_right(ends, max_chars)
+            count = min(count, max_tokens - 2)
+            rows.append([tokenizer.cls_token_id, *ids[:count], tokenizer.sep_token_id])
+
+        width = max(len(row) for row in rows)
+        input_ids = [row + [tokenizer.pad_token_id] * (width - len(row)) for row in rows]
+        attention_mask = [[1] * len(row) + [0] * (width - len(row)) for row in rows]
+        return {
+            "input_ids": torch.tensor(input_ids, device=device),
+            "attention_mask": torch.tensor(attention_mask, device=device),
+        }
+
+
+def sentiment_from_tokens(analyzer, encoded: Encoded) -> List[Dict]:
+    """Raw {"label", "score"} results, as the sentiment pipeline returns them."""
+    import torch
+
+    model = analyzer.model
+    max_tokens = min(analyzer.tokenizer.model_max_length, model.config.max_position_embeddings)
+    inputs = encoded.model_inputs(max_tokens, SENTIMENT_MAX_CHARS, device=model.device)
+    with torch.inference_mode():
+        # Softmax over the labels, the pipeline's default for single-label models
+        probabilities = model(**inputs).logits.float().softmax(dim=-1)
+    scores, labels = probabilities.max(dim=-1)
+    return [
+        {"label": model.config.id2label[label], "score": score}
+        for score, label in zip(scores.tolist(), labels.tolist())
+    ]
+
+
+def embeddings_from_tokens(model, encoded: Encoded):
+    """(len(texts), dim) float32 array, as SentenceTransformer.encode returns it."""
+    import torch
+
+    inputs = encoded.model_inputs(model.max_seq_length, device=model.device)
+    with torch.inference_mode():
+        vectors = model(inputs)["sentence_embedding"]
+    return vectors.float().cpu().numpy()
+
@@ -0,0 +1,95 @@
+"""
+Tests run against a throwaway SQLite database, fakeredis and stub models.
+Settings are read at import, so the environment is set before any app module
+is imported.
+"""
+
+import inspect
+import os
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(
+    tempfile.mkdtemp(prefix="transcripts-tests-"), "test.db"
+)
+os.environ["CACHE_ENABLED"] = "true"
+os.environ["DEDUP_ENABLED"] = "false"
+os.environ["INSIGHTS_CHECKPOINTS_ENABLED"] = "false"
+os.environ["INSIGHTS_DEGRADATION_ENABLED"] = "true"
+os.environ["LOG_QUEUE_ENABLED"] = "false"
+
+from collections import Counter  # noqa: E402
+
+import fakeredis  # noqa: E402
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """Empty tables; yields the session factory."""
+    import app.models  # noqa: F401  (registers every table)
+    from app.db import Base, SessionLocal, engine
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield SessionLocal
+    Base.metadata.drop_all(engine)
+
+
+def _functions(module):
+    for value in list(vars(module).values()):
+        if inspect.isfunction(value):
+            yield value
+        elif inspect.isclass(value) and value.__module__ == module.__name__:
+            yield from (f for f in vars(value).values() if inspect.isfunction(f))
+
+
+@pytest.fixture(autouse=True)
+def redis_client(monkeypatch):
+    """
+    A fakeredis client in place of the shared Redis client, both where modules
+    imported it and where functions took it as their default `client`.
+    """
+    import app.cache
+    import app.main  # noqa: F401  (imports the API and, through it, the workers)
+    import app.workers.degradation  # noqa: F401
+    import app.workers.insights  # noqa: F401
+
+    real, fake = app.cache.redis_client, fakeredis.FakeRedis()
+    for module in [m for name, m in sys.modules.items() if name.startswith("app.")]:
+        for name, value in list(vars(module).items()):
+            if value is real:
+                monkeypatch.setattr(module, name, fake)
+        for function in _functions(module):
+            if any(default is real for default in function.__defaults__ or ()):
+                defaults = tuple(
+                    fake if default is real else default
+                    for default in function.__defaults__
+                )
+                monkeypatch.setattr(function, "__defaults__", defaults)
+    return fake
+
+
+@pytest.fixture
+def model_calls(monkeypatch):
+    """Stub models for every task; returns the texts each model was called on."""
+    from app.scripts.load_harness import StubSentenceTransformer, StubSentimentPipeline
+    from app.workers import registry
+
+    calls = Counter()
+
+    class Sentiment(StubSentimentPipeline):
+        def __call__(self, texts, **kwargs):
+            calls[registry.SENTIMENT] += 1 if isinstance(texts, str) else len(texts)
+            return super().__call__(texts, **kwargs)
+
+    class Embedding(StubSentenceTransformer):
+        def encode(self, texts, **kwargs):
+            calls[registry.EMBEDDING] += 1 if isinstance(texts, str) else len(texts)
+            return super().encode(texts, **kwargs)
+
+    monkeypatch.setitem(registry.LOADERS, registry.SENTIMENT, lambda name: Sentiment(0))
+    monkeypatch.setitem(registry.LOADERS, registry.EMBEDDING, lambda name: Embedding(0))
+    registry.registry._models.clear()
+    yield calls
+    registry.registry._models.clear()
@@ -0,0 +1,69 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app.backfill import OnlineBackfill, backfill_status, sql_batch
+from app.models.calls import CallRepository
+
+FILL = sql_batch("UPDATE calls SET keywords = '[]' WHERE id BETWEEN :lo AND :hi")
+
+
+@pytest.fixture
+def calls(db):
+    CallRepository().bulk_upsert_calls(
+        [
+            {
+                "call_id": call_id,
+                "agent_id": 1,
+                "customer_id": 1,
+                "language": "en",
+                "start_time": datetime(2026, 1, 1),
+                "duration_seconds": 60,
+            }
+            for call_id in range(1, 11)
+        ]
+    )
+    return db
+
+
+def filled(session_factory) -> int:
+    with session_factory() as db:
+        return db.scalar(text("SELECT COUNT(*) FROM calls WHERE keywords IS NOT NULL"))
+
+
+def test_failed_batch_keeps_neither_rows_nor_progress(calls):
+    def fail_on_second_batch(db, lo, hi):
+        rows = FILL(db, lo, hi)
+        if lo > 1:
+            raise ValueError("batch failed")
+        return rows
+
+    with pytest.raises(ValueError):
+        OnlineBackfill("fill", fail_on_second_batch, batch_size=5, sleep=0).run()
+
+    assert backfill_status("fill")["last_id"] == 5
+    assert filled(calls) == 5
+
+
+def test_resumes_where_it_stopped(calls):
+    def fail_after_first_batch(db, lo, hi):
+        if lo > 1:
+            raise ValueError("batch failed")
+        return FILL(db, lo, hi)
+
+    with pytest.raises(ValueError):
+        OnlineBackfill("fill", fail_after_first_batch, batch_size=5, sleep=0).run()
+
+    batches = []
+
+    def record(db, lo, hi):
+        batches.append(lo)
+        return FILL(db, lo, hi)
+
+    status = OnlineBackfill("fill", record, batch_size=5, sleep=0).run()
+
+    assert batches == [6]
+    assert status["rows_updated"] == 10
+    assert status["finished_at"] is not None
+    assert filled(calls) == 10
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.models.calls import CallRepository
+
+
+def record(call_id, **fields):
+    return {
+        "call_id": call_id,
+        "agent_id": 1,
+        "customer_id": 1,
+        "language": "en",
+        "start_time": datetime(2026, 1, 10),
+        "duration_seconds": 60,
+        "transcript": "Agent: hello",
+        **fields,
+    }
+
+
+@pytest.fixture
+def repo(db):
+    repo = CallRepository()
+    repo.bulk_upsert_calls([record(1), record(2)])
+    return repo
+
+
+def test_inserts_new_calls_and_updates_existing(repo):
+    counts = repo.bulk_upsert_calls([record(2, duration_seconds=90), record(3)])
+
+    assert counts == {"inserted": 1, "updated": 1}
+    assert repo.get(2).duration_seconds == 90
+    assert repo.get(3).transcript == "Agent: hello"
+
+
+def test_partial_record_updates_only_its_fields(repo):
+    counts = repo.bulk_upsert_calls([{"call_id": 1, "language": "es"}])
+
+    call = repo.get(1)
+    assert counts == {"inserted": 0, "updated": 1}
+    assert (call.language, call.duration_seconds) == ("es", 60)
+    assert call.transcript == "Agent: hello"
+
+
+def test_call_id_only_record_changes_nothing(repo):
+    counts = repo.bulk_upsert_calls([{"call_id": 1}, record(2, language="fr")])
+
+    assert counts == {"inserted": 0, "updated": 2}
+    assert repo.get(1).language == "en"
+    assert repo.get(2).language == "fr"
+
+
+def test_new_call_missing_required_fields_fails_the_batch(repo):
+    with pytest.raises(IntegrityError):
+        repo.bulk_upsert_calls([record(2, language="fr"), {"call_id": 4}])
+
+    assert repo.get(2).language == "en"
+    assert repo.get(4) is None
+
+
+def test_bulk_update_insights_skips_unknown_calls(repo):
+    updated = repo.bulk_update_insights(
+        [
+            {"call_id": 1, "sentiment_score": 0.25, "keywords": ["refund"]},
+            {"call_id": 99, "sentiment_score": 0.5},
+        ]
+    )
+
+    call = repo.get(1)
+    assert updated == 1
+    assert (call.sentiment_score, call.keywords) == (0.25, ["refund"])
+    assert call.processing_status == "completed"
+    assert repo.get(99) is None
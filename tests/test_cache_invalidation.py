@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cache import CALLS_GENERATION_KEY
+from app.main import app
+from app.models.calls import CallRepository
+
+WINDOW = {"start": "2026-01-01T00:00:00", "end": "2026-02-01T00:00:00"}
+
+
+@pytest.fixture
+def client(db):
+    repo = CallRepository()
+    repo.bulk_upsert_calls(
+        [
+            {
+                "call_id": call_id,
+                "agent_id": 1,
+                "customer_id": 1,
+                "language": "en",
+                "start_time": datetime(2026, 1, 10),
+                "duration_seconds": 60,
+                "transcript": "Agent: hello",
+            }
+            for call_id in (1, 2)
+        ]
+    )
+    repo.update_insights(1, sentiment_score=0.5, status="completed")
+    repo.update_insights(2, sentiment_score=-0.5, status="completed")
+    return TestClient(app)
+
+
+def aggregates(client):
+    return client.get("/api/v1/calls/aggregates", params=WINDOW).json()
+
+
+def test_call_leaving_completed_invalidates_aggregates(client):
+    assert aggregates(client)["completed_calls"] == 2
+
+    # A retry of call 2 that fails
+    CallRepository().update_insights(2, status="processing")
+    CallRepository().update_insights(2, status="failed: model error")
+
+    result = aggregates(client)
+    assert result["completed_calls"] == 1
+    assert result["avg_sentiment_score"] == pytest.approx(0.5)
+    assert result["status_counts"] == {"completed": 1, "failed: model error": 1}
+
+
+def test_status_transitions_invalidate_aggregates(client, redis_client):
+    aggregates(client)
+    generation = int(redis_client.get(CALLS_GENERATION_KEY))
+
+    CallRepository().update_insights(1, status="processing")
+    assert int(redis_client.get(CALLS_GENERATION_KEY)) == generation + 1
+    assert aggregates(client)["status_counts"] == {"completed": 1, "processing": 1}
+
+
+def test_unchanged_status_keeps_aggregates_cached(client, redis_client):
+    CallRepository().update_insights(1, status="processing")
+    generation = redis_client.get(CALLS_GENERATION_KEY)
+
+    CallRepository().update_insights(1, status="processing")
+    assert redis_client.get(CALLS_GENERATION_KEY) == generation
+
+
+def test_bulk_writes_invalidate_once_per_batch(client, redis_client):
+    generation = int(redis_client.get(CALLS_GENERATION_KEY))
+
+    updated = CallRepository().bulk_update_insights(
+        [{"call_id": 1, "sentiment_score": 0.1}, {"call_id": 2, "sentiment_score": 0.3}]
+    )
+
+    assert updated == 2
+    assert int(redis_client.get(CALLS_GENERATION_KEY)) == generation + 1
+    assert aggregates(client)["avg_sentiment_score"] == pytest.approx(0.2)
+
+
+def test_writes_invalidate_cached_call_details(client):
+    assert client.get("/api/v1/calls/1").json()["sentiment_score"] == 0.5
+
+    CallRepository().update_insights(1, sentiment_score=0.75, keywords=["refund"])
+    details = client.get("/api/v1/calls/1").json()
+    assert (details["sentiment_score"], details["keywords"]) == (0.75, ["refund"])
+
+    CallRepository().bulk_upsert_calls([{"call_id": 1, "language": "es"}])
+    assert client.get("/api/v1/calls/1").json()["language"] == "es"
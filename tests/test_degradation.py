@@ -0,0 +1,77 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from app import degradation
+from app.degradation import FULL, MINIMAL, NO_EMBEDDING, choose_tier
+from app.models.calls import CallRepository
+from app.settings import INSIGHTS_FRESHNESS_SLO_SECONDS
+from app.workers import insights
+from app.workers.insights import generate_call_insights
+
+SLO = INSIGHTS_FRESHNESS_SLO_SECONDS
+
+
+@pytest.fixture
+def backlog(monkeypatch):
+    depth = {"fresh": 0}
+    monkeypatch.setattr(degradation, "fresh_backlog", lambda: depth["fresh"])
+    return depth
+
+
+def test_no_deadline_runs_in_full(backlog):
+    backlog["fresh"] = 10**6
+    assert choose_tier(None) == FULL
+
+
+@pytest.mark.parametrize(
+    "waited, tier",
+    [
+        (0.0, FULL),
+        (0.49, FULL),
+        (0.5, NO_EMBEDDING),
+        (0.99, NO_EMBEDDING),
+        (1.0, MINIMAL),
+    ],
+)
+def test_tier_by_share_of_slo_waited(backlog, waited, tier):
+    now = 1_000_000.0
+    assert choose_tier(now + SLO * (1 - waited), now=now) == tier
+
+
+@pytest.mark.parametrize(
+    "depth, tier", [(499, FULL), (500, NO_EMBEDDING), (2000, MINIMAL)]
+)
+def test_tier_by_fresh_backlog(backlog, depth, tier):
+    backlog["fresh"] = depth
+    now = 1_000_000.0
+    assert choose_tier(now + SLO, now=now) == tier
+
+
+def test_retry_runs_in_full_despite_missed_deadline(db, backlog, monkeypatch):
+    CallRepository().bulk_upsert_calls(
+        [
+            {
+                "call_id": 1,
+                "agent_id": 1,
+                "customer_id": 1,
+                "language": "en",
+                "start_time": datetime(2026, 1, 10),
+                "duration_seconds": 60,
+                "transcript": "Agent: hello",
+            }
+        ]
+    )
+    tiers = []
+
+    def process(transcript, language, turns, checkpoint, tier):
+        tiers.append(tier)
+        raise RuntimeError("model server unavailable")
+
+    monkeypatch.setattr(insights, "process_call_transcript", process)
+    generate_call_insights.apply(
+        kwargs={"call_id": 1, "deadline": time.time() - SLO}, retries=2
+    )
+
+    assert tiers == [MINIMAL, FULL]
@@ -0,0 +1,59 @@
+import fakeredis
+
+from app.degradation import FULL, NO_EMBEDDING
+from app.workers.checkpoints import StageCheckpoint
+from app.workers.insights import process_call_transcript
+from app.workers.registry import EMBEDDING, SENTIMENT
+
+TRANSCRIPT = "Agent: hello, how can I help\nCustomer: my order is late"
+
+
+def checkpoint():
+    return StageCheckpoint(1, TRANSCRIPT, client=fakeredis.FakeRedis(), enabled=True)
+
+
+def test_scores_every_stage_once(db, model_calls):
+    stages = checkpoint()
+    insights = process_call_transcript(TRANSCRIPT, "en", None, stages, FULL)
+
+    assert len(insights["embedding"]) == 384
+    assert set(stages.completed()) == {"embedding", "sentiment", "segments"}
+    # One embedding; overall sentiment plus one per turn
+    assert model_calls[EMBEDDING] == 1
+    assert model_calls[SENTIMENT] == 3
+
+
+def test_resume_only_runs_unfinished_stages(db, model_calls):
+    first = process_call_transcript(TRANSCRIPT, "en", None, checkpoint(), FULL)
+    model_calls.clear()
+
+    stages = checkpoint()
+    stages.save("embedding", first["embedding"])
+    insights = process_call_transcript(TRANSCRIPT, "en", None, stages, FULL)
+
+    assert model_calls[EMBEDDING] == 0
+    assert model_calls[SENTIMENT] == 3
+    assert insights["embedding"] == first["embedding"]
+    assert (
+        insights["sentiment_scores"]["overall"] == first["sentiment_scores"]["overall"]
+    )
+
+
+def test_resume_with_every_stage_runs_no_model(db, model_calls):
+    stages = checkpoint()
+    process_call_transcript(TRANSCRIPT, "en", None, stages, FULL)
+    model_calls.clear()
+
+    resumed = StageCheckpoint(1, TRANSCRIPT, client=stages.client, enabled=True)
+    process_call_transcript(TRANSCRIPT, "en", None, resumed, FULL)
+
+    assert sum(model_calls.values()) == 0
+
+
+def test_degraded_tier_skips_the_embedding(db, model_calls):
+    insights = process_call_transcript(
+        TRANSCRIPT, "en", None, checkpoint(), NO_EMBEDDING
+    )
+
+    assert insights["embedding"] == []
+    assert model_calls[EMBEDDING] == 0
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from app.models.calls import CallRepository
+from app.scripts.sentiment_head import load_samples
+from app.workers.registry import EMBEDDING, registry
+from app.workers.sentiment_head import HEAD_SOURCE
+
+
+def test_samples_only_use_full_model_labels(db):
+    overall = {"label": "POSITIVE", "score": 0.9}
+    scores = {
+        1: {"overall": overall},
+        2: {"overall": {"label": "ERROR", "score": 0.0}},
+        3: {"overall": overall, "live": {"rolling_score": 0.9}},
+        4: {"overall": overall, "dedup": {"source_call_id": 1}},
+        5: {"overall": {**overall, "source": HEAD_SOURCE, "head_id": 1}},
+        6: {"overall": {"label": "NEGATIVE", "score": -0.8}},
+    }
+    CallRepository().bulk_upsert_calls(
+        [
+            {
+                "call_id": call_id,
+                "agent_id": 1,
+                "customer_id": 1,
+                "language": "en",
+                "start_time": datetime(2026, 1, 1),
+                "duration_seconds": 60,
+                "sentiment_scores": call_scores,
+                "embedding": [float(call_id)] * 4,
+                "processing_status": "completed",
+            }
+            for call_id, call_scores in scores.items()
+        ]
+    )
+
+    embeddings, labels = load_samples(registry.resolve(EMBEDDING, "en"), 100)
+
+    assert sorted(labels) == ["NEGATIVE", "POSITIVE"]
+    assert sorted(embeddings[:, 0].tolist()) == [1.0, 6.0]